@@ -0,0 +1,70 @@
+# Compare full resolution and pyramid box detection on a large page: time, peak memory and matching boxes
+import argparse
+import base64
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from hieroglyph.utils.image import ImageWrapper
+from hieroglyph.process.image_processing import preprocess_data
+from hieroglyph.process.boxes import get_bounding_boxes
+from hieroglyph.general import INBOUND_IMAGE_TYPE, BOX_DETECTION
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="./assets/diagrams/ss.png", type=str)
+    parser.add_argument("--image-type", default="diagram", type=str)
+    parser.add_argument("--upscale", default=4.0, type=float,
+                        help="Enlarge the page, a 125 DPI scan upscaled by 4 is about the size of a 500 DPI page")
+    parser.add_argument("--min-iou", default=0.5, type=float)
+    return parser.parse_args()
+
+
+def iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    overlap = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - overlap
+    return overlap / union if union else 0.0
+
+
+def main():
+    args = get_arguments()
+    image_type = INBOUND_IMAGE_TYPE(args.image_type)
+    with open(args.input, "rb") as f:
+        source_image = ImageWrapper(src_image=base64.b64encode(f.read()).decode(), name=args.input,
+                                    image_type=image_type)
+    # Detection is compared on the preprocessed page, enlarged after preprocessing so both modes see the
+    # same page. The reference is full resolution detection on the page before enlarging, scaled up
+    transformed_image = preprocess_data(source_image)
+    reference = [[round(value * args.upscale) for value in box._box] for box in
+                 get_bounding_boxes(source_image, transformed_image, image_type, detection=BOX_DETECTION.FULL)]
+    if args.upscale != 1:
+        for image in (source_image, transformed_image):
+            image.update(cv2.resize(image.get_array(), None, fx=args.upscale, fy=args.upscale,
+                                    interpolation=cv2.INTER_CUBIC))
+    print(f"Page {transformed_image.get_array().shape[::-1]}")
+
+    found = {}
+    for detection in BOX_DETECTION:
+        tracemalloc.start()
+        start = time.perf_counter()
+        boxes = get_bounding_boxes(source_image, transformed_image, image_type, detection=detection)
+        seconds = time.perf_counter() - start
+        __, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        found[detection] = [box._box for box in boxes]
+        print(f"{detection.value:>7}: {seconds:.3f}s, peak {peak / 2**20:.1f} MiB, {len(boxes)} boxes")
+
+    for detection, boxes in found.items():
+        matched = [max((iou(box, other) for other in boxes), default=0.0) for box in reference]
+        print(f"{detection.value:>7}: {sum(score >= args.min_iou for score in matched)}/{len(reference)} boxes of the"
+              f" page before upscaling matched with IoU >= {args.min_iou}, mean best IoU"
+              f" {np.mean(matched) if matched else 0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
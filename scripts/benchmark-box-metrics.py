@@ -0,0 +1,60 @@
+# Micro-benchmark of the box spacing metrics on random rectangles against the previous pure Python versions
+import argparse
+import time
+from math import dist
+from statistics import mean
+
+import numpy as np
+
+from hieroglyph.process.box_metrics import mean_neighbour_distance, nearest_neighbour_distances
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", default=5000, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    return parser.parse_args()
+
+
+def python_neighbour_distance(rectangles) -> float:
+    """calculate_average_closest_box_proximity as it was, sorted pairs and math.dist per pair"""
+    ordered = sorted(rectangles, key=lambda r: (r[1], r[0]))
+    return mean(dist((x1 + 0.5 * w1, y1 + 0.5 * h1), (x2 + 0.5 * w2, y2 + 0.5 * h2))
+                for (x1, y1, w1, h1), (x2, y2, w2, h2) in zip(ordered, ordered[1:]))
+
+
+def python_nearest_distances(rectangles) -> list:
+    midpoints = [(x + 0.5 * w, y + 0.5 * h) for x, y, w, h in rectangles]
+    return [min(dist(point, other) for j, other in enumerate(midpoints) if j != i) for i, point in enumerate(midpoints)]
+
+
+def best_time(func, *args, repeat: int):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    args = get_arguments()
+    rng = np.random.default_rng(0)
+    rectangles = np.hstack((rng.integers(0, 4000, (args.boxes, 2)), rng.integers(4, 60, (args.boxes, 2))))
+    as_tuples = [tuple(rectangle) for rectangle in rectangles.tolist()]
+
+    python_seconds, python_value = best_time(python_neighbour_distance, as_tuples, repeat=args.repeat)
+    numpy_seconds, numpy_value = best_time(mean_neighbour_distance, rectangles, repeat=args.repeat)
+    print(f"mean neighbour distance, {args.boxes} boxes: python {python_seconds * 1000:.2f}ms,"
+          f" numpy {numpy_seconds * 1000:.2f}ms ({python_seconds / numpy_seconds:.0f}x),"
+          f" difference {abs(python_value - numpy_value):.2e}")
+
+    python_seconds, python_value = best_time(python_nearest_distances, as_tuples, repeat=1)
+    tree_seconds, tree_value = best_time(nearest_neighbour_distances, rectangles, repeat=args.repeat)
+    print(f"nearest neighbour distances, {args.boxes} boxes: python {python_seconds * 1000:.2f}ms,"
+          f" kd-tree {tree_seconds * 1000:.2f}ms ({python_seconds / tree_seconds:.0f}x),"
+          f" max difference {np.abs(np.array(python_value) - tree_value).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Compare the block/C searches and box engines of diagram box detection: threshold passes, time and identical
+# rectangles against the original grid search over contours
+import argparse
+import base64
+import glob
+import time
+
+import cv2
+import numpy as np
+
+from hieroglyph.utils.image import ImageWrapper
+from hieroglyph.process.image_processing import preprocess_data
+from hieroglyph.process.boxes import BOX_SEARCHES, ThresholdSteps
+from hieroglyph.general import INBOUND_IMAGE_TYPE, BOX_SEARCH, BOX_SEARCH_LOOKAHEAD, BOX_ENGINE
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", nargs="+", default=["./assets/diagrams/*.png", "./assets/ru_diagrams/*",
+                                                       "./assets/found_diagrams/*"], type=str)
+    parser.add_argument("--repeat", default=1, type=int)
+    parser.add_argument("--lookahead", default=BOX_SEARCH_LOOKAHEAD, type=int)
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    files = sorted(file for pattern in args.input for file in glob.glob(pattern))
+    candidates = [(search, engine) for search in BOX_SEARCH for engine in BOX_ENGINE]
+    reference = (BOX_SEARCH.GRID, BOX_ENGINE.CONTOURS)
+    totals = {candidate: [0, 0.0] for candidate in candidates}
+    identical = {candidate: 0 for candidate in candidates}
+    compared = 0
+    for file in files:
+        with open(file, "rb") as f:
+            source_image = ImageWrapper(src_image=base64.b64encode(f.read()).decode(), name=file,
+                                        image_type=INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+        try:
+            transformed_image = preprocess_data(source_image)
+        except Exception as e:
+            print(f"{file} | skipped, preprocessing failed: {e}")
+            continue
+        __, inverted_binary_image = cv2.threshold(transformed_image.to_array(), 0, 255,
+                                                  cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        found = {}
+        line = [file]
+        for search, engine in candidates:
+            timings = []
+            for _ in range(args.repeat):
+                steps = ThresholdSteps(inverted_binary_image, lookahead=args.lookahead, engine=engine)
+                start = time.perf_counter()
+                index = BOX_SEARCHES[search](steps)
+                timings.append(time.perf_counter() - start)
+            found[search, engine] = steps.step(index)[0] if index is not None else np.zeros((0, 4))
+            totals[search, engine][0] += steps.passes
+            totals[search, engine][1] += min(timings)
+            setting = steps.settings[index] if index is not None else None
+            line.append(f"{search.value}/{engine.value}: {steps.passes:>3} passes {min(timings):.3f}s {setting}")
+        for candidate in candidates:
+            identical[candidate] += np.array_equal(found[candidate], found[reference])
+        compared += 1
+        print(" | ".join(line))
+
+    for (search, engine), (passes, seconds) in totals.items():
+        print(f"{search.value:>6}/{engine.value:<10}: {passes} passes, {seconds:.3f}s over {compared} images,"
+              f" identical rectangles on {identical[search, engine]}/{compared}")
+
+
+if __name__ == "__main__":
+    main()
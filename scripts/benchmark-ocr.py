@@ -0,0 +1,55 @@
+# Compare OCR modes side by side on the same detected boxes of a single page
+import argparse
+import base64
+import time
+from types import SimpleNamespace
+
+from hieroglyph.process import process_data
+from hieroglyph.ocr.image_ocr import get_text_from_images
+from hieroglyph.general import INBOUND_IMAGE_TYPE, OCR_MODE, OCR_EXECUTOR, OCR_QUALITY, internal_language_mapping
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="./assets/diagrams/diagrams.1.png", type=str)
+    parser.add_argument("--image-type", default="diagram", type=str)
+    parser.add_argument("--lang", default="chinese", type=str)
+    parser.add_argument("--conf-threshold", default=0, type=int)
+    parser.add_argument("--repeat", default=1, type=int)
+    parser.add_argument("--executor", default="thread", choices=[e.value for e in OCR_EXECUTOR])
+    parser.add_argument("--quality", default="default", choices=[q.value for q in OCR_QUALITY])
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    with open(args.input, "rb") as f:
+        b64data = base64.b64encode(f.read()).decode()
+    request = SimpleNamespace(name=args.input, b64data=b64data, image_type=INBOUND_IMAGE_TYPE(args.image_type),
+                              density_scale=None, box_scale=None)
+    language = internal_language_mapping(args.lang).to_ocr()
+    start = time.perf_counter()
+    source_image_to_boxes = process_data(request)
+    print(f"Box detection: {time.perf_counter() - start:.3f}s,"
+          f" {sum(len(boxes) for boxes in source_image_to_boxes.values())} boxes")
+
+    results = {}
+    for ocr_mode in OCR_MODE:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            pages = get_text_from_images(source_image_to_boxes, language, args.conf_threshold, ocr_mode=ocr_mode,
+                                         executor=OCR_EXECUTOR(args.executor), quality=OCR_QUALITY(args.quality))
+            timings.append(time.perf_counter() - start)
+        results[ocr_mode] = pages
+        print(f"{ocr_mode.value:>5}: best {min(timings):.3f}s over {args.repeat} run(s),"
+              f" {sum(len(page.data) for page in pages)} boxes with text")
+
+    crop_boxes = {tuple(box.bounding_box): box.text for page in results[OCR_MODE.CROP] for box in page.data}
+    page_boxes = {tuple(box.bounding_box): box.text for page in results[OCR_MODE.PAGE] for box in page.data}
+    matching = sum(1 for box, text in crop_boxes.items() if page_boxes.get(box) == text)
+    print(f"Identical text in {matching}/{len(crop_boxes)} crop boxes")
+
+
+if __name__ == "__main__":
+    main()
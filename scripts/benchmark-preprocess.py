@@ -0,0 +1,71 @@
+# Compare the Pillow engine with preprocessing pipelines of the fused one: time and bytes per stage, peak traced
+# memory and how many pixels differ from the Pillow engine, with the page triage class of every image
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from hieroglyph.general import INBOUND_IMAGE_TYPE, PREPROCESS_ENGINE
+from hieroglyph.process.image_processing import preprocess_data
+from hieroglyph.process.page_triage import triage_page
+from hieroglyph.process.preprocessing import PIPELINES, PreprocessPipeline
+from hieroglyph.utils.image import ImageWrapper
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time the Pillow engine and preprocessing pipelines on a folder of images")
+    parser.add_argument("--folder", default="assets/diagrams", help="Folder of page images")
+    parser.add_argument("--glob", default="*.png", help="Images of the folder to use")
+    parser.add_argument("--repeat", type=int, default=1, help="Preprocess each image this many times per run")
+    parser.add_argument("--pipeline", nargs="+", default=list(PIPELINES),
+                        help="Pipelines of the fused engine to time, names or JSON lists of stages")
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    pipelines = [None] + [PreprocessPipeline.parse(spec) for spec in args.pipeline]
+    runs = ["pil"] + [f"{pipeline.name}/{index}" for index, pipeline in enumerate(pipelines[1:], start=1)]
+    totals = {run: {} for run in runs}
+    peaks = {run: 0 for run in runs}
+    for path in sorted(Path(args.folder).glob(args.glob)):
+        image_array = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image_array is None:
+            continue
+        page_class, measures = triage_page(image_array)
+        print(f"{path.name:32} {'triage':12} {measures.pop('seconds') * 1000:8.1f}ms {page_class.value}  "
+              + " ".join(f"{name}={value}" for name, value in measures.items()))
+        source_image = ImageWrapper(src_image=image_array, name=path.name, image_type=INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+        reference = None
+        for run, pipeline in zip(runs, pipelines):
+            engine = PREPROCESS_ENGINE.PIL if pipeline is None else PREPROCESS_ENGINE.FUSED
+            tracemalloc.start()
+            start = time.perf_counter()
+            for __ in range(args.repeat):
+                profile = {}
+                output = preprocess_data(source_image, engine=engine, pipeline=pipeline, profile=profile).get_array()
+            elapsed = (time.perf_counter() - start) / args.repeat
+            __, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            reference = output if reference is None else reference
+            totals[run]["total"] = totals[run].get("total", 0.0) + elapsed
+            for stage in profile["stages"]:
+                totals[run][stage["stage"]] = totals[run].get(stage["stage"], 0.0) + stage["seconds"]
+            peaks[run] = max(peaks[run], peak)
+            stages = " ".join(f"{stage['stage']} {stage['seconds'] * 1000:.1f}ms/{stage['bytes'] / 2 ** 20:.1f}MB"
+                              + "".join(f" {key}={value}" for key, value in stage.items()
+                                        if key not in ("stage", "seconds", "bytes", "peak_bytes"))
+                              for stage in profile["stages"])
+            differ = "shape differs" if output.shape != reference.shape else \
+                f"{np.count_nonzero(output != reference):7} px differ"
+            print(f"{path.name:32} {run:12} {elapsed * 1000:8.1f}ms peak {peak / 2 ** 20:6.1f}MB {differ}  {stages}")
+    for run in runs:
+        stages = " ".join(f"{stage} {seconds:.2f}s" for stage, seconds in totals[run].items() if stage != "total")
+        print(f"Total {run:12} {totals[run].get('total', 0.0):.2f}s, largest peak {peaks[run] / 2 ** 20:.1f}MB  {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional, Any
 
-from hieroglyph.pipeline import (process_ocr, validate_input_ocr_data,
+from hieroglyph.pipeline import (process_ocr, request_deadline, validate_input_ocr_data,
                                 validate_input_pipeline_data, validate_input_translate_data)
 from hieroglyph.models import (PipelineRequestData, OCRRequestData, BatchPipelineRequestData, TranslateRequestData,
                               BulkTranslateRequestData, BatchPipelineStatusRequestData, PageStateModel, DBLoadAttrs, Inputb64)
@@ -25,6 +25,13 @@ from hieroglyph.translation.translator import Translator
 from hieroglyph.translation import translate_page_data
 from hieroglyph.utils.text import TextWrapper
 from hieroglyph.general import INBOUND_IMAGE_TYPE
+from hieroglyph.utils.scheduler import ocr_scheduler
+from hieroglyph.ocr.engine_pool import engine_pool
+from hieroglyph.ocr.cache import ocr_cache
+from hieroglyph.process.page_cache import page_cache
+from hieroglyph.utils.artifacts import artifact_writer
+from hieroglyph.ocr.box_triage import box_triage_stats
+from hieroglyph.process.page_triage import page_triage_stats
 # from hieroglyph.boxes import find_table_rectangles
 # Database Imports
 import pymongo
@@ -86,19 +93,45 @@ def info_route():
             "model_loaded": translator.model_loaded}
 
 
+@app.get("/ocr-stats")
+def ocr_stats_route():
+    """
+    Report the state of the process wide OCR worker budget and tesseract engines
+    {
+        "scheduler": {"budget": 0, "running": 0, "queued": 0, "queued_sessions": 0, "submitted": 0, ...},
+        "engines": {"engines": 0, "max_engines": 0, "checked_out": 0, "idle": 0, "evicted": 0},
+        "cache": {"enabled": true, "entries": 0, "bytes": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, ...},
+        "triage": {"classified": 0, "skipped": 0, "psm_changed": 0, "retried": 0, "class_blank": 0, ...},
+        "pages": {"enabled": true, "entries": 0, "bytes": 0, "max_bytes": 0, "hits": 0, "misses": 0, "evictions": 0},
+        "page_triage": {"classified": 0, "routed": 0, "seconds": 0.0, "class_clean": 0, "class_noisy": 0, ...},
+        "artifacts": {"enabled": false, "every": 1, "waiting": 0, "queued": 0, "written": 0, "dropped": 0, ...}
+    }
+    """
+    logger.info("API endpoint 'ocr-stats' request received")
+    return {"scheduler": ocr_scheduler.stats(),
+            "engines": engine_pool.stats(),
+            "cache": ocr_cache.stats(),
+            "triage": box_triage_stats.stats(),
+            "pages": page_cache.stats(),
+            "page_triage": page_triage_stats.stats(),
+            "artifacts": artifact_writer.stats()}
+
+
 def _single_pipe_processing(input_image_data: PipelineRequestData):
     debug_mode = True if logger.getEffectiveLevel() == logging.DEBUG else False
 
     input_image_data = validate_input_pipeline_data(input_image_data)
     logging.info(f"API endpoint 'pipeline' request received for: {input_image_data.image_type.value}")
+    deadline = request_deadline(input_image_data)
 
-    output_image_data, image_to_transforms_map = process_ocr(input_image_data, debug=debug_mode or input_image_data.overlay.lower() == "true")
+    output_image_data, image_to_transforms_map = process_ocr(input_image_data, debug=debug_mode or input_image_data.overlay.lower() == "true",
+                                                             deadline=deadline)
     logger.debug(f"Receive Image Type of {input_image_data.image_type.value} on /pipeline Endpoint")
     logger.debug(f"**Debugging all available output_image_data: {sum(len(boxes.data) for boxes in output_image_data)}")
     all_pages = []
     for page in output_image_data:
         data = translate_page_data(textwrapper=page, lang_in=input_image_data.src_lang,
-                                   lang_out=input_image_data.dst_lang, translator=translator)
+                                   lang_out=input_image_data.dst_lang, translator=translator, deadline=deadline)
         page_dict = {
             'metadata': input_image_data.metadata,
             **data
@@ -109,7 +142,7 @@ def _single_pipe_processing(input_image_data: PipelineRequestData):
         if input_image_data.overlay.lower() == "true":  # Uses overlay flag
             if page_image := next((page for page in image_to_transforms_map.keys() if page.name == page_dict['name']), None):
                 logger.debug(f"Overlaying image: {page_image.name}")
-                overlay_data = page.overlay(page_image.get_array(), debug=debug_mode)
+                overlay_data = page.overlay(page_image.to_array(), debug=debug_mode)
                 page_dict['b64_overlay'] = overlay_data
 
         all_pages.append(page_dict)
@@ -131,16 +164,23 @@ def pipeline_route(input_image_data: PipelineRequestData):
         "density_scale": 1 [OPTIONAL] scale for the boxes from 1-10 with 1 being less dense boxes and 10 being more dense boxes
         "overlay": "False" [OPTIONAL] default False, triggers return of base64 overlay of image
         "conf_threshold": 50 [OPTIONAL] Scale 0-100 to sets the confidence threshold dynamically to adjust the tolerance level of OCR
+        "ocr_quality": "default" [OPTIONAL] 'fast', 'default', 'best' or 'legacy' tessdata and engine mode (default OCR_QUALITY)
+        "deadline": 30 [OPTIONAL] seconds to spend on the page, boxes left when it expires are skipped (default PAGE_DEADLINE_SECONDS)
+        "preprocess": "standard" [OPTIONAL] 'standard', 'fast', 'clean', 'photo' or a list of stages like [{"stage": "threshold", "value": 127}] (default PREPROCESS_PIPELINE)
     }
     Returns
     [{
         "name": "name of the image to ocr, inferring filetype here",
         "language": "language we recognized characters from when doing OCR"
+        "truncated": false, # the deadline expired before every box was OCRed and translated
+        "processing": {"pipeline": "fast", "cached": false, "seconds": 0.0, "stages": [{"stage": "", "seconds": 0.0, "bytes": 0}],
+                       "triage": {"class": "clean", "routed": true, "noise": 0.0, "palette": 0.0, "blockiness": 0.0, "straightness": 0.0, "seconds": 0.0}}, # triage only without a preprocess field
         "data": [
             {
                 "text": "",
                 "translation": "",
                 "bounding_box": [x, y, w, h], # x, y, width, height of text box
+                "words": [{"text": "", "confidence": 0.0, "bounding_box": [x, y, w, h]}] # IF OCR_RESULT_LEVEL is word/symbol
             }
         ]
         "metadata": {},
@@ -166,15 +206,22 @@ def ocr_route(input_image_data: OCRRequestData):
         "density_scale": 1 [OPTIONAL] scale for the boxes from 1-10 with 1 being less dense boxes and 10 being more dense boxes
         "overlay": "False" [OPTIONAL] default False, triggers return of base64 overlay of image
         "conf_threshold": 50 [OPTIONAL] Scale 0-99 to sets the confidence threshold dynamically to adjust the tolerance level of OCR
+        "ocr_quality": "default" [OPTIONAL] 'fast', 'default', 'best' or 'legacy' tessdata and engine mode (default OCR_QUALITY)
+        "deadline": 30 [OPTIONAL] seconds to spend on the page, boxes left when it expires are skipped (default PAGE_DEADLINE_SECONDS)
+        "preprocess": "standard" [OPTIONAL] 'standard', 'fast', 'clean', 'photo' or a list of stages like [{"stage": "threshold", "value": 127}] (default PREPROCESS_PIPELINE)
     }
     Returns
     [{
         "name": "name of the image to ocr, inferring filetype here",
         # "language": "language we recognized characters from when doing OCR"
+        "truncated": false, # the deadline expired before every box was OCRed
+        "processing": {"pipeline": "fast", "cached": false, "seconds": 0.0, "stages": [{"stage": "", "seconds": 0.0, "bytes": 0}],
+                       "triage": {"class": "clean", "routed": true, "noise": 0.0, "palette": 0.0, "blockiness": 0.0, "straightness": 0.0, "seconds": 0.0}}, # triage only without a preprocess field
         "data": [
             {
                 "text": "",
                 "bounding_box": [x, y, w, h], # x, y, width, height of text box
+                "words": [{"text": "", "confidence": 0.0, "bounding_box": [x, y, w, h]}] # IF OCR_RESULT_LEVEL is word/symbol
             }
         ]
         "metadata": {},
@@ -368,14 +415,16 @@ def _background_job_processing(batch_input_image_data: BatchPipelineRequestData,
             output_location = location_query.output_location
 
             logger.debug(f"Processing: {image_data}")
-            output_image_data, image_to_transforms_map = process_ocr(image_data, debug=debug_mode or image_data.overlay.lower() == "true")
+            deadline = request_deadline(image_data)
+            output_image_data, image_to_transforms_map = process_ocr(image_data, debug=debug_mode or image_data.overlay.lower() == "true",
+                                                                     deadline=deadline)
             logger.debug(f"Received Image Type of {image_data.image_type.value} on /batch-pipeline Endpoint")
 
             logger.debug(f"**Debugging all available output_image_data: {sum(len(boxes.data) for boxes in output_image_data)}")
             all_pages = []
             for page in output_image_data:
                 data = translate_page_data(textwrapper=page, lang_in=image_data.src_lang,
-                                           lang_out=image_data.dst_lang, translator=translator)
+                                           lang_out=image_data.dst_lang, translator=translator, deadline=deadline)
                 page_dict = {
                     'metadata': image_data.metadata,
                     **data
@@ -385,7 +434,7 @@ def _background_job_processing(batch_input_image_data: BatchPipelineRequestData,
                     #  the page_dict TextWrapper so we can overlay text on the image
                     if page_image := next((page for page in image_to_transforms_map.keys() if page.name == page_dict['name']), None):
                         logger.debug(f"Overlaying image: {page_image.name}")
-                        page_dict['b64_overlay'] = page.overlay(page_image.get_array(), debug=debug_mode)
+                        page_dict['b64_overlay'] = page.overlay(page_image.to_array(), debug=debug_mode)
                 all_pages.append(page_dict)
             all_processed_image_data.extend(all_pages)
 
@@ -728,12 +777,14 @@ async def bulk_pipeline_route(files: List[UploadFile] = File(...)):
                 overlay="False"
             )
 
-            output_pages, _ = process_ocr(pipeline_input)
+            deadline = request_deadline(pipeline_input)
+            output_pages, _ = process_ocr(pipeline_input, deadline=deadline)
             translated = translate_page_data(
                 textwrapper=output_pages[0],  # assuming single-page image
                 lang_in="chinese",
                 lang_out="english",
-                translator=translator
+                translator=translator,
+                deadline=deadline
             )
 
             results.append({
@@ -1,10 +1,16 @@
 import multiprocessing
 from enum import Enum
+from os import getenv
 import re
 
 
-# MAX_WORKERS = cpu_count - 1 if (cpu_count := multiprocessing.cpu_count()) > 1 else cpu_count
-MAX_WORKERS = 4
+# Process wide number of OCR tasks allowed to run at once, shared by every in flight request
+MAX_WORKERS = int(getenv("OCR_WORKERS", "0")) or multiprocessing.cpu_count()
+# Tesseract engines kept by a process over every language, psm and quality, idle engines of the least recently used
+#  settings are ended to stay under it
+ENGINE_POOL_SIZE = int(getenv("ENGINE_POOL_SIZE", "0")) or 2 * MAX_WORKERS
+# Seconds a box waits for a busy tesseract engine before its OCR fails
+ENGINE_CHECKOUT_TIMEOUT = float(getenv("ENGINE_CHECKOUT_TIMEOUT", "60"))
 
 
 # Enum Type
@@ -18,6 +24,170 @@ class INBOUND_IMAGE_TYPE(Enum):
     TABLE_BASED = "table"
 
 
+# Enum Type
+# This enumerator signals how boxes are handed to tesseract, either each
+# box as its own cropped image or the whole page set once per engine
+# with a rectangle per box
+class OCR_MODE(Enum):
+    CROP = "crop"
+    PAGE = "page"
+
+
+DEFAULT_OCR_MODE = OCR_MODE(getenv("OCR_MODE", OCR_MODE.CROP.value))
+
+
+# Enum Type
+# This enumerator signals where box OCR runs, in a thread pool of the
+# API process or in a persistent pool of OCR worker processes
+class OCR_EXECUTOR(Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+DEFAULT_OCR_EXECUTOR = OCR_EXECUTOR(getenv("OCR_EXECUTOR", OCR_EXECUTOR.THREAD.value))
+OCR_PROCESSES = int(getenv("OCR_PROCESSES", "0")) or MAX_WORKERS
+
+# Memory budget and optional directory of the OCR result cache, a budget of 0 and no directory disables it
+OCR_CACHE_BYTES = int(getenv("OCR_CACHE_BYTES", str(64 * 1024 * 1024)))
+OCR_CACHE_DIR = getenv("OCR_CACHE_DIR", "")
+
+# Enum Type
+# This enumerator signals the granularity of box OCR results, one text
+# and mean confidence per box (line) or per word/symbol arrays with
+# bounding boxes collected from the same tesseract pass
+class OCR_RESULT_LEVEL(Enum):
+    LINE = "line"
+    WORD = "word"
+    SYMBOL = "symbol"
+
+
+DEFAULT_OCR_RESULT_LEVEL = OCR_RESULT_LEVEL(getenv("OCR_RESULT_LEVEL", OCR_RESULT_LEVEL.LINE.value))
+
+# Enum Type
+# This enumerator signals the speed/quality trade off of box OCR, picking
+# the tessdata variant and tesseract engine mode used for a request
+class OCR_QUALITY(Enum):
+    FAST = "fast"
+    DEFAULT = "default"
+    BEST = "best"
+    LEGACY = "legacy"
+
+
+DEFAULT_OCR_QUALITY = OCR_QUALITY(getenv("OCR_QUALITY", OCR_QUALITY.DEFAULT.value))
+# Directories of the tessdata_fast and tessdata_best models, the default quality reads TESSDATA_PREFIX
+TESSDATA_FAST_DIR = getenv("TESSDATA_FAST_DIR", "")
+TESSDATA_BEST_DIR = getenv("TESSDATA_BEST_DIR", "")
+
+# Default time budget of a page in seconds, requests may set their own 'deadline'. 0 disables it
+PAGE_DEADLINE_SECONDS = float(getenv("PAGE_DEADLINE_SECONDS", "0"))
+
+# Enum Type
+# This enumerator signals how diagram box detection looks for its adaptive
+# threshold block and C, every setting in order or a bisection per block
+class BOX_SEARCH(Enum):
+    GRID = "grid"
+    BISECT = "bisect"
+
+
+DEFAULT_BOX_SEARCH = BOX_SEARCH(getenv("BOX_SEARCH", BOX_SEARCH.BISECT.value))
+# Candidates the box search thresholds speculatively alongside the one it needs next, 0 searches sequentially
+BOX_SEARCH_LOOKAHEAD = int(getenv("BOX_SEARCH_LOOKAHEAD", str(min(3, MAX_WORKERS - 1))))
+
+# Enum Type
+# This enumerator signals the resolution box detection runs at, the full
+# page or a downscaled copy whose boxes are refined on the full page
+class BOX_DETECTION(Enum):
+    FULL = "full"
+    PYRAMID = "pyramid"
+
+
+DEFAULT_BOX_DETECTION = BOX_DETECTION(getenv("BOX_DETECTION", BOX_DETECTION.FULL.value))
+# Longest side of the downscaled copy used by pyramid detection, smaller pages are detected as they are
+BOX_DETECTION_MAX_SIDE = int(getenv("BOX_DETECTION_MAX_SIDE", "1600"))
+
+# Enum Type
+# This enumerator signals how box detection reads rectangles from a binary
+# mask, outer contours or connected components of the hole filled mask
+class BOX_ENGINE(Enum):
+    CONTOURS = "contours"
+    COMPONENTS = "components"
+
+
+DEFAULT_BOX_ENGINE = BOX_ENGINE(getenv("BOX_ENGINE", BOX_ENGINE.CONTOURS.value))
+
+# Enum Type
+# This enumerator signals how table pages are split into cell boxes, img2table
+# (which OCRs the page to build its tables) or ruling lines found with morphology
+class TABLE_ENGINE(Enum):
+    IMG2TABLE = "img2table"
+    GRID = "grid"
+
+
+DEFAULT_TABLE_ENGINE = TABLE_ENGINE(getenv("TABLE_ENGINE", TABLE_ENGINE.GRID.value))
+
+# Boxes overlapping a larger box by this intersection over union are dropped before OCR, 0 keeps every box
+BOX_DEDUP_IOU = float(getenv("BOX_DEDUP_IOU", "0.7"))
+# Boxes with this share of their area inside a box of at most twice their size are dropped as well
+BOX_DEDUP_CONTAINMENT = float(getenv("BOX_DEDUP_CONTAINMENT", "0.9"))
+
+# Enum Type
+# This enumerator signals how pages are preprocessed before box detection, through
+# the Pillow enhancers or as lookup tables and OpenCV calls on one array
+class PREPROCESS_ENGINE(Enum):
+    PIL = "pil"
+    FUSED = "fused"
+
+
+DEFAULT_PREPROCESS_ENGINE = PREPROCESS_ENGINE(getenv("PREPROCESS_ENGINE", PREPROCESS_ENGINE.FUSED.value))
+
+# Enum Type
+# This enumerator signals how the fused preprocessing engine denoises a page, auto picks
+# one from the page itself
+class DENOISER(Enum):
+    AUTO = "auto"
+    COLORED = "colored"
+    GRAY = "gray"
+    TILED = "tiled"
+    MORPHOLOGY = "morphology"
+    NONE = "none"
+
+
+DEFAULT_DENOISER = DENOISER(getenv("DENOISER", DENOISER.AUTO.value))
+# Ink blobs and paper holes smaller than this many pixels are removed from binary pages by the morphology denoiser
+DENOISE_SPECK_AREA = int(getenv("DENOISE_SPECK_AREA", "2"))
+# Side of the tiles the tiled denoiser spreads over the OCR workers
+DENOISE_TILE_SIZE = int(getenv("DENOISE_TILE_SIZE", "512"))
+# Longest side of the thumbnail the skew angle is estimated on, 0 estimates it on the whole page
+DESKEW_MAX_SIZE = int(getenv("DESKEW_MAX_SIZE", "768"))
+# Pages skewed by less than this many degrees are not rotated
+DESKEW_TOLERANCE = float(getenv("DESKEW_TOLERANCE", "1.0"))
+# Preprocessing pipeline of each image type, the name of a pipeline of hieroglyph/process/preprocessing.py or
+# a JSON list of stages. PREPROCESS_PIPELINE_<TYPE> overrides PREPROCESS_PIPELINE for one image type
+PREPROCESS_PIPELINES = {image_type: getenv(f"PREPROCESS_PIPELINE_{image_type.value.upper()}",
+                                           getenv("PREPROCESS_PIPELINE", "standard"))
+                        for image_type in INBOUND_IMAGE_TYPE}
+# Look at each page before preprocessing and send clean, straight digital images to PREPROCESS_TRIAGE_PIPELINE
+#  instead of the pipeline of their image type. Pages of requests with their own preprocess field are not triaged
+PREPROCESS_TRIAGE = getenv("PREPROCESS_TRIAGE", "true").lower() == "true"
+PREPROCESS_TRIAGE_PIPELINE = getenv("PREPROCESS_TRIAGE_PIPELINE", "fast")
+# Trace the peak Python heap of each preprocessing stage with tracemalloc, process wide and slow
+PREPROCESS_TRACE_MEMORY = getenv("PREPROCESS_TRACE_MEMORY", "false").lower() == "true"
+
+# Memory budget of decoded, preprocessed and thresholded pages kept for repeat requests, 0 disables it
+PAGE_CACHE_BYTES = int(getenv("PAGE_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+# Debug images of the boxes found on a page, written in the background for 1 in DEBUG_ARTIFACTS_EVERY pages.
+#  Images of boxes tesseract failed on are always written. Artifacts arriving while DEBUG_ARTIFACTS_QUEUE
+#  are waiting to be written are dropped
+DEBUG_ARTIFACTS = getenv("DEBUG_ARTIFACTS", "false").lower() == "true"
+DEBUG_ARTIFACTS_EVERY = int(getenv("DEBUG_ARTIFACTS_EVERY", "1"))
+DEBUG_ARTIFACTS_QUEUE = int(getenv("DEBUG_ARTIFACTS_QUEUE", "8"))
+DEBUG_ARTIFACTS_DIR = getenv("DEBUG_ARTIFACTS_DIR", "assets/DEBUG")
+
+# Classify box crops before OCR to skip empty ones and choose a segmentation mode up front
+OCR_BOX_TRIAGE = getenv("OCR_BOX_TRIAGE", "true").lower() == "true"
+
+
 # Assists with the conversion of human-readable language tags
 # such as 'Chinese' to the tags required for the pipeline such as 'chi_sim' or 'zho'
 # and 'English' to 'eng' or 'en as appropriate
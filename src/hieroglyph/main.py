@@ -7,6 +7,10 @@ from os import getenv
 
 from hieroglyph.api import app, translator
 from hieroglyph.utils import get_log_level
+from hieroglyph.general import internal_language_mapping, INBOUND_IMAGE_TYPE, DEFAULT_OCR_QUALITY
+from hieroglyph.ocr.engine_pool import engine_pool
+from hieroglyph.ocr.quality import engine_settings
+from hieroglyph.ocr.image_ocr import default_psm, ENGINE_VARIABLES
 
 log_level = get_log_level(getenv("LOG_LEVEL", "DEBUG"))
 
@@ -20,6 +24,7 @@ initial_port = int(getenv("INIT_PORT", "8088"))
 number_of_workers = int(getenv("WORKER_COUNT", "4"))
 initial_language = getenv("INIT_LANG", "chinese")
 model_dir = Path(getenv("MODEL_DIR", "/models"))
+warm_engines = int(getenv("OCR_WARM_ENGINES", "1"))
 
 if initial_port not in range(0, 65535):
     print(f"error: provided port number not in range 0-65535: '{initial_port}'")
@@ -29,5 +34,19 @@ translator.configure(models_dir=model_dir, language=initial_language)
 
 translator.setup()
 
+if warm_engines > 0:
+    # Engines that cannot be built now are built, or fail, with the first request that needs them
+    try:
+        warm_lang = internal_language_mapping(initial_language).to_ocr()
+        warm_path, warm_oem = engine_settings(DEFAULT_OCR_QUALITY, warm_lang)
+        engine_pool.warm_up(lang=warm_lang,
+                            psms={default_psm(image_type) for image_type in INBOUND_IMAGE_TYPE},
+                            variables=ENGINE_VARIABLES,
+                            count=warm_engines,
+                            path=warm_path,
+                            oem=warm_oem)
+    except Exception as e:
+        logger.warning(f"Could not warm up tesseract engines for {initial_language}, continuing without: {e}")
+
 if __name__ == '__main__':
     uvicorn.run("__main__:app", host="0.0.0.0", port=initial_port, workers=number_of_workers)
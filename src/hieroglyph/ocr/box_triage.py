@@ -0,0 +1,99 @@
+# Cheap pre-OCR look at a box crop to skip boxes with nothing to read and pick a segmentation mode up front
+import threading
+from enum import Enum
+from typing import Dict
+
+import cv2
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Below this share of ink pixels the box is considered empty
+MIN_INK_RATIO = 0.002
+# Components smaller than this many pixels are speckles, not strokes
+MIN_COMPONENT_AREA = 3
+# The largest component must reach this many pixels in height or width to be a glyph. The size is absolute, not a
+#  share of the box, so paragraphs and table cells of small text are not mistaken for speckles
+MIN_GLYPH_SIZE = 5
+# A lone component this wide and flat is a ruling line or a box border
+LINE_MIN_WIDTH_SHARE = 0.9
+LINE_MAX_HEIGHT_SHARE = 0.25
+
+
+# Enum Type
+# Outcome of looking at a box crop before sending it to tesseract
+class BOX_CLASS(Enum):
+    BLANK = "blank"
+    NOISE = "noise"
+    LINE = "line"
+    TEXT = "text"
+    MULTI_LINE_TEXT = "multi_line_text"
+
+
+SKIPPED_BOX_CLASSES = {BOX_CLASS.BLANK, BOX_CLASS.NOISE, BOX_CLASS.LINE}
+
+
+def classify_box(crop: np.ndarray) -> BOX_CLASS:
+    """Classify a grayscale box crop from its ink density, connected components and aspect ratio"""
+    height, width = crop.shape[:2]
+    if height < 3 or width < 3:
+        return BOX_CLASS.NOISE
+    __, ink = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink_pixels = cv2.countNonZero(ink)
+    # Ink is whatever is in the minority, so light text on a dark fill is treated like dark text on white
+    if ink_pixels > ink.size // 2:
+        ink = cv2.bitwise_not(ink)
+        ink_pixels = ink.size - ink_pixels
+    if ink_pixels < MIN_INK_RATIO * ink.size:
+        return BOX_CLASS.BLANK
+
+    num_labels, __, stats, __ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    stats = stats[1:]  # label 0 is the background
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= MIN_COMPONENT_AREA]
+    if not len(stats):
+        return BOX_CLASS.NOISE
+    component_heights = stats[:, cv2.CC_STAT_HEIGHT]
+    component_widths = stats[:, cv2.CC_STAT_WIDTH]
+    if component_heights.max() < MIN_GLYPH_SIZE and component_widths.max() < MIN_GLYPH_SIZE:
+        return BOX_CLASS.NOISE
+    if len(stats) == 1 and component_widths[0] >= LINE_MIN_WIDTH_SHARE * width \
+            and component_heights[0] <= LINE_MAX_HEIGHT_SHARE * height and width > 4 * height:
+        return BOX_CLASS.LINE
+
+    return BOX_CLASS.MULTI_LINE_TEXT if _count_text_rows(ink, int(np.median(component_heights))) > 1 else BOX_CLASS.TEXT
+
+
+def _count_text_rows(ink: np.ndarray, typical_height: int) -> int:
+    """Count bands of inked rows tall enough to hold text, using the horizontal projection of the box"""
+    inked_rows = np.concatenate(([0], (ink.any(axis=1)).astype(np.int8), [0]))
+    edges = np.diff(inked_rows)
+    band_heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    return int(np.count_nonzero(band_heights >= max(2, typical_height // 2)))
+
+
+class BoxTriageStats:
+    """Thread safe counters of boxes skipped, given a different psm up front or OCRed twice"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"classified": 0, "skipped": 0, "psm_changed": 0, "retried": 0,
+                                          **{f"class_{box_class.value}": 0 for box_class in BOX_CLASS}}
+
+    def record(self, box_class: BOX_CLASS, psm_changed: bool = False):
+        with self._lock:
+            self._counters["classified"] += 1
+            self._counters[f"class_{box_class.value}"] += 1
+            self._counters["skipped"] += box_class in SKIPPED_BOX_CLASSES
+            self._counters["psm_changed"] += psm_changed
+
+    def record_retry(self):
+        with self._lock:
+            self._counters["retried"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+box_triage_stats = BoxTriageStats()
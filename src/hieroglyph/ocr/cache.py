@@ -0,0 +1,129 @@
+# Content addressed cache of box OCR results so identical crops are only sent to tesseract once
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from hieroglyph.general import OCR_CACHE_BYTES, OCR_CACHE_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Rough python object overhead of a cached result on top of its text
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class OCRResultCache:
+    """
+    Two tier cache of _ocr results, keyed by a hash of the crop pixels and the OCR settings
+    {
+        max_bytes: int # memory budget of the LRU tier, 0 keeps nothing in memory
+        directory: Path | None # optional on disk tier that survives restarts
+        _entries: {key: ([{"text": "", "conf": 0.0}], size in bytes)} # LRU tier, least recently used first
+    }
+    """
+
+    def __init__(self, max_bytes: int = OCR_CACHE_BYTES, directory: Optional[str] = OCR_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory: Path | None = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[List[Dict[str, str | float]], int]]" = OrderedDict()
+        self._bytes = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.directory is not None
+
+    @staticmethod
+    def make_key(crop: np.ndarray, *settings) -> str:
+        """Hash the crop pixels, its shape and every OCR setting that can change the result"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((crop.shape, crop.dtype.str, settings)).encode())
+        digest.update(np.ascontiguousarray(crop).data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, str | float]]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return _copy_result(self._entries[key][0])
+        if (result := self._read_disk(key)) is not None:
+            with self._lock:
+                self._counters["disk_hits"] += 1
+            self._store_memory(key, result)
+            return _copy_result(result)
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, result: List[Dict[str, str | float]]):
+        result = _copy_result(result)
+        self._store_memory(key, result)
+        self._write_disk(key, result)
+
+    def _store_memory(self, key: str, result: List[Dict[str, str | float]]):
+        size = ENTRY_OVERHEAD_BYTES + sum(len(str(char["text"]).encode()) for char in result)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                __, (__, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[List[Dict[str, str | float]]]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable OCR cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, result: List[Dict[str, str | float]]):
+        if not self.directory:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Write then rename so a concurrent reader never sees a partial entry
+            with NamedTemporaryFile("w", encoding="utf8", dir=path.parent, delete=False) as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(f.name, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key}: {e}")
+
+    def stats(self) -> Dict[str, int | bool]:
+        with self._lock:
+            return {"enabled": self.enabled,
+                    "disk": bool(self.directory),
+                    "entries": len(self._entries),
+                    "bytes": self._bytes,
+                    "max_bytes": self.max_bytes,
+                    **self._counters}
+
+
+def _copy_result(result: List[Dict[str, str | float]]) -> List[Dict[str, str | float]]:
+    """Callers strip text in place, never hand out the cached dicts themselves"""
+    return [dict(char) for char in result]
+
+
+ocr_cache = OCRResultCache()
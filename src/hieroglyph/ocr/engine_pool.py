@@ -0,0 +1,206 @@
+# Pool of initialised tesserocr engines so tessdata is loaded once per engine rather than once per box
+import threading
+import time
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tesserocr import PyTessBaseAPI, OEM
+
+from hieroglyph.general import MAX_WORKERS, ENGINE_CHECKOUT_TIMEOUT, ENGINE_POOL_SIZE
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+EngineKey = Tuple[str, int, Tuple[Tuple[str, str], ...], str, int]
+
+
+class TesseractEnginePool:
+    """
+    Bounded pool of PyTessBaseAPI engines keyed by (lang, psm, variables, tessdata path, oem). Once max_engines
+    are built, a key needing a new engine ends an idle engine of the least recently used other key
+    {
+        max_engines_per_key: int # upper bound of engines built for a single key
+        max_engines: int # upper bound of engines built over every key
+        checkout_timeout: float # seconds checkout() waits for a busy engine before raising TimeoutError
+        _idle: {EngineKey: LifoQueue} # engines waiting to be checked out, most recently used first
+        _slots: {EngineKey: BoundedSemaphore} # remaining engines that may still be built for a key
+        _checked_out: {id(engine): (EngineKey, thread ident)} # current owner of every engine in use
+        _last_used: {EngineKey: float} # time.monotonic() of the last checkout or checkin of each key
+        _built: int # engines built or being built, counted against max_engines
+    }
+    An engine belongs to exactly one thread between checkout() and checkin()
+    """
+
+    def __init__(self, max_engines_per_key: int = MAX_WORKERS, checkout_timeout: float = ENGINE_CHECKOUT_TIMEOUT,
+                 max_engines: int = ENGINE_POOL_SIZE):
+        self.max_engines_per_key = max_engines_per_key
+        self.max_engines = max_engines
+        self.checkout_timeout = checkout_timeout
+        self._lock = threading.Lock()
+        self._idle: Dict[EngineKey, LifoQueue] = {}
+        self._slots: Dict[EngineKey, threading.BoundedSemaphore] = {}
+        self._checked_out: Dict[int, Tuple[EngineKey, int]] = {}
+        self._all_engines: List[PyTessBaseAPI] = []
+        self._last_used: Dict[EngineKey, float] = {}
+        self._built = 0
+        self._evicted = 0
+
+    @staticmethod
+    def make_key(lang: str, psm: int, variables: Optional[Dict[str, str]] = None,
+                 path: Optional[str] = None, oem: int = OEM.DEFAULT) -> EngineKey:
+        return (lang, int(psm), tuple(sorted((variables or {}).items())), path or "", int(oem))
+
+    def _queues_for(self, key: EngineKey) -> Tuple[LifoQueue, threading.BoundedSemaphore]:
+        with self._lock:
+            if key not in self._idle:
+                self._idle[key] = LifoQueue()
+                self._slots[key] = threading.BoundedSemaphore(self.max_engines_per_key)
+            return self._idle[key], self._slots[key]
+
+    def _reserve(self, key: EngineKey, evict: bool = True) -> bool:
+        """
+        Count an engine about to be built for key against max_engines. At the bound, end the most recently used
+        idle engine of the least recently used other key to make room, False when no engine is idle
+        """
+        with self._lock:
+            if self._built < self.max_engines:
+                self._built += 1
+                return True
+            if not evict:
+                return False
+            victim = None
+            for __, other in sorted((used, other) for other, used in self._last_used.items() if other != key):
+                try:
+                    victim = self._idle[other].get_nowait()
+                except Empty:
+                    continue
+                self._all_engines.remove(victim)
+                self._slots[other].release()
+                self._evicted += 1
+                break
+        if victim is None:
+            return False
+        logger.debug(f"Ending an idle tesseract engine for {other} to make room for {key}")
+        victim.End()
+        return True
+
+    def _build(self, key: EngineKey, slots: threading.BoundedSemaphore) -> PyTessBaseAPI:
+        """
+        Build an engine on a slot and place already reserved, both are given back when tesseract fails to load
+        """
+        try:
+            engine = self._create(key)
+        except Exception:
+            slots.release()
+            with self._lock:
+                self._built -= 1
+            raise
+        with self._lock:
+            self._all_engines.append(engine)
+        return engine
+
+    def _create(self, key: EngineKey) -> PyTessBaseAPI:
+        lang, psm, variables, path, oem = key
+        logger.debug(f"Building tesseract engine for lang={lang}, psm={psm}, variables={variables}, path={path}, oem={oem}")
+        # An empty path keeps tesserocr's default, TESSDATA_PREFIX
+        engine = PyTessBaseAPI(psm=psm, lang=lang, oem=oem, **({"path": path} if path else {}))
+        for name, value in variables:
+            engine.SetVariable(name, value)
+        return engine
+
+    def checkout(self, lang: str, psm: int, variables: Optional[Dict[str, str]] = None,
+                 path: Optional[str] = None, oem: int = OEM.DEFAULT) -> Tuple[EngineKey, PyTessBaseAPI]:
+        """
+        Take an engine for the calling thread, building one if the key and the pool have not hit their bounds yet.
+        Raises TimeoutError when no engine of the key becomes free within checkout_timeout seconds
+        """
+        key = self.make_key(lang, psm, variables, path, oem)
+        idle, slots = self._queues_for(key)
+        expires_at = time.monotonic() + self.checkout_timeout
+        while True:
+            try:
+                engine = idle.get_nowait()
+                break
+            except Empty:
+                pass
+            if slots.acquire(blocking=False):
+                if self._reserve(key):
+                    engine = self._build(key, slots)
+                    break
+                slots.release()
+            # Every engine for this key is busy, or every engine of the pool is, wait for one to be checked back
+            # in. Waits are short so a slot given back by a failed build or room in the pool is picked up as well
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No tesseract engine for {key} became free within {self.checkout_timeout}s")
+            try:
+                engine = idle.get(timeout=min(remaining, 0.5))
+                break
+            except Empty:
+                continue
+        with self._lock:
+            self._checked_out[id(engine)] = (key, threading.get_ident())
+            self._last_used[key] = time.monotonic()
+        return key, engine
+
+    def checkin(self, key: EngineKey, engine: PyTessBaseAPI):
+        """Return an engine to the pool, only the owning thread may do so"""
+        with self._lock:
+            owner = self._checked_out.get(id(engine))
+            if owner is None or owner != (key, threading.get_ident()):
+                raise ValueError(f"Engine for {key} checked in by a thread that does not own it")
+            del self._checked_out[id(engine)]
+            self._last_used[key] = time.monotonic()
+        engine.Clear()
+        self._idle[key].put(engine)
+
+    @contextmanager
+    def engine(self, lang: str, psm: int, variables: Optional[Dict[str, str]] = None,
+               path: Optional[str] = None, oem: int = OEM.DEFAULT) -> Iterator[PyTessBaseAPI]:
+        key, engine = self.checkout(lang, psm, variables, path, oem)
+        try:
+            yield engine
+        finally:
+            self.checkin(key, engine)
+
+    def warm_up(self, lang: str, psms: Iterable[int], variables: Optional[Dict[str, str]] = None, count: int = 1,
+                path: Optional[str] = None, oem: int = OEM.DEFAULT):
+        """Build engines ahead of the first request so it does not pay for loading tessdata"""
+        for psm in psms:
+            key = self.make_key(lang, psm, variables, path, oem)
+            idle, slots = self._queues_for(key)
+            for _ in range(min(count, self.max_engines_per_key)):
+                if not slots.acquire(blocking=False):
+                    break
+                if not self._reserve(key, evict=False):
+                    slots.release()
+                    break
+                idle.put(self._build(key, slots))
+                with self._lock:
+                    self._last_used[key] = time.monotonic()
+        logger.info(f"Warmed up tesseract engines for {lang}: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"engines": len(self._all_engines),
+                    "max_engines": self.max_engines,
+                    "checked_out": len(self._checked_out),
+                    "idle": sum(queue.qsize() for queue in self._idle.values()),
+                    "evicted": self._evicted}
+
+    def close(self):
+        """End every engine, the pool must not be used afterwards"""
+        with self._lock:
+            engines, self._all_engines = self._all_engines, []
+            self._idle.clear()
+            self._slots.clear()
+            self._checked_out.clear()
+            self._last_used.clear()
+            self._built = 0
+        for engine in engines:
+            engine.End()
+
+
+engine_pool = TesseractEnginePool()
@@ -1,68 +1,216 @@
 # OCR implementation using tesseract or pytesseract
 from PIL import Image
+import numpy as np
 from typing import List, Dict, Tuple, Set, Union, Optional
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from concurrent.futures import ThreadPoolExecutor
 from base64 import b64decode
 from pandas import DataFrame
 from statistics import mean
-from tesserocr import PyTessBaseAPI, PSM
+from tesserocr import PSM
 # import tesserocr
-from hieroglyph.utils.image import ImageWrapper
+from hieroglyph.utils.image import ImageWrapper, BoxView
+from hieroglyph.utils.artifacts import artifact_writer
 from hieroglyph.utils.text import TextWrapper, BoxData
+from hieroglyph.utils.deadline import Deadline
 from hieroglyph.ocr import (ENGLISH_PRINTABLE, DIAGRAM_CONFIDENCE_THRESHOLD, TEXT_CONFIDENCE_THRESHOLD, TABLE_CONFIDENCE_THRESHOLD,
                            ENGLISH_PUNCTUATION_WHITESPACE, CHARACTER_BLACKLIST, PUNCTUATION_WHITESPACE)
-from hieroglyph.general import MAX_WORKERS, INBOUND_IMAGE_TYPE, internal_language_mapping
+from hieroglyph.general import (MAX_WORKERS, OCR_PROCESSES, OCR_BOX_TRIAGE, INBOUND_IMAGE_TYPE, OCR_MODE, DEFAULT_OCR_MODE,
+                                OCR_EXECUTOR, DEFAULT_OCR_EXECUTOR, OCR_RESULT_LEVEL, DEFAULT_OCR_RESULT_LEVEL,
+                                OCR_QUALITY, DEFAULT_OCR_QUALITY, internal_language_mapping)
+from hieroglyph.ocr.engine_pool import engine_pool
+from hieroglyph.ocr.quality import engine_settings
+from hieroglyph.ocr.process_pool import SharedPage, attach_page, get_process_pool
+from hieroglyph.utils.scheduler import ocr_scheduler
+from hieroglyph.ocr.cache import ocr_cache
+from hieroglyph.ocr.box_triage import BOX_CLASS, SKIPPED_BOX_CLASSES, classify_box, box_triage_stats
+from hieroglyph.ocr.result_arrays import OCRResultArrays
 
 
 from logging import getLogger
 logger = getLogger(__name__)
 
+ENGINE_VARIABLES = {'tessedit_char_blacklist': CHARACTER_BLACKLIST}
+
+# Stands in for the result of a box skipped because the page deadline expired
+_SKIPPED = "skipped"
+
 
 def get_text_from_images(source_image_to_list_of_boxes: Dict[ImageWrapper, List[ImageWrapper]],
-                         language: str, cthreshold: int) -> List[TextWrapper]:
-    """Return TextWrappers for each box found on the page image given"""
+                         language: str, cthreshold: int, ocr_mode: OCR_MODE = DEFAULT_OCR_MODE,
+                         executor: OCR_EXECUTOR = DEFAULT_OCR_EXECUTOR, quality: OCR_QUALITY = DEFAULT_OCR_QUALITY,
+                         deadline: Optional[Deadline] = None) -> List[TextWrapper]:
+    """
+    Return TextWrappers for each box found on the page image given. Boxes not OCRed before the deadline
+    expires are skipped, their page is returned with what was found and marked as truncated
+    """
+    deadline = deadline or Deadline()
     pages_data = []
     for source_image, box_images in source_image_to_list_of_boxes.items():
+        if executor == OCR_EXECUTOR.PROCESS:
+            data = _process_extract(source_image, box_images, language, cthreshold, ocr_mode, quality, deadline)
+        elif ocr_mode == OCR_MODE.PAGE:
+            data = _threaded_page_extract(source_image, box_images, language, cthreshold, quality, deadline)
+        else:
+            data = _threaded_extract(box_images, language, cthreshold, quality, deadline)
         pages_data.append(
             TextWrapper(name=source_image.name,
                         language=language,
-                        data=_threaded_extract(box_images, language, cthreshold))
+                        data=data,
+                        truncated=deadline.truncated)
         )
     return sorted(pages_data, key=lambda k: (len(k.data), k.overall_confidence), reverse=True)
 
 
-def _threaded_extract(box_images: List[ImageWrapper], language: str, cthreshold: int) -> List[BoxData]:
+def _threaded_extract(box_images: List[ImageWrapper], language: str, cthreshold: int, quality: OCR_QUALITY,
+                      deadline: Deadline) -> List[BoxData]:
     """Extract text from a list of images, with lanugage being our input lang for pytesseract"""
     extracted_content: List[TextWrapper] = []
-    _extract_and_write_func = lambda img: _extract_and_write(img, language, cthreshold)
-    skipped, not_skipped = 0, 0
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        for result in executor.map(_extract_and_write_func, box_images):
-            if result:
-                extracted_content.append(result)
-                not_skipped += 1
-            else:
-                skipped += 1
+    _extract_and_write_func = lambda img: _SKIPPED if deadline.expired() else _extract_and_write(img, language, cthreshold,
+                                                                                                  quality)
+    skipped, not_skipped, past_deadline = 0, 0, 0
+    for result in ocr_scheduler.map(_extract_and_write_func, box_images, timeout=deadline.remaining(), default=_SKIPPED):
+        if result is _SKIPPED:
+            past_deadline += 1
+        elif result:
+            extracted_content.append(result)
+            not_skipped += 1
+        else:
+            skipped += 1
+    if past_deadline:
+        deadline.truncate("OCR", f"{past_deadline}/{len(box_images)} boxes")
 
     logger.debug("_threaded_extract: returning all box data from source image")
+    logger.debug(f"Box triage totals: {box_triage_stats.stats()}")
+    return extracted_content
+
+
+def _threaded_page_extract(source_image: ImageWrapper, box_images: List[ImageWrapper], language: str, cthreshold: int,
+                           quality: OCR_QUALITY, deadline: Deadline) -> List[BoxData]:
+    """
+    Extract text from every box of a page by setting the full page on each engine once and
+    walking the boxes with SetRectangle, no per box crop or pillow conversion is needed
+    """
+    page = source_image.get_pillow()
+    chunks = [chunk for start in range(MAX_WORKERS) if (chunk := list(enumerate(box_images))[start::MAX_WORKERS])]
+    _extract_chunk_func = lambda chunk: _extract_page_chunk(page, chunk, language, cthreshold, quality, deadline)
+    extracted_content = _gather_chunks(ocr_scheduler.map(_extract_chunk_func, chunks), chunks, deadline)
+
+    logger.debug(f"_threaded_page_extract: returning all box data from {source_image.name}")
+    logger.debug(f"Box triage totals: {box_triage_stats.stats()}")
+    return [box for __, box in sorted(extracted_content, key=lambda pair: pair[0])]
+
+
+def _extract_page_chunk(page: Image.Image, chunk: List[Tuple[int, ImageWrapper]], language: str, cthreshold: int,
+                        quality: OCR_QUALITY, deadline: Deadline) -> Tuple[List[Tuple[int, BoxData]], int]:
+    """THREADED: OCR a set of boxes against one engine holding the full page, returns the boxes and how many were skipped"""
+    extracted_content = []
+    psm = default_psm(chunk[0][1].image_type)
+    with _engine(language, psm, quality) as api:
+        api.SetImage(page)
+        for done, (index, box_image) in enumerate(chunk):
+            if deadline.expired():
+                return extracted_content, len(chunk) - done
+            ocr_data = _ocr_rectangle(api, box_image, language, psm, quality)
+            if box := _create_box_data(box_image, ocr_data, language, cthreshold):
+                extracted_content.append((index, box))
+    return extracted_content, 0
+
+
+def _gather_chunks(results: List[Tuple[List[Tuple[int, BoxData]], int]], chunks: List[list],
+                   deadline: Deadline) -> List[Tuple[int, BoxData]]:
+    """
+    Flatten chunk results. Chunks check the deadline between boxes rather than being cut off by the
+    scheduler, so the boxes a chunk finished before it expired are kept
+    """
+    extracted_content: List[Tuple[int, BoxData]] = []
+    past_deadline = 0
+    for boxes, skipped in results:
+        extracted_content.extend(boxes)
+        past_deadline += skipped
+    if past_deadline:
+        deadline.truncate("OCR", f"{past_deadline}/{sum(len(chunk) for chunk in chunks)} boxes")
     return extracted_content
 
 
-def _extract_and_write(box_image: ImageWrapper, language: str, cthreshold: int) -> Optional[BoxData]:
+def _process_extract(source_image: ImageWrapper, box_images: List[ImageWrapper],
+                     language: str, cthreshold: int, ocr_mode: OCR_MODE, quality: OCR_QUALITY,
+                     deadline: Deadline) -> List[BoxData]:
+    """
+    Extract text from every box of a page in the OCR process pool. The page is copied into shared memory
+    once and workers only receive its name along with box coordinates, language and image type
+    """
+    if not box_images:
+        return []
+    pool = get_process_pool()
+    indexed_boxes = [(index, box_image.name, box_image._box) for index, box_image in enumerate(box_images)]
+    # Page mode pays a SetImage per chunk, so give every worker one chunk. Crop mode uses
+    #  smaller chunks so a slow box does not leave the other workers idle
+    num_chunks = OCR_PROCESSES if ocr_mode == OCR_MODE.PAGE else OCR_PROCESSES * 4
+    chunks = [chunk for start in range(num_chunks) if (chunk := indexed_boxes[start::num_chunks])]
+    with SharedPage(source_image.get_array()) as shared_page:
+        # Each scheduler slot waits on one worker process, so processes count against the same OCR budget.
+        #  Workers get the seconds left rather than the deadline, monotonic clocks are not shared
+        _submit_chunk_func = lambda chunk: pool.submit(_process_extract_chunk, shared_page.name, shared_page.shape,
+                                                       shared_page.dtype, chunk, box_images[0].image_type,
+                                                       language, cthreshold, ocr_mode, quality,
+                                                       deadline.remaining()).result()
+        extracted_content = _gather_chunks(ocr_scheduler.map(_submit_chunk_func, chunks), chunks, deadline)
+
+    logger.debug(f"_process_extract: returning all box data from {source_image.name}")
+    return [box for __, box in sorted(extracted_content, key=lambda pair: pair[0])]
+
+
+def _process_extract_chunk(shm_name: str, shape: Tuple[int, ...], dtype: str, chunk: List[Tuple[int, str, List[int]]],
+                           image_type: INBOUND_IMAGE_TYPE, language: str, cthreshold: int, ocr_mode: OCR_MODE,
+                           quality: OCR_QUALITY, deadline_seconds: Optional[float]) -> Tuple[List[Tuple[int, BoxData]], int]:
+    """
+    PROCESS: OCR a chunk of (index, name, [x,y,w,h]) boxes of a page held in shared memory,
+    returns the boxes and how many were skipped once deadline_seconds had passed
+    """
+    deadline = Deadline(deadline_seconds)
+    with attach_page(shm_name, shape, dtype) as page:
+        if ocr_mode == OCR_MODE.PAGE:
+            box_images = [(index, BoxView(page=page, name=name, box=[x, y, w, h], image_type=image_type))
+                          for index, name, (x, y, w, h) in chunk]
+            page_image = Image.fromarray(page)
+            extracted_content = _extract_page_chunk(page_image, box_images, language, cthreshold, quality, deadline)
+            del page_image
+            return extracted_content
+        extracted_content = []
+        for done, (index, name, (x, y, w, h)) in enumerate(chunk):
+            if deadline.expired():
+                return extracted_content, len(chunk) - done
+            box_image = BoxView(page=page, name=name, box=[x, y, w, h], image_type=image_type,
+                                normalize_size=True)
+            if box := _extract_and_write(box_image, language, cthreshold, quality):
+                extracted_content.append((index, box))
+        return extracted_content, 0
+
+
+def _extract_and_write(box_image: ImageWrapper, language: str, cthreshold: int,
+                       quality: OCR_QUALITY = DEFAULT_OCR_QUALITY) -> Optional[BoxData]:
     """THREADED: Extract text and return based on language provided
     """
-    ocr_data = _ocr(box_image, language)
+    ocr_data = _ocr(box_image, language, quality)
     box = _create_box_data(box_image, ocr_data, language, cthreshold)
     return box if box else None
 
 
-def _create_box_data(box_image: ImageWrapper, box_ocr_data: List[Dict[str, str | float]],
+def _create_box_data(box_image: ImageWrapper, box_ocr_data: List[Dict[str, str | float]] | OCRResultArrays,
                      language: str, cthreshold: int) -> BoxData | None:
     relevant_boxes = []
+    words: OCRResultArrays | None = None
     logger.debug(f"Box Data: {box_image.name} Starting with {len(box_ocr_data)} boxes at {box_image._box}")
-    if isinstance(box_ocr_data, list):
+    if isinstance(box_ocr_data, OCRResultArrays):
+        words = _filter_text_arrays(box_ocr_data, box_image, language)
+        if not len(words):
+            logger.debug(f"All found {box_ocr_data.level.value}s of {box_image.name} | {box_image._box} were either"
+                         f" empty, without confidence or ignored english/punctuation, ignoring")
+            return None
+        relevant_boxes = [{"text": words.joined_text(), "conf": words.mean_conf()}]
+
+    elif isinstance(box_ocr_data, list):
         ignore_box = True
         for char in box_ocr_data:
             char['text'] = str(char['text']).strip()
@@ -99,7 +247,8 @@ def _create_box_data(box_image: ImageWrapper, box_ocr_data: List[Dict[str, str |
         return BoxData(
             text=box_string,
             confidence=box_mean,
-            bounding_box=box_image._box
+            bounding_box=box_image._box,
+            words=words.to_list() if words is not None else None
         )
     else:
         logger.warning(f"Box for {box_image.name} with dimensions {box_image._box} with text [{box_string}]"
@@ -119,6 +268,31 @@ def _filter_text(box_data: dict, box_image: ImageWrapper, language: str) -> dict
         return {}
 
 
+def _filter_text_arrays(box_data: OCRResultArrays, box_image: ImageWrapper, language: str) -> OCRResultArrays:
+    """Same rules as _filter_text applied to every word/symbol at once, returns the relevant ones"""
+    text = np.char.strip(box_data.text)
+    ignored = _ignored_characters(language)
+    # An element is ignored when nothing is left after deleting the ignored characters from it
+    relevant = np.char.str_len(np.char.translate(text, ignored)) > 0
+    keep = (box_data.conf > 0.0) & relevant
+    logger.debug(f"Found {np.count_nonzero(keep)}/{len(box_data)} relevant {box_data.level.value}s in"
+                 f" {box_image._box}, dropped [{' '.join(box_data.text[~keep])}]")
+    relevant_data = box_data.select(keep)
+    relevant_data.text = text[keep]
+    return relevant_data
+
+
+def _ignored_characters(language: str, ignore_language: str = internal_language_mapping("english").to_ocr()) -> Dict[int, None]:
+    """str.translate table deleting the characters _should_ignore_box ignores for the language"""
+    if language.lower() == ignore_language:
+        return _PUNCTUATION_WHITESPACE_TABLE
+    return _ENGLISH_PUNCTUATION_WHITESPACE_TABLE
+
+
+_PUNCTUATION_WHITESPACE_TABLE = str.maketrans("", "", "".join(PUNCTUATION_WHITESPACE))
+_ENGLISH_PUNCTUATION_WHITESPACE_TABLE = str.maketrans("", "", "".join(ENGLISH_PUNCTUATION_WHITESPACE))
+
+
 def _should_ignore_box(box: dict, language: str,
                        ignore_language: str = internal_language_mapping("english").to_ocr()) -> bool:
     """
@@ -131,7 +305,8 @@ def _should_ignore_box(box: dict, language: str,
         return (set(box['text']) < ENGLISH_PUNCTUATION_WHITESPACE)
 
 
-def _ocr(image: ImageWrapper, lang: str) -> List[Dict[str, str | float]]:
+def _ocr(image: ImageWrapper, lang: str,
+         quality: OCR_QUALITY = DEFAULT_OCR_QUALITY) -> List[Dict[str, str | float]] | OCRResultArrays:
     """List of image text with average confidence score across all lines
     return [
         {
@@ -139,20 +314,129 @@ def _ocr(image: ImageWrapper, lang: str) -> List[Dict[str, str | float]]:
             "conf": 0.0
         }
     ]
+    or the OCRResultArrays of its words/symbols, placed on the page, for the word and symbol result levels
     """
     logger.debug(f"OCR {image.name} to {lang}")
+    box_class, psm = _triage_box(image)
+    if box_class in SKIPPED_BOX_CLASSES:
+        return []
+    cache_key = _cache_key(image, OCR_MODE.CROP, lang, psm, quality)
+    if cache_key and (cached := _cache_get(cache_key)) is not None:
+        return _place_on_page(cached, image)
     try:
-        characters: List[Dict[str, str | float]] = _retrieve_text_data(image=image, lang=lang)
-        if characters and sum(c['conf'] for c in characters) <= 0:
-            return _retrieve_text_data(image=image, lang=lang, psm=PSM.SPARSE_TEXT)
-        return characters
+        characters = _retrieve_text_data(image=image, lang=lang, psm=psm, quality=quality)
+        if _is_invalid(characters) and psm != PSM.SPARSE_TEXT:
+            logger.debug(f"Re-OCR {image.name} as {PSM.SPARSE_TEXT} as the previous attempt was invalid")
+            box_triage_stats.record_retry()
+            characters = _retrieve_text_data(image=image, lang=lang, psm=PSM.SPARSE_TEXT, quality=quality)
     except Exception as e:
         logger.warning(f"Tesseract error from image {image.name} to data: {e}")
-        image.save(f'ERROR-{image.name}.jpeg')
+        artifact_writer.submit(f'ERROR-{image.name}.jpeg', image.to_array())
         raise
+    if cache_key:
+        _cache_put(cache_key, characters)
+    return _place_on_page(characters, image)
+
+
+def _ocr_rectangle(api, image: ImageWrapper, lang: str, psm: int,
+                   quality: OCR_QUALITY = DEFAULT_OCR_QUALITY) -> List[Dict[str, str | float]] | OCRResultArrays:
+    """Same as _ocr, but for the box rectangle of the page image already set on api (set up with psm)"""
+    logger.debug(f"OCR rectangle {image._box} of {image.name}")
+    x, y, w, h = image._box
+    box_class, box_psm = _triage_box(image)
+    if box_class in SKIPPED_BOX_CLASSES:
+        return []
+    cache_key = _cache_key(image, OCR_MODE.PAGE, lang, box_psm, quality)
+    if cache_key and (cached := _cache_get(cache_key)) is not None:
+        return _place_on_page(cached, image, crop_shape=(h, w))
+    try:
+        api.SetPageSegMode(box_psm)
+        api.SetRectangle(x, y, w, h)
+        characters = _recognized_text_data(api, origin=(x, y))
+        if _is_invalid(characters) and box_psm != PSM.SPARSE_TEXT:
+            logger.debug(f"Re-OCR rectangle {image._box} as {PSM.SPARSE_TEXT} as the previous attempt was invalid")
+            box_triage_stats.record_retry()
+            api.SetPageSegMode(PSM.SPARSE_TEXT)
+            api.SetRectangle(x, y, w, h)
+            characters = _recognized_text_data(api, origin=(x, y))
+    except Exception as e:
+        logger.warning(f"Tesseract error from rectangle {image._box} of {image.name} to data: {e}")
+        artifact_writer.submit(f'ERROR-{image.name}.jpeg', image.to_array())
+        raise
+    finally:
+        api.SetPageSegMode(psm)
+    if cache_key:
+        _cache_put(cache_key, characters)
+    return _place_on_page(characters, image, crop_shape=(h, w))
+
+
+def _triage_box(image: ImageWrapper) -> Tuple[BOX_CLASS, int]:
+    """
+    Look at the crop before OCR, returning its class and the psm to OCR it with. Blank, noise and ruling
+    line boxes are skipped, diagram boxes holding several lines of text go straight to sparse text
+    """
+    psm = default_psm(image.image_type)
+    if not OCR_BOX_TRIAGE:
+        return BOX_CLASS.TEXT, psm
+    box_class = classify_box(image.get_array())
+    box_psm = psm
+    if box_class == BOX_CLASS.MULTI_LINE_TEXT and psm == PSM.SINGLE_LINE:
+        box_psm = PSM.SPARSE_TEXT
+    box_triage_stats.record(box_class, psm_changed=box_psm != psm)
+    if box_class in SKIPPED_BOX_CLASSES:
+        logger.debug(f"Skipping OCR of {image.name} at {image._box}, classified as {box_class.value}")
+    return box_class, box_psm
+
+
+def _cache_key(image: ImageWrapper, ocr_mode: OCR_MODE, lang: str, psm: int, quality: OCR_QUALITY) -> Optional[str]:
+    """Key of the box in the OCR result cache, None when caching is turned off"""
+    if not ocr_cache.enabled:
+        return None
+    path, oem = engine_settings(quality, lang)
+    return ocr_cache.make_key(image.get_array(), ocr_mode.value, lang, int(psm), CHARACTER_BLACKLIST,
+                              DEFAULT_OCR_RESULT_LEVEL.value, path, int(oem))
+
+
+def _cache_get(cache_key: str) -> List[Dict[str, str | float]] | OCRResultArrays | None:
+    cached = ocr_cache.get(cache_key)
+    if cached is None or DEFAULT_OCR_RESULT_LEVEL == OCR_RESULT_LEVEL.LINE:
+        return cached
+    return OCRResultArrays.from_records(DEFAULT_OCR_RESULT_LEVEL, cached)
+
+
+def _cache_put(cache_key: str, characters: List[Dict[str, str | float]] | OCRResultArrays):
+    ocr_cache.put(cache_key, characters.to_records() if isinstance(characters, OCRResultArrays) else characters)
 
 
-def _retrieve_text_data(image: ImageWrapper, lang: str, psm=None) -> List[Dict[str, str | float]]:
+def _is_invalid(characters: List[Dict[str, str | float]] | OCRResultArrays) -> bool:
+    """Tesseract found nothing it has any confidence in, worth another try with sparse text"""
+    if isinstance(characters, OCRResultArrays):
+        return float(characters.conf.sum()) <= 0
+    return bool(characters) and sum(c['conf'] for c in characters) <= 0
+
+
+def _place_on_page(characters: List[Dict[str, str | float]] | OCRResultArrays, image: ImageWrapper,
+                   crop_shape: Optional[Tuple[int, int]] = None) -> List[Dict[str, str | float]] | OCRResultArrays:
+    """
+    Word/symbol boxes are kept relative to the OCRed crop (that is what gets cached), move them onto the page.
+    crop_shape is the (h, w) they were read at, the possibly resized box image by default
+    """
+    if isinstance(characters, OCRResultArrays) and image._box:
+        return characters.to_page(image._box, crop_shape or image.get_array().shape)
+    return characters
+
+
+def _recognized_text_data(api, origin: Tuple[int, int] = (0, 0)) -> List[Dict[str, str | float]] | OCRResultArrays:
+    """Text data of the image or rectangle set on api at the configured result level, relative to origin"""
+    if DEFAULT_OCR_RESULT_LEVEL == OCR_RESULT_LEVEL.LINE:
+        return [{"text": api.GetUTF8Text(), "conf": api.MeanTextConf()}]
+    # Words and symbols come from the same recognition pass, the iterator only walks its results
+    api.Recognize()
+    return OCRResultArrays.from_api(api, DEFAULT_OCR_RESULT_LEVEL).shift(-origin[0], -origin[1])
+
+
+def _retrieve_text_data(image: ImageWrapper, lang: str, psm=None,
+                        quality: OCR_QUALITY = DEFAULT_OCR_QUALITY) -> List[Dict[str, str | float]] | OCRResultArrays:
     """
     return [
         {
@@ -162,19 +446,26 @@ def _retrieve_text_data(image: ImageWrapper, lang: str, psm=None) -> List[Dict[s
     ]
     """
     if psm is None:
-        if image.image_type == INBOUND_IMAGE_TYPE.DIAGRAM_BASED:
-            psm = PSM.SINGLE_LINE
-        elif image.image_type == INBOUND_IMAGE_TYPE.TEXT_BASED:
-            psm = PSM.SINGLE_BLOCK
-        elif image.image_type == INBOUND_IMAGE_TYPE.TEXT_BASED_LINES:
-            psm = PSM.SPARSE_TEXT
-        else:
-            psm = PSM.SINGLE_COLUMN # has given better results for tables
-        #psm = PSM.SINGLE_LINE if image.image_type == INBOUND_IMAGE_TYPE.DIAGRAM_BASED else PSM.SINGLE_BLOCK # try PSM.SINGLE_COLUMN for tables
-    else:
-        logger.debug(f"Re-OCR {image.name} as {psm} as the previous attempt was invalid")
-    with PyTessBaseAPI(psm=psm, lang=lang) as api:
-        api.SetVariable('tessedit_char_blacklist', CHARACTER_BLACKLIST)
+        psm = default_psm(image.image_type)
+    with _engine(lang, psm, quality) as api:
         api.SetImage(image.get_pillow())
         # langs = api.GetAvailableLanguages()
-        return [{"text": api.GetUTF8Text(), "conf": api.MeanTextConf()}]
+        return _recognized_text_data(api)
+
+
+def _engine(lang: str, psm: int, quality: OCR_QUALITY):
+    """Pooled engine for lang and psm, built from the tessdata and oem of quality"""
+    path, oem = engine_settings(quality, lang)
+    return engine_pool.engine(lang=lang, psm=psm, variables=ENGINE_VARIABLES, path=path, oem=oem)
+
+
+def default_psm(image_type: INBOUND_IMAGE_TYPE) -> int:
+    """Page segmentation mode used for boxes of the given image type"""
+    if image_type == INBOUND_IMAGE_TYPE.DIAGRAM_BASED:
+        return PSM.SINGLE_LINE
+    elif image_type == INBOUND_IMAGE_TYPE.TEXT_BASED:
+        return PSM.SINGLE_BLOCK
+    elif image_type == INBOUND_IMAGE_TYPE.TEXT_BASED_LINES:
+        return PSM.SPARSE_TEXT
+    else:
+        return PSM.SINGLE_COLUMN  # has given better results for tables
@@ -0,0 +1,87 @@
+# Persistent OCR worker processes and the shared memory page buffers they read boxes from
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from hieroglyph.general import OCR_PROCESSES
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Modules imported once by the fork server so every worker starts with them loaded,
+#  hieroglyph.process has to come first to resolve the utils.image <-> process import order
+PRELOAD_MODULES = ["hieroglyph.process", "hieroglyph.ocr.image_ocr"]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the OCR process pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver forks workers from a clean single threaded process, never from the threaded API server
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            _pool = ProcessPoolExecutor(max_workers=OCR_PROCESSES, mp_context=context)
+            logger.info(f"Started OCR process pool with {OCR_PROCESSES} workers")
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+class SharedPage:
+    """
+    Copy of a page array in shared memory, workers attach to it by name instead of receiving pixels
+    {
+        name: "" # shared memory block name
+        shape: (h, w) # page array shape
+        dtype: "" # page array dtype string
+    }
+    """
+    __slots__ = ("_shm", "name", "shape", "dtype")
+
+    def __init__(self, page_array: np.ndarray):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(page_array.nbytes, 1))
+        self.name: str = self._shm.name
+        self.shape: Tuple[int, ...] = page_array.shape
+        self.dtype: str = page_array.dtype.str
+        shared_array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        shared_array[...] = page_array
+        del shared_array
+
+    def release(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+@contextmanager
+def attach_page(name: str, shape: Tuple[int, ...], dtype: str) -> Iterator[np.ndarray]:
+    """WORKER: Map a SharedPage as a read only array, views of it must not outlive the context"""
+    shm = shared_memory.SharedMemory(name=name)
+    page = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    page.flags.writeable = False
+    try:
+        yield page
+    finally:
+        del page
+        shm.close()
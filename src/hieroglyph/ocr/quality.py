@@ -0,0 +1,58 @@
+# Tessdata variant and tesseract engine mode behind each OCR quality level
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from tesserocr import OEM, get_languages
+
+from hieroglyph.general import OCR_QUALITY, TESSDATA_FAST_DIR, TESSDATA_BEST_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+# tessdata_fast and tessdata_best only hold LSTM models, legacy needs traineddata with the legacy engine
+QUALITY_OEM = {OCR_QUALITY.FAST: OEM.LSTM_ONLY,
+               OCR_QUALITY.DEFAULT: OEM.DEFAULT,
+               OCR_QUALITY.BEST: OEM.LSTM_ONLY,
+               OCR_QUALITY.LEGACY: OEM.TESSERACT_ONLY}
+QUALITY_TESSDATA = {OCR_QUALITY.FAST: TESSDATA_FAST_DIR,
+                    OCR_QUALITY.BEST: TESSDATA_BEST_DIR}
+# Entry of the traineddata offset table holding the shape classifier templates (inttemp) of the legacy engine
+LEGACY_ENTRY = 3
+
+
+def has_legacy_model(traineddata: Path) -> bool:
+    """Whether traineddata holds the legacy engine's classifier, read from the offset table at the start of the file"""
+    try:
+        with open(traineddata, "rb") as file:
+            header = file.read(4 + 8 * (LEGACY_ENTRY + 1))
+    except OSError:
+        return False
+    if len(header) < 4 + 8 * (LEGACY_ENTRY + 1):
+        return False
+    # int32 number of entries, then an int64 offset per entry, -1 for entries the file does not have
+    entries, *offsets = struct.unpack(f"<i{LEGACY_ENTRY + 1}q", header)
+    return entries > LEGACY_ENTRY and offsets[LEGACY_ENTRY] >= 0
+
+
+@lru_cache(maxsize=None)
+def engine_settings(quality: OCR_QUALITY, lang: str) -> Tuple[Optional[str], int]:
+    """
+    Return the (tessdata path, oem) engines of lang are built with for quality, a None path being
+    TESSDATA_PREFIX. Falls back to the default quality when the variant is missing a language, or for legacy
+    when the traineddata under TESSDATA_PREFIX has no legacy model, as in tessdata_fast and tessdata_best
+    """
+    if quality == OCR_QUALITY.LEGACY:
+        path, __ = get_languages()
+        missing = [part for part in lang.split("+") if not has_legacy_model(Path(path) / f"{part}.traineddata")]
+        if missing:
+            logger.warning(f"No legacy model for {missing} in '{path}', using the default engine mode")
+            return None, QUALITY_OEM[OCR_QUALITY.DEFAULT]
+    path = QUALITY_TESSDATA.get(quality)
+    if quality in QUALITY_TESSDATA:
+        missing = [part for part in lang.split("+") if not path or not (Path(path) / f"{part}.traineddata").is_file()]
+        if missing:
+            logger.warning(f"No {quality.value} tessdata for {missing} in '{path}', using the default models")
+            return None, QUALITY_OEM[OCR_QUALITY.DEFAULT]
+    return path or None, QUALITY_OEM[quality]
@@ -0,0 +1,140 @@
+# Word or symbol level OCR results held as parallel arrays, collected from the same tesseract pass as the text
+from typing import Dict, List, Tuple
+
+import numpy as np
+from tesserocr import RIL
+
+from hieroglyph.general import OCR_RESULT_LEVEL
+
+
+class OCRResultArrays:
+    """
+    Word or symbol level results of one box, one array entry per element in reading order
+    {
+        level: OCR_RESULT_LEVEL # word or symbol
+        text: np.array(str) # element text
+        conf: np.array(float32) # element confidence, 0-100
+        boxes: np.array(int32, (n, 4)) # element [x,y,w,h] within the box crop, page coordinates after to_page()
+        line: np.array(int32) # index of the text line the element belongs to
+        word: np.array(int32) # index of the word the element belongs to, equal to the element index for words
+    }
+    """
+    __slots__ = ("level", "text", "conf", "boxes", "line", "word")
+
+    def __init__(self, level: OCR_RESULT_LEVEL, text: np.ndarray, conf: np.ndarray, boxes: np.ndarray,
+                 line: np.ndarray, word: np.ndarray):
+        self.level = level
+        self.text = text
+        self.conf = conf
+        self.boxes = boxes
+        self.line = line
+        self.word = word
+
+    @classmethod
+    def empty(cls, level: OCR_RESULT_LEVEL) -> "OCRResultArrays":
+        return cls(level, np.array([], dtype=str), np.zeros(0, dtype=np.float32), np.zeros((0, 4), dtype=np.int32),
+                   np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+    @classmethod
+    def from_api(cls, api, level: OCR_RESULT_LEVEL) -> "OCRResultArrays":
+        """Walk the result iterator of an api that has already recognized its image (or rectangle)"""
+        iterator_level = RIL.SYMBOL if level == OCR_RESULT_LEVEL.SYMBOL else RIL.WORD
+        iterator = api.GetIterator()
+        texts, confs, boxes, lines, words = [], [], [], [], []
+        line, word = -1, -1
+        if iterator is not None:
+            iterator.Begin()
+            while True:
+                if not iterator.Empty(iterator_level):
+                    if line < 0 or iterator.IsAtBeginningOf(RIL.TEXTLINE):
+                        line += 1
+                    if word < 0 or iterator.IsAtBeginningOf(RIL.WORD):
+                        word += 1
+                    bounding_box = iterator.BoundingBox(iterator_level)
+                    if bounding_box is not None:
+                        left, top, right, bottom = bounding_box
+                        texts.append(iterator.GetUTF8Text(iterator_level) or "")
+                        confs.append(iterator.Confidence(iterator_level))
+                        boxes.append((left, top, right - left, bottom - top))
+                        lines.append(line)
+                        words.append(word)
+                if not iterator.Next(iterator_level):
+                    break
+        if not texts:
+            return cls.empty(level)
+        return cls(level, np.array(texts, dtype=str), np.array(confs, dtype=np.float32),
+                   np.array(boxes, dtype=np.int32).reshape(-1, 4), np.array(lines, dtype=np.int32),
+                   np.array(words, dtype=np.int32))
+
+    @classmethod
+    def from_records(cls, level: OCR_RESULT_LEVEL, records: List[Dict[str, str | float | int | list]]) -> "OCRResultArrays":
+        """Inverse of to_records(), used when reading results back from the OCR cache"""
+        if not records:
+            return cls.empty(level)
+        return cls(level, np.array([r["text"] for r in records], dtype=str),
+                   np.array([r["conf"] for r in records], dtype=np.float32),
+                   np.array([r["box"] for r in records], dtype=np.int32).reshape(-1, 4),
+                   np.array([r["line"] for r in records], dtype=np.int32),
+                   np.array([r["word"] for r in records], dtype=np.int32))
+
+    def to_records(self) -> List[Dict[str, str | float | int | list]]:
+        """Plain python form of the arrays, as stored by the OCR cache"""
+        return [{"text": str(text), "conf": float(conf), "box": box, "line": line, "word": word}
+                for text, conf, box, line, word in zip(self.text, self.conf, self.boxes.tolist(),
+                                                       self.line.tolist(), self.word.tolist())]
+
+    def to_list(self) -> List[Dict[str, str | float | List[int]]]:
+        """Elements in the same layout as BoxData.to_dict(), used for the 'words' of a box"""
+        return [{"text": str(text), "confidence": float(conf), "bounding_box": box}
+                for text, conf, box in zip(self.text, self.conf, self.boxes.tolist())]
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def select(self, keep: np.ndarray) -> "OCRResultArrays":
+        """Subset of the elements by boolean mask or index array"""
+        return OCRResultArrays(self.level, self.text[keep], self.conf[keep], self.boxes[keep],
+                               self.line[keep], self.word[keep])
+
+    def shift(self, dx: int, dy: int) -> "OCRResultArrays":
+        boxes = self.boxes + np.array([dx, dy, 0, 0], dtype=np.int32)
+        return OCRResultArrays(self.level, self.text, self.conf, boxes, self.line, self.word)
+
+    def to_page(self, box: List[int], crop_shape: Tuple[int, ...]) -> "OCRResultArrays":
+        """Map element boxes from a (possibly resized) crop of box [x,y,w,h] back to page coordinates"""
+        x, y, w, h = box
+        crop_height, crop_width = crop_shape[:2]
+        scale = np.array([w / crop_width, h / crop_height, w / crop_width, h / crop_height])
+        scaled = OCRResultArrays(self.level, self.text, self.conf, np.rint(self.boxes * scale).astype(np.int32),
+                                 self.line, self.word)
+        return scaled.shift(x, y)
+
+    def words(self) -> "OCRResultArrays":
+        """Merge symbols into words, text joined, confidence averaged and boxes united. Words are returned as is"""
+        if self.level == OCR_RESULT_LEVEL.WORD or not len(self):
+            return OCRResultArrays(OCR_RESULT_LEVEL.WORD, self.text, self.conf, self.boxes, self.line, self.word)
+        starts = np.flatnonzero(np.diff(self.word, prepend=self.word[0] - 1))
+        counts = np.diff(np.append(starts, len(self)))
+        corners = np.hstack((self.boxes[:, :2], self.boxes[:, :2] + self.boxes[:, 2:]))
+        top_left = np.minimum.reduceat(corners[:, :2], starts)
+        bottom_right = np.maximum.reduceat(corners[:, 2:], starts)
+        text = np.array(["".join(self.text[start:start + count]) for start, count in zip(starts, counts)], dtype=str)
+        return OCRResultArrays(OCR_RESULT_LEVEL.WORD, text, np.add.reduceat(self.conf, starts) / counts,
+                               np.hstack((top_left, bottom_right - top_left)).astype(np.int32),
+                               self.line[starts], self.word[starts])
+
+    def joined_text(self) -> str:
+        """Text laid out like GetUTF8Text, words separated by spaces and lines by new lines"""
+        if not len(self):
+            return ""
+        separators = np.where(np.diff(self.line) != 0, "\n", np.where(np.diff(self.word) != 0, " ", ""))
+        return "".join(np.char.add(self.text, np.append(separators, "")))
+
+    def mean_conf(self) -> float:
+        return float(self.conf.mean()) if len(self) else 0.0
+
+    def __str__(self) -> str:
+        return f"<OCRResultArrays: {self.level.value}, {len(self)} elements, {self.joined_text()!r}>"
+
+    __repr__ = __str__
+
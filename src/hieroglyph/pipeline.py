@@ -7,23 +7,38 @@ from fastapi.exceptions import HTTPException
 import logging
 
 from hieroglyph.process import process_data
+from hieroglyph.process.preprocessing import PreprocessPipeline
 from hieroglyph.ocr.image_ocr import get_text_from_images
 from hieroglyph.models import (BatchPipelineRequestData, OCRRequestData, TranslateRequestData,
                               ImageRequestData, PipelineRequestData)
 from hieroglyph.ocr import DIAGRAM_CONFIDENCE_THRESHOLD, TEXT_CONFIDENCE_THRESHOLD, TABLE_CONFIDENCE_THRESHOLD
 from hieroglyph.utils.image import ImageWrapper
 from hieroglyph.utils.text import TextWrapper
-from hieroglyph.general import internal_language_mapping, INBOUND_IMAGE_TYPE  # Defined in __init__.py
+from hieroglyph.utils.deadline import Deadline
+from hieroglyph.general import (internal_language_mapping, INBOUND_IMAGE_TYPE, OCR_MODE, DEFAULT_OCR_MODE,
+                                OCR_QUALITY, DEFAULT_OCR_QUALITY, PAGE_DEADLINE_SECONDS,
+                                PREPROCESS_ENGINE, DEFAULT_PREPROCESS_ENGINE)  # Defined in __init__.py
 
 
 
 logger = logging.getLogger(__name__)
 
+# The optional ocr_mode, ocr_quality, deadline and preprocess request fields are not declared here, the request
+#  models of hieroglyph.models (kept outside this tree) must declare them or allow extra fields for requests to
+#  set them. They are read with getattr, so models without them fall back to the defaults of general.py
 
-def process_ocr(input_image_data: ImageRequestData,
-                debug: bool = False) -> Tuple[List[TextWrapper], Optional[Dict[ImageWrapper, List[ImageWrapper]]]]:
+
+def request_deadline(input_image_data: ImageRequestData) -> Deadline:
+    """Start the deadline of a page, from its 'deadline' field in seconds or PAGE_DEADLINE_SECONDS"""
+    seconds = getattr(input_image_data, "deadline", None) or PAGE_DEADLINE_SECONDS
+    return Deadline(seconds if seconds > 0 else None)
+
+
+def process_ocr(input_image_data: ImageRequestData, debug: bool = False,
+                deadline: Optional[Deadline] = None) -> Tuple[List[TextWrapper], Optional[Dict[ImageWrapper, List[ImageWrapper]]]]:
     """
-    Return list of textwrappers corresponding to the data found when OCRing the input image. debug=True will return preprocessed images as well
+    Return list of textwrappers corresponding to the data found when OCRing the input image. debug=True will return preprocessed images as well.
+    Work left once the deadline (the request deadline by default) expires is skipped and the page marked as truncated
         return
         (
             [
@@ -31,6 +46,7 @@ def process_ocr(input_image_data: ImageRequestData,
                     "name": "name of the image we are working on",
                     "language": "tesseract langauge we used to ocr content",
                     "overall_confidence": 0.0, # float value = average of box data confidence values
+                    "processing": {}, # preprocessing pipeline, seconds and bytes of each of its stages
                     "data": [
                         BoxData
                     ]
@@ -58,11 +74,13 @@ def process_ocr(input_image_data: ImageRequestData,
             }
         )
     """
+    deadline = deadline or request_deadline(input_image_data)
+    processing = {}
     preprocessed_data: Dict[ImageWrapper, List[ImageWrapper]] = process_data(
         input_image_data=input_image_data,
-        debug_mode=debug,
-        boxes=input_image_data.boxes if hasattr(input_image_data, "boxes") else []
-
+        boxes=input_image_data.boxes if hasattr(input_image_data, "boxes") else [],
+        deadline=deadline,
+        profile=processing
     )
 
     # Saving Confidence Threshold
@@ -85,8 +103,13 @@ def process_ocr(input_image_data: ImageRequestData,
     image_name_to_language_extractions: List[TextWrapper] = get_text_from_images(
     source_image_to_list_of_boxes=preprocessed_data,
     language=input_image_data.src_lang,
-    cthreshold=confidence_threshold
+    cthreshold=confidence_threshold,
+    ocr_mode=getattr(input_image_data, "ocr_mode", None) or DEFAULT_OCR_MODE,
+    quality=getattr(input_image_data, "ocr_quality", None) or DEFAULT_OCR_QUALITY,
+    deadline=deadline
     )
+    for page in image_name_to_language_extractions:
+        page.processing = processing
     logger.debug("Finished OCR, moving to translation")
     return (image_name_to_language_extractions, preprocessed_data) if debug else (image_name_to_language_extractions, None)
 
@@ -98,6 +121,14 @@ def validate_input_ocr_data(input_image_data: OCRRequestData) -> OCRRequestData:
     _validate_image_data(input_image_data)
     input_image_data.src_lang = _validate_lang(input_image_data.src_lang, 'src_lang')
     input_image_data.image_type = _validate_image_type(input_image_data.image_type)
+    if getattr(input_image_data, "ocr_mode", None):
+        input_image_data.ocr_mode = _validate_ocr_mode(input_image_data.ocr_mode)
+    if getattr(input_image_data, "ocr_quality", None):
+        input_image_data.ocr_quality = _validate_ocr_quality(input_image_data.ocr_quality)
+    if getattr(input_image_data, "deadline", None) is not None:
+        input_image_data.deadline = _validate_deadline(input_image_data.deadline)
+    if getattr(input_image_data, "preprocess", None):
+        input_image_data.preprocess = _validate_preprocess(input_image_data.preprocess)
     logger.debug(f"OCR conf: {input_image_data.conf_threshold}")
     input_image_data.conf_threshold = input_image_data.conf_threshold if input_image_data.conf_threshold and input_image_data.conf_threshold < 100 and input_image_data.conf_threshold >= 0 else None
     logger.debug(f"OCR source, image, conf: {input_image_data.src_lang}, {input_image_data.image_type}, {input_image_data.conf_threshold}")
@@ -114,6 +145,14 @@ def validate_input_pipeline_data(input_image_data: PipelineRequestData) -> Pipel
     input_image_data.src_lang = _validate_lang(input_image_data.src_lang, 'src_lang')
     input_image_data.dst_lang = _validate_lang(input_image_data.dst_lang, 'dst_lang')
     input_image_data.image_type = _validate_image_type(input_image_data.image_type)
+    if getattr(input_image_data, "ocr_mode", None):
+        input_image_data.ocr_mode = _validate_ocr_mode(input_image_data.ocr_mode)
+    if getattr(input_image_data, "ocr_quality", None):
+        input_image_data.ocr_quality = _validate_ocr_quality(input_image_data.ocr_quality)
+    if getattr(input_image_data, "deadline", None) is not None:
+        input_image_data.deadline = _validate_deadline(input_image_data.deadline)
+    if getattr(input_image_data, "preprocess", None):
+        input_image_data.preprocess = _validate_preprocess(input_image_data.preprocess)
     return input_image_data
 
 
@@ -153,6 +192,44 @@ def _validate_image_type(image_type: str) -> INBOUND_IMAGE_TYPE:
         raise HTTPException(400, f"Improper image type, '{image_type}', please specify either 'diagram' or 'text'")
 
 
+def _validate_ocr_mode(ocr_mode: str) -> OCR_MODE:
+    """Validate the ocr mode field, return an HTTP 400 Error - Else, run as normal."""
+    try:
+        return OCR_MODE(ocr_mode)
+    except ValueError as e:
+        raise HTTPException(400, f"Improper ocr mode, '{ocr_mode}', please specify either 'crop' or 'page'")
+
+
+def _validate_ocr_quality(ocr_quality: str) -> OCR_QUALITY:
+    """Validate the ocr quality field, return an HTTP 400 Error - Else, run as normal."""
+    try:
+        return OCR_QUALITY(ocr_quality)
+    except ValueError as e:
+        raise HTTPException(400, f"Improper ocr quality, '{ocr_quality}', please specify one of"
+                                 f" {', '.join(repr(quality.value) for quality in OCR_QUALITY)}")
+
+
+def _validate_deadline(deadline: float) -> float:
+    """Validate the deadline field is a positive number of seconds, return an HTTP 400 Error - Else, run as normal."""
+    try:
+        deadline = float(deadline)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, f"Improper deadline, '{deadline}', please specify a number of seconds")
+    if deadline <= 0:
+        raise HTTPException(400, f"Improper deadline, '{deadline}', must be more than 0 seconds")
+    return deadline
+
+
+def _validate_preprocess(preprocess: Union[str, List[Dict]]) -> PreprocessPipeline:
+    """Validate the preprocess field names a pipeline or lists stages, return an HTTP 400 Error - Else, run as normal."""
+    if DEFAULT_PREPROCESS_ENGINE == PREPROCESS_ENGINE.PIL:
+        raise HTTPException(400, "Improper preprocess, pipelines need PREPROCESS_ENGINE=fused, this server runs pil")
+    try:
+        return PreprocessPipeline.parse(preprocess)
+    except ValueError as e:
+        raise HTTPException(400, f"Improper preprocess, {e}")
+
+
 def _validate_lang(image_lang: str, lang_src: str) -> str:
     """Validate the language is proper, return the converted version if it's good"""
     try:
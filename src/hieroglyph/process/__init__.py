@@ -2,26 +2,63 @@
 from hieroglyph.process.image_processing import preprocess_data
 from hieroglyph.models import ImageRequestData
 from hieroglyph.process.boxes import get_bounding_boxes, convert_given_boxes
+from hieroglyph.process.page_cache import PageLayout, page_cache
+from hieroglyph.process.page_triage import PAGE_CLASS, page_triage_stats, triage_page
+from hieroglyph.process.preprocessing import PreprocessPipeline
 from hieroglyph.utils.image import ImageWrapper
-from typing import List, Dict
+from hieroglyph.utils.deadline import Deadline
+from typing import Any, List, Dict, Optional
 from PIL import Image
-from hieroglyph.general import INBOUND_IMAGE_TYPE
+from hieroglyph.general import (INBOUND_IMAGE_TYPE, PREPROCESS_PIPELINES, PREPROCESS_TRIAGE, PREPROCESS_TRIAGE_PIPELINE,
+                                PREPROCESS_ENGINE, DEFAULT_PREPROCESS_ENGINE)
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def process_data(input_image_data: ImageRequestData, debug_mode: bool,
-                 boxes: List[List[int]] = []) -> Dict[ImageWrapper, List[ImageWrapper]]:
+def process_data(input_image_data: ImageRequestData,
+                 boxes: List[List[int]] = [], deadline: Optional[Deadline] = None,
+                 profile: Optional[Dict[str, Any]] = None) -> Dict[ImageWrapper, List[ImageWrapper]]:
     """
-    Convert input image data to list of preprocessed ImageWrappers
+    Convert input image data to list of preprocessed ImageWrappers. A page whose deadline expires
+    during preprocessing is returned without boxes. Pages seen before come decoded and preprocessed
+    from the page cache. The page is preprocessed with the request's preprocess pipeline, or the one of
+    its image type, whose stage timings are added to profile. Without a pipeline in the request, clean
+    straight pages are sent to PREPROCESS_TRIAGE_PIPELINE instead, recorded under profile["triage"]
     """
-    converted_data: ImageWrapper = ImageWrapper(src_image=input_image_data.b64data,
-                                                name=f"{input_image_data.name}",
-                                                image_type=input_image_data.image_type,
-                                                normalize_size=False)
-    logger.debug(f"Finished image conversion, moving on to preprocessing with {converted_data}")
-    processed_image: ImageWrapper = preprocess_data(converted_data)
+    deadline = deadline or Deadline()
+    profile = {} if profile is None else profile
+    requested = getattr(input_image_data, "preprocess", None)
+    pipeline = PreprocessPipeline.parse(requested or PREPROCESS_PIPELINES[input_image_data.image_type])
+    # Only the fused engine runs pipelines
+    triage = PREPROCESS_TRIAGE and not requested and DEFAULT_PREPROCESS_ENGINE == PREPROCESS_ENGINE.FUSED
+    # The triage of a page only depends on its pixels, so the same page is routed the same way every time
+    cache_key = page_cache.make_key(input_image_data.b64data, input_image_data.image_type,
+                                    pipeline.key + ("+triage" if triage else ""))
+    if layout := page_cache.get(cache_key):
+        logger.debug(f"Page cache hit for {input_image_data.name}")
+        converted_data, processed_image = layout.named(f"{input_image_data.name}")
+        profile.update({**layout.processing, "cached": True})
+    else:
+        converted_data: ImageWrapper = ImageWrapper(src_image=input_image_data.b64data,
+                                                    name=f"{input_image_data.name}",
+                                                    image_type=input_image_data.image_type,
+                                                    normalize_size=False)
+        logger.debug(f"Finished image conversion, moving on to preprocessing with {converted_data}")
+        if triage:
+            page_class, measures = triage_page(converted_data.get_array())
+            routed = page_class == PAGE_CLASS.CLEAN
+            if routed:
+                pipeline = PreprocessPipeline.parse(PREPROCESS_TRIAGE_PIPELINE)
+            page_triage_stats.record(page_class, measures["seconds"], routed)
+            profile["triage"] = {"class": page_class.value, "routed": routed, **measures}
+            logger.debug(f"Triaged {converted_data.name} as {page_class.value}, preprocessing with {pipeline.name}")
+        processed_image: ImageWrapper = preprocess_data(converted_data, pipeline=pipeline, profile=profile)
+        layout = PageLayout(converted_data, processed_image, dict(profile))
+        page_cache.put(cache_key, layout)
+        if deadline.expired():
+            deadline.truncate("preprocessing", "box detection")
+            return {converted_data: []}
     logger.debug("Finished preprocessing, ask opencv for bounding boxes in the images")
     scale_pairing = (input_image_data.density_scale, input_image_data.box_scale) if input_image_data.density_scale and input_image_data.box_scale else None
     source_image_to_boxes: Dict[ImageWrapper, List[ImageWrapper]] = {
@@ -32,6 +69,7 @@ def process_data(input_image_data: ImageRequestData, debug_mode: bool,
                                                                                                 transformed_image=processed_image,
                                                                                                 image_type=input_image_data.image_type,
                                                                                                 scale_pairing=scale_pairing,
-                                                                                                debug_mode=debug_mode)
+                                                                                                deadline=deadline,
+                                                                                                layout=layout)
     }
     return source_image_to_boxes
@@ -0,0 +1,116 @@
+# Uniform grid index over the [x,y,w,h] boxes of a page for overlap, containment and point queries
+from typing import List, Tuple
+
+import numpy as np
+
+from hieroglyph.general import BOX_DEDUP_IOU, BOX_DEDUP_CONTAINMENT
+
+# A box is only dropped as nested in another at most this many times its area, so a frame or table grid
+# whose bounding box covers the page does not swallow the boxes inside it
+CONTAINMENT_AREA_RATIO = 2.0
+
+
+class BoxIndex:
+    """
+    Boxes bucketed into square grid cells, stored sorted by cell so a cell is found with a binary search
+    {
+        boxes: np.array(int64, (n, 4)) # [x,y,w,h] of every box, queries return indexes into it
+        cell: int # side of a grid cell in pixels
+        columns: int # number of grid columns, cell keys are row * columns + column
+        keys: np.array(int64) # sorted cell key of every (box, cell) pair
+        members: np.array(int64) # box index of every (box, cell) pair, in the order of keys
+    }
+    """
+    __slots__ = ("boxes", "cell", "columns", "keys", "members")
+
+    def __init__(self, boxes: List[Tuple[int, int, int, int]] | np.ndarray, cell: int = 0):
+        self.boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        sides = np.maximum(self.boxes[:, 2:], 1)
+        # Cells about twice the typical box keep most boxes in a handful of cells
+        self.cell = cell or max(8, int(np.median(sides.max(axis=1))) * 2 if len(self.boxes) else 8)
+        first, last = self._cells(self.boxes)
+        self.columns = int(last[:, 0].max()) + 1 if len(self.boxes) else 1
+        spans = last - first + 1
+        counts = spans[:, 0] * spans[:, 1]
+        members = np.repeat(np.arange(len(self.boxes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        columns = first[members, 0] + offsets % spans[members, 0]
+        rows = first[members, 1] + offsets // spans[members, 0]
+        keys = rows * self.columns + columns
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.members = keys[order], members[order]
+
+    def _cells(self, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(column, row) of the first and last cell each box touches"""
+        first = np.maximum(boxes[:, :2], 0) // self.cell
+        last = np.maximum(boxes[:, :2] + np.maximum(boxes[:, 2:], 1) - 1, 0) // self.cell
+        return first, last
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def candidates(self, box: Tuple[int, int, int, int]) -> np.ndarray:
+        """Indexes of the boxes sharing a grid cell with box, a superset of those overlapping it"""
+        first, last = self._cells(np.asarray([box], dtype=np.int64))
+        last[0, 0] = min(last[0, 0], self.columns - 1)
+        columns = np.arange(first[0, 0], last[0, 0] + 1)
+        rows = np.arange(first[0, 1], last[0, 1] + 1)
+        keys = (rows[:, None] * self.columns + columns[None, :]).ravel()
+        starts = np.searchsorted(self.keys, keys, side="left")
+        ends = np.searchsorted(self.keys, keys, side="right")
+        if not (ends - starts).any():
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([self.members[start:end] for start, end in zip(starts, ends)]))
+
+    def intersections(self, box: Tuple[int, int, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(indexes, intersection areas) of the boxes overlapping box"""
+        indexes = self.candidates(box)
+        x, y, w, h = box
+        others = self.boxes[indexes]
+        width = np.minimum(x + w, others[:, 0] + others[:, 2]) - np.maximum(x, others[:, 0])
+        height = np.minimum(y + h, others[:, 1] + others[:, 3]) - np.maximum(y, others[:, 1])
+        overlapping = (width > 0) & (height > 0)
+        return indexes[overlapping], (width * height)[overlapping]
+
+    def iou(self, box: Tuple[int, int, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(indexes, intersection over union) of the boxes overlapping box"""
+        indexes, intersection = self.intersections(box)
+        union = box[2] * box[3] + self.boxes[indexes, 2] * self.boxes[indexes, 3] - intersection
+        return indexes, intersection / union
+
+    def containment(self, box: Tuple[int, int, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(indexes, share of each overlapping box's area that lies inside box)"""
+        indexes, intersection = self.intersections(box)
+        return indexes, intersection / np.maximum(self.boxes[indexes, 2] * self.boxes[indexes, 3], 1)
+
+    def at(self, x: int, y: int) -> np.ndarray:
+        """Indexes of the boxes containing the point, smallest (innermost) first"""
+        indexes = self.candidates((x, y, 1, 1))
+        boxes = self.boxes[indexes]
+        inside = (boxes[:, 0] <= x) & (x < boxes[:, 0] + boxes[:, 2]) & (boxes[:, 1] <= y) & (y < boxes[:, 1] + boxes[:, 3])
+        indexes, boxes = indexes[inside], boxes[inside]
+        return indexes[np.argsort(boxes[:, 2] * boxes[:, 3], kind="stable")]
+
+
+def deduplicate(boxes: List[Tuple[int, int, int, int]] | np.ndarray, iou_threshold: float = BOX_DEDUP_IOU,
+                containment_threshold: float = BOX_DEDUP_CONTAINMENT) -> np.ndarray:
+    """
+    Boolean mask of the boxes to keep, non-maximum suppression by area: going from the largest box down, drop
+    smaller boxes that overlap it by iou_threshold or more, or lie at least containment_threshold inside it
+    while being no less than 1 / CONTAINMENT_AREA_RATIO of its size. An iou_threshold of 0 keeps every box
+    """
+    index = BoxIndex(boxes)
+    keep = np.ones(len(index), dtype=bool)
+    if not iou_threshold or len(index) < 2:
+        return keep
+    areas = index.boxes[:, 2] * index.boxes[:, 3]
+    for current in np.argsort(-areas, kind="stable"):
+        if not keep[current]:
+            continue
+        box = tuple(index.boxes[current])
+        indexes, overlap = index.iou(box)
+        __, inside = index.containment(box)
+        smaller = (areas[indexes] <= areas[current]) & (indexes != current) & keep[indexes]
+        nested = (inside >= containment_threshold) & (areas[indexes] * CONTAINMENT_AREA_RATIO >= areas[current])
+        keep[indexes[smaller & ((overlap >= iou_threshold) | nested)]] = False
+    return keep
@@ -0,0 +1,45 @@
+# Box count and spacing metrics over (n, 4) [x,y,w,h] rectangle arrays, used by the block/C search of box detection
+from typing import List, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def as_boxes(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> np.ndarray:
+    return np.asarray(rectangles, dtype=np.float64).reshape(-1, 4)
+
+
+def box_midpoints(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> np.ndarray:
+    boxes = as_boxes(rectangles)
+    return boxes[:, :2] + 0.5 * boxes[:, 2:]
+
+
+def mean_neighbour_distance(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> float:
+    """
+    Mean midpoint distance between consecutive boxes in reading order (sorted by y, then x). The last box of
+    one line is paired with the first of the next, as calculate_average_closest_box_proximity always did
+    """
+    boxes = as_boxes(rectangles)
+    if len(boxes) < 2:
+        return 0.0
+    midpoints = box_midpoints(boxes[np.lexsort((boxes[:, 0], boxes[:, 1]))])
+    return float(np.hypot(*np.diff(midpoints, axis=0).T).mean())
+
+
+def nearest_neighbour_distances(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> np.ndarray:
+    """Midpoint distance from each box to its closest other box, through a KD-tree"""
+    midpoints = box_midpoints(rectangles)
+    if len(midpoints) < 2:
+        return np.zeros(len(midpoints))
+    distances, __ = cKDTree(midpoints).query(midpoints, k=2)
+    return distances[:, 1]
+
+
+def mean_nearest_distance(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> float:
+    distances = nearest_neighbour_distances(rectangles)
+    return float(distances.mean()) if len(distances) > 1 else 0.0
+
+
+def box_metrics(rectangles: List[Tuple[int, int, int, int]] | np.ndarray) -> Tuple[int, float]:
+    """(number of boxes, mean neighbour distance) compared between steps of the block/C search, 0 distance for one box"""
+    return len(rectangles), mean_neighbour_distance(rectangles)
@@ -1,26 +1,28 @@
-from PIL import Image
-from typing import List, Tuple
-from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Optional
 import numpy as np
 
 import cv2
-from statistics import mean
 
-import json
 import math
-from deskew import determine_skew
-from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
+from math import dist
 import logging
 
-from hieroglyph.utils.image import ImageWrapper
-from hieroglyph.general import  INBOUND_IMAGE_TYPE
+from hieroglyph.utils.image import ImageWrapper, BoxView
+from hieroglyph.utils.deadline import Deadline
+from hieroglyph.utils.artifacts import artifact_writer
+from hieroglyph.process.threshold import GaussianThresholds
+from hieroglyph.process.box_metrics import box_metrics, mean_neighbour_distance
+from hieroglyph.process.box_index import deduplicate
+from hieroglyph.process.page_cache import PageLayout
+from hieroglyph.general import  INBOUND_IMAGE_TYPE, BOX_SEARCH, DEFAULT_BOX_SEARCH, BOX_SEARCH_LOOKAHEAD, \
+    BOX_DETECTION, DEFAULT_BOX_DETECTION, BOX_DETECTION_MAX_SIDE, BOX_ENGINE, DEFAULT_BOX_ENGINE, \
+    TABLE_ENGINE, DEFAULT_TABLE_ENGINE
 from hieroglyph.ocr import DIAGRAM_CONFIDENCE_THRESHOLD, TEXT_CONFIDENCE_THRESHOLD, TABLE_CONFIDENCE_THRESHOLD
+from hieroglyph.utils.scheduler import ocr_scheduler
 from hieroglyph.general import internal_language_mapping, INBOUND_IMAGE_TYPE  # Defined in __init__.py
 
 # from hieroglyph.pipeline import (process_ocr, validate_input_ocr_data, validate_lang, 
 #                                 validate_input_pipeline_data, validate_input_translate_data)
-from hieroglyph.translation.translator import Translator
 
 
 from img2table.document import Image as img2table_Image
@@ -39,11 +41,11 @@ processing that should be performed on images based on content
 
 
 def convert_given_boxes(source_image: ImageWrapper, transformed_image: ImageWrapper,
-                        image_type: INBOUND_IMAGE_TYPE, given_boxes: List[List[int]]) -> List[ImageWrapper]:
-    """Extract [x,y,w,h] from given image for OCR"""
+                        image_type: INBOUND_IMAGE_TYPE, given_boxes: List[List[int]]) -> List[BoxView]:
+    """Extract [x,y,w,h] from given image for OCR. Every given box is read, overlapping ones included"""
     source_image_array = source_image.get_array()
 
-    all_boxes: List[ImageWrapper] = []
+    all_boxes: List[BoxView] = []
     num_skipped, num_not_skipped = 0, 0
     # Iterate given boxes
     for num, rectangle in enumerate(sorted(given_boxes), start=1):
@@ -53,14 +55,13 @@ def convert_given_boxes(source_image: ImageWrapper, transformed_image: ImageWrap
             logger.warning(f"{source_image.name} rectangle {num} too small (x,y,w,h): {(x, y, w, h)}")
             num_skipped += 1
             continue
-        img_arr = source_image_array[y:y+h, x:x+w]
         num_not_skipped += 1
 
-        final_image = ImageWrapper(src_image=img_arr,
-                                   name=f"{source_image.name}.box.{num}.png",
-                                   box=[x, y, w, h],
-                                   image_type=image_type,
-                                   normalize_size=True)
+        final_image = BoxView(page=source_image_array,
+                              name=f"{source_image.name}.box.{num}.png",
+                              box=[x, y, w, h],
+                              image_type=image_type,
+                              normalize_size=True)
 
         all_boxes.append(final_image)
 
@@ -74,26 +75,44 @@ def get_bounding_boxes(source_image: ImageWrapper,
                        transformed_image: ImageWrapper,
                        image_type: INBOUND_IMAGE_TYPE,
                        scale_pairing: Tuple[int, int] | None = None,
-                       debug_mode: bool = False) -> List[ImageWrapper]:
-    """Take preprocessed images and extract bounding box images"""
+                       deadline: Optional[Deadline] = None,
+                       detection: BOX_DETECTION = DEFAULT_BOX_DETECTION,
+                       layout: Optional[PageLayout] = None) -> List[BoxView]:
+    """
+    Take preprocessed images and extract bounding box images. In pyramid detection large diagram and text
+    pages are searched on a downscaled copy, the boxes are mapped back and their edges refined on the full
+    resolution page, crops always come from the full resolution source. A cached page layout brings the
+    binarized page, the Gaussian means and the boxes of earlier requests for the page along. Pages sampled
+    for debug artifacts get an image of their boxes drawn and written in the background
+    """
+    layout = layout or PageLayout(source_image, transformed_image)
     source_image_array = source_image.get_array()
-    if debug_mode:
-        debug_path = Path("assets/DEBUG")
-        debug_path.mkdir(parents=True, exist_ok=True)
-        debug_source_image_array: np.ndarray = source_image_array.copy()
+
+    transformed_image_array = transformed_image.get_array()
+    factor = 1
+    if detection == BOX_DETECTION.PYRAMID and image_type != INBOUND_IMAGE_TYPE.TABLE_BASED:
+        factor = math.ceil(max(transformed_image_array.shape[:2]) / BOX_DETECTION_MAX_SIDE)
 
     # Convert to binary and invert polarity
-    __, inverted_binary_image = cv2.threshold(transformed_image.to_array(), 0, 255,
-                                              cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if factor > 1:
+        logger.debug(f"Detecting boxes of {source_image.name} on a copy downscaled by {factor}")
+    inverted_binary_image, ink_threshold = layout.inverted_binary(factor)
+
+    layout_key = (image_type, tuple(scale_pairing) if scale_pairing else None, factor)
+    rectangles = layout.cached_rectangles(layout_key)
+    cached = rectangles is not None
+    if cached:
+        logger.debug(f"Reusing the boxes found earlier on {source_image.name} for {layout_key}")
 
     # If the passed image is diagram-based
-    if image_type == INBOUND_IMAGE_TYPE.DIAGRAM_BASED:
+    elif image_type == INBOUND_IMAGE_TYPE.DIAGRAM_BASED:
         logger.debug(f"Initializing Bounding Box Creation for ENUM Type: {image_type}")
         """
         This is currently the optimal setting for bounding boxes for diagram-based images
         """
 
-        rectangles = find_diagram_rectangles(source_image, inverted_binary_image, scale_pairing)
+        rectangles = find_diagram_rectangles(source_image, inverted_binary_image, scale_pairing, deadline,
+                                             thresholds=layout.gaussian_thresholds(factor))
 
     elif image_type == INBOUND_IMAGE_TYPE.TABLE_BASED: 
         logger.debug(f"Initializing Bounding Box Creation for ENUM Type: {image_type}") # putting table based here for now
@@ -114,9 +133,9 @@ def get_bounding_boxes(source_image: ImageWrapper,
         # contours, _ = cv2.findContours(dilated_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         
         kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (4, 4))
-        dilated_thresh = cv2.dilate(inverted_binary_image, kernel, iterations=12)
-        contours, _ = cv2.findContours(dilated_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-        rectangles = [cv2.boundingRect(c) for c in contours]
+        # Dilate about as far on a downscaled copy as on the full page
+        dilated_thresh = cv2.dilate(inverted_binary_image, kernel, iterations=max(1, round(12 / factor)))
+        rectangles = find_rectangles(dilated_thresh)
 
         # kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (8, 8))
         # dilated_thresh = cv2.dilate(inverted_binary_image, kernel, iterations=4)
@@ -124,77 +143,146 @@ def get_bounding_boxes(source_image: ImageWrapper,
     else:
         SystemExit(f"The enumerator passed into var 'image_type' is invalid. It appears to be {image_type}")
 
-    all_boxes: List[ImageWrapper] = []
+    if factor > 1 and not cached:
+        rectangles = refine_to_full_resolution(rectangles, factor, transformed_image_array, ink_threshold)
+
+    rectangles = np.asarray(rectangles, dtype=np.int32).reshape(-1, 4)
+    # A search cut short by the deadline is not the answer for the page, whether or not a stage recorded it
+    if not cached and not (deadline and (deadline.truncated or deadline.expired())):
+        layout.store_rectangles(layout_key, rectangles)
+    keep = deduplicate(rectangles)
+    if not keep.all():
+        logger.info(f"{source_image.name}: dropped {int((~keep).sum())} duplicate boxes")
+        rectangles = rectangles[keep]
+    all_boxes: List[BoxView] = []
+    numbers: List[int] = []
     num_skipped, num_not_skipped = 0, 0
     # Iterate contours, find bounding rectangles, Sort by: area, y, x
     # for num, rectangle in enumerate(sorted(rectangles, key=lambda r: (r[1]*r[2], r[1], r[0])), start=1):
     # Iterate contours, find bounding rectangles, Sort by: y, x
-    for num, rectangle in enumerate(sorted(rectangles, key=lambda r: (r[1], r[0])), start=1):
+    for num, rectangle in enumerate(rectangles[np.lexsort((rectangles[:, 0], rectangles[:, 1]))].tolist(), start=1):
         # Get bounding rectangle
         x, y, w, h = rectangle
         if h < 3 or w < 3:
             logger.warning(f"{source_image.name} rectangle {num} too small (x,y,w,h): {(x, y, w, h)}")
             num_skipped += 1
             continue
-        img_arr = source_image_array[y:y+h, x:x+w]
         num_not_skipped += 1
-        final_image = ImageWrapper(src_image=img_arr,
-                                   name=f"{source_image.name}.box.{num}.png",
-                                   box=[x, y, w, h],
-                                   image_type=image_type,
-                                   normalize_size=True)
-        if debug_mode:
-            # DEBUG
-            # cv2.imwrite(str(debug_path / final_image.name), final_image.get_array())
-            cv2.rectangle(debug_source_image_array, (x, y), (x+w, y+h), (0, 255, 0), thickness=1)
-            cv2.putText(
-                img=debug_source_image_array,
-                text=f"[{num}]{x},{y},{w},{h}",
-                org=(x, y),
-                color=(0, 255, 0),
-                thickness=1,
-                fontScale=0.5,
-                fontFace=cv2.FONT_HERSHEY_COMPLEX_SMALL,
-                lineType=cv2.LINE_AA
-            )
-            # END DEBUG
-
+        final_image = BoxView(page=source_image_array,
+                              name=f"{source_image.name}.box.{num}.png",
+                              box=[x, y, w, h],
+                              image_type=image_type,
+                              normalize_size=True)
         all_boxes.append(final_image)
+        numbers.append(num)
 
     logger.debug(f"Finished with boxes for {source_image.name}: {num_skipped} were skipped,"
                  f" and {num_not_skipped} were processed")
     logger.debug(f"Boxes: {all_boxes}")
 
     # DEBUG
-    if debug_mode:
-        debug_filename = debug_path / f"{source_image.name}.all_boxes.png"
-        logger.debug(f"Output all_boxes: {debug_filename}")
-        cv2.imwrite(str(debug_filename), debug_source_image_array)
+    if artifact_writer.sample():
+        logger.debug(f"Queueing debug artifact {source_image.name}.all_boxes.png")
+        artifact_writer.submit(f"{source_image.name}.all_boxes.png",
+                               lambda: draw_boxes(source_image_array, [box._box for box in all_boxes], numbers))
     # END DEBUG
 
     return all_boxes 
 
 
-def calculate_average_closest_box_proximity(rectangles: List[Tuple]) -> float:
+def draw_boxes(page: np.ndarray, boxes: List[List[int]], numbers: List[int]) -> np.ndarray:
+    """Copy of the page with every box outlined and labelled with its number and [x,y,w,h]"""
+    drawn = page.copy()
+    for (x, y, w, h), num in zip(boxes, numbers):
+        cv2.rectangle(drawn, (x, y), (x+w, y+h), (0, 255, 0), thickness=1)
+        cv2.putText(
+            img=drawn,
+            text=f"[{num}]{x},{y},{w},{h}",
+            org=(x, y),
+            color=(0, 255, 0),
+            thickness=1,
+            fontScale=0.5,
+            fontFace=cv2.FONT_HERSHEY_COMPLEX_SMALL,
+            lineType=cv2.LINE_AA
+        )
+    return drawn
+
+
+def find_rectangles(binary_image: np.ndarray, min_size: int = 0,
+                    engine: BOX_ENGINE = DEFAULT_BOX_ENGINE) -> np.ndarray:
+    """
+    Bounding rectangles of the outer contours of a binary image as an (n, 4) int32 array of [x,y,w,h]
+    sorted by y, x, w, h, keeping those wider and taller than min_size. Both engines return the same array
+    """
+    if engine == BOX_ENGINE.COMPONENTS:
+        rectangles = _component_rectangles(binary_image)
+    else:
+        contours, _ = cv2.findContours(binary_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rectangles = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32).reshape(-1, 4)
+    rectangles = rectangles[(rectangles[:, 2] > min_size) & (rectangles[:, 3] > min_size)]
+    return rectangles[np.lexsort((rectangles[:, 3], rectangles[:, 2], rectangles[:, 0], rectangles[:, 1]))]
+
+
+def _component_rectangles(binary_image: np.ndarray) -> np.ndarray:
+    """
+    findContours(RETR_EXTERNAL) only sees the outside of each shape, so holes are filled first: the
+    background is flooded (4-connected) from a one pixel border and whatever it cannot reach is solid.
+    The 8-connected components of that are the outer contours, their stats the bounding rectangles
+    """
+    filled = cv2.copyMakeBorder(binary_image, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    filled[filled != 0] = 255
+    cv2.floodFill(filled, None, (0, 0), 128, flags=4)
+    solid = cv2.compare(filled, 128, cv2.CMP_NE)[1:-1, 1:-1]
+    __, __, stats, __ = cv2.connectedComponentsWithStats(solid, connectivity=8)
+    return stats[1:, :4].astype(np.int32)
+
+
+def refine_to_full_resolution(rectangles: List[Tuple[int, int, int, int]], factor: int,
+                              full_image: np.ndarray, ink_threshold: float) -> List[Tuple[int, int, int, int]]:
+    """
+    Map rectangles found on a copy downscaled by factor back onto the full resolution page. Each edge lands
+    within a downscaled pixel of the truth, so only a band that wide around it is read: the edge moves onto
+    the outermost ink (pixels <= ink_threshold) in its band plus a downscaled pixel of margin, and stays
+    where it is when the band has no ink
+    """
+    height, width = full_image.shape[:2]
+    pad = factor
+    refined = []
+    for x, y, w, h in rectangles:
+        left, top = x * factor, y * factor
+        right, bottom = min(width, (x + w) * factor), min(height, (y + h) * factor)
+        outer_left, outer_top = max(0, left - pad), max(0, top - pad)
+        outer_right, outer_bottom = min(width, right + pad), min(height, bottom + pad)
+        inner_left, inner_top = min(left + pad, right), min(top + pad, bottom)
+        inner_right, inner_bottom = max(right - pad, left), max(bottom - pad, top)
+
+        columns = np.flatnonzero((full_image[top:bottom, outer_left:inner_left] <= ink_threshold).any(axis=0))
+        new_left = outer_left + columns[0] - pad if len(columns) else left
+        columns = np.flatnonzero((full_image[top:bottom, inner_right:outer_right] <= ink_threshold).any(axis=0))
+        new_right = inner_right + columns[-1] + 1 + pad if len(columns) else right
+        rows = np.flatnonzero((full_image[outer_top:inner_top, left:right] <= ink_threshold).any(axis=1))
+        new_top = outer_top + rows[0] - pad if len(rows) else top
+        rows = np.flatnonzero((full_image[inner_bottom:outer_bottom, left:right] <= ink_threshold).any(axis=1))
+        new_bottom = inner_bottom + rows[-1] + 1 + pad if len(rows) else bottom
+
+        new_left, new_top = max(0, int(new_left)), max(0, int(new_top))
+        new_right, new_bottom = min(width, int(new_right)), min(height, int(new_bottom))
+        refined.append((new_left, new_top, new_right - new_left, new_bottom - new_top))
+    return refined
+
+
+def calculate_average_closest_box_proximity(rectangles: List[Tuple] | np.ndarray) -> float:
     """
     1. sort the boxes by top left and bottom left points, then top right and bottom right points
     2. calculate distance between each point and the next (if on the same line?) edge case,
        right side box in line 1 and left side box in line 2
     3. average the distances and return that value
     """
-    sorted_rectangles = sorted(rectangles, key=lambda r: (r[1], r[0]))
-    distance_pairs = [(sorted_rectangles[i], sorted_rectangles[i+1]) for i in range(0, len(sorted_rectangles)-1)]
-    # logger.debug(f"Sorted rectangles: {sorted_rectangles}")
-    # logger.debug(f"Distance pairs: {distance_pairs}")
-    distances = [get_distance(rectangle1, rectangle2) for rectangle1, rectangle2 in distance_pairs]
-    average_distance = mean(distances)
-    # logger.debug(f"Average distance across all boxes is {average_distance}")
-    return average_distance
+    return mean_neighbour_distance(rectangles)
 
 
 def get_distance(rectangle1: tuple, rectangle2: tuple) -> float:
     """Determine the pixel distance between two rectangles, based on the midpoint"""
-    from math import dist
     x1, y1, w1, h1 = rectangle1
     x2, y2, w2, h2 = rectangle2
     point1 = (x1 + (0.5*w1), y1 + (0.5*h1))
@@ -218,30 +306,31 @@ def close_enough(current_values: Tuple[int, float], previous_values: Tuple[int,
 
 def find_diagram_rectangles(source_image: ImageWrapper,
                             inverted_binary_image: np.ndarray,
-                            scale_pairing: Tuple[int, int] | None) -> list:
+                            scale_pairing: Tuple[int, int] | None,
+                            deadline: Optional[Deadline] = None,
+                            thresholds: Optional[GaussianThresholds] = None) -> np.ndarray:
+    """[x,y,w,h] rows of the diagram boxes found by the block/C search, or at the scale_pairing when given"""
+    thresholds = thresholds or GaussianThresholds(inverted_binary_image, max_blocks=BOX_SEARCH_LOOKAHEAD + 2)
     if not scale_pairing:
         logging.debug("No scale pairing provided, try to find one")
-        actual_rectangles = _range_find_optimal_rectangles(source_image, inverted_binary_image)
-        if not actual_rectangles:
+        actual_rectangles = _range_find_optimal_rectangles(source_image, inverted_binary_image, deadline,
+                                                           thresholds=thresholds)
+        if not len(actual_rectangles):
             logging.warning("Range find optimal rectangles did not find an optimal value for block neighborhood"
                             " and constant, default to a scaled 5,5")
             scale_pairing = (5, 5)
         else:
             return actual_rectangles
     block, C = get_threshold_values_by_scale(*scale_pairing)
-    thresh = cv2.adaptiveThreshold(inverted_binary_image,
-                                   255,
-                                   cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                   cv2.THRESH_BINARY_INV,
-                                   block,
-                                   C)
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    actual_rectangles = [r for c in contours if (r := cv2.boundingRect(c))[2] > 5 and r[3] > 5]
-    return actual_rectangles
+    return find_rectangles(thresholds.mask(block, C), min_size=5)
 
 def find_table_rectangles(source_image: ImageWrapper,
                             inverted_binary_image: np.ndarray,
-                            scale_pairing: Tuple[int, int] | None) -> list:
+                            scale_pairing: Tuple[int, int] | None,
+                            engine: TABLE_ENGINE = DEFAULT_TABLE_ENGINE) -> list | np.ndarray:
+    """[x,y,w,h] of the table cells on the source page, from its ruling lines or from img2table"""
+    if engine == TABLE_ENGINE.GRID:
+        return find_table_grid_rectangles(source_image.get_array())
     """
     if not scale_pairing:
         logging.debug("No scale pairing provided, try to find one")
@@ -257,9 +346,6 @@ def find_table_rectangles(source_image: ImageWrapper,
     # internal = internal_language_mapping("english").to_ocr()
     # src_langlang = self.input_lang()
     # source_lang = internal_language_mapping(self).to_ocr()
-    translator = Translator()
-    source_lang= translator.source_language
-
     ocr = TesseractOCR(n_threads=1, lang= "chi_sim+chi_tra") #+eng
     
     image_array = source_image.get_array()
@@ -289,6 +375,28 @@ def find_table_rectangles(source_image: ImageWrapper,
     return actual_rectangles
 
 
+def find_table_grid_rectangles(source_image_array: np.ndarray, min_cell: int = 8) -> np.ndarray:
+    """
+    Table cells as the regions enclosed by ruling lines. Ruling lines are the runs of ink at least 1/40th of
+    the page long left by opening with a horizontal and a vertical line kernel. The thin grey lines of a table
+    do not survive preprocessing, so the source page is binarized here with a local mean threshold
+    """
+    height, width = source_image_array.shape[:2]
+    ink = cv2.adaptiveThreshold(source_image_array, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                  cv2.getStructuringElement(cv2.MORPH_RECT, (max(20, width // 40), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(20, height // 40))))
+    # Close the gaps where lines meet, then every 4-connected region off the lines is a cell
+    grid = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), dtype=np.uint8))
+    __, __, stats, __ = cv2.connectedComponentsWithStats(cv2.bitwise_not(grid), connectivity=4)
+    x, y, w, h = stats[1:, :4].T
+    # Regions reaching the page edge are outside the table, not cells
+    cells = (x > 0) & (y > 0) & (x + w < width) & (y + h < height) & (w >= min_cell) & (h >= min_cell)
+    rectangles = stats[1:, :4][cells].astype(np.int32)
+    return rectangles[np.lexsort((rectangles[:, 0], rectangles[:, 1]))]
+
+
 def get_threshold_values_by_scale(density_scale: int, box_scale: int) -> Tuple[int, int]:
     """
     Use a sliding scale of 0-10 for box density and size to get a better approximation of block neighborhood
@@ -314,65 +422,145 @@ def get_threshold_values_by_scale(density_scale: int, box_scale: int) -> Tuple[i
         return block, c
 
 
-def _range_find_optimal_rectangles(source_image: ImageWrapper,
-                                   inverted_binary_image: np.ndarray) -> list:
+class ThresholdSteps:
     """
-    Find optimal rectangles by approximating a good C and block_neighborhood for adaptiveThreshold
+    The (block, C) settings searched for a good adaptiveThreshold, in block major order. Each setting
+    is thresholded at most once however often a search asks for it
+    {
+        thresholds: GaussianThresholds # threshold masks of the page, one Gaussian blur per block
+        settings: List[Tuple[int, int]] # (block, C) of each step
+        evaluated: Dict[int, Tuple[np.ndarray, int, float]] # step -> (rectangles, number of boxes, average proximity)
+        lookahead: int # steps a search may threshold speculatively alongside the one it needs, 0 for none
+        engine: BOX_ENGINE # how boxes are read from each threshold mask
+    }
     """
-    C: int = 10
-    found_block: int = 0
-    previous_avg_prox, previous_num_boxes, previous_contours = 0.0, 0, None
-    previous_rectangles: list = []
-    actual_rectangles: list = []
-    breakout = False
-    for block in range(5, 39, 2):
-        for C in range(0, block, 2):
-            # DEBUG
-            # debug_diagram_array = source_image.get_array().copy()
-            # END DEBUG
-
-            thresh = cv2.adaptiveThreshold(inverted_binary_image,
-                                           255,
-                                           cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                           cv2.THRESH_BINARY_INV,
-                                           block,
-                                           C)
-
-            # DEBUG
-            # cv2.imwrite(str(Path("assets/output") / f"{source_image.name}.Thresh.block-{block}.C-{C}.jpeg"), thresh)
-            # END DEBUG
-
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            rectangles = [r for c in contours if (r := cv2.boundingRect(c))[2] > 3 and r[3] > 3]
-            num_boxes = len(rectangles)
-
-            # DEBUG
-            # for rectangle in rectangles:
-            #     num_boxes += 1
-            #     x, y, w, h = rectangle
-            #     cv2.rectangle(debug_diagram_array, (x, y), (x+w, y+h), (0, 255, 0), thickness = 1)
-            # END DEBUG
-
-            if len(rectangles) <= 1:
-                logger.warning(f"Found {len(rectangles)} rectangles: set prox, rectangles, and boxes accordingly")
-                avg_prox = 0
-
+    __slots__ = ("thresholds", "settings", "evaluated", "lookahead", "engine")
+
+    def __init__(self, inverted_binary_image: np.ndarray, thresholds: Optional[GaussianThresholds] = None,
+                 lookahead: int = BOX_SEARCH_LOOKAHEAD, engine: BOX_ENGINE = DEFAULT_BOX_ENGINE):
+        self.thresholds = thresholds or GaussianThresholds(inverted_binary_image, max_blocks=lookahead + 2)
+        self.settings: List[Tuple[int, int]] = [(block, C) for block in range(5, 39, 2) for C in range(0, block, 2)]
+        self.evaluated: Dict[int, Tuple[np.ndarray, int, float]] = {}
+        self.lookahead = lookahead
+        self.engine = engine
+
+    @property
+    def passes(self) -> int:
+        """Number of full page threshold passes run so far"""
+        return len(self.evaluated)
+
+    def blocks(self) -> List[List[int]]:
+        """Step indexes grouped by block"""
+        grouped: Dict[int, List[int]] = {}
+        for index, (block, __) in enumerate(self.settings):
+            grouped.setdefault(block, []).append(index)
+        return list(grouped.values())
+
+    def step(self, index: int) -> Tuple[np.ndarray, int, float]:
+        if index not in self.evaluated:
+            self.evaluated[index] = self._evaluate(index)
+        return self.evaluated[index]
+
+    def prefetch(self, indexes: Iterable[int]):
+        """
+        Threshold steps a search is about to look at in parallel on the shared OCR scheduler, cv2 releases
+        the GIL. The search still decides step by step in order, so its answer does not change
+        """
+        missing = [index for index in dict.fromkeys(indexes)
+                   if 0 <= index < len(self.settings) and index not in self.evaluated]
+        if len(missing) < 2:
+            return
+        # Blur each block once before its C values are thresholded side by side
+        blocks = list(dict.fromkeys(self.settings[index][0] for index in missing))
+        if len(blocks) > 1:
+            ocr_scheduler.map(self.thresholds.difference, blocks)
+        for index, result in zip(missing, ocr_scheduler.map(self._evaluate, missing)):
+            self.evaluated[index] = result
+
+    def _evaluate(self, index: int) -> Tuple[np.ndarray, int, float]:
+        block, C = self.settings[index]
+        rectangles = find_rectangles(self.thresholds.mask(block, C), min_size=3, engine=self.engine)
+        if len(rectangles) <= 1:
+            logger.debug(f"Found {len(rectangles)} rectangles at block {block}, C {C}: set prox accordingly")
+        return (rectangles, *box_metrics(rectangles))
+
+    def converges(self, index: int) -> bool:
+        """
+        The stopping rule of the search: more than one box, and number of boxes and average proximity
+        close enough to the step before (which carries over from the previous block)
+        """
+        if index == 0:
+            return False
+        __, num_boxes, avg_prox = self.step(index)
+        if num_boxes <= 1:
+            return False
+        __, previous_num_boxes, previous_avg_prox = self.step(index - 1)
+        return close_enough((num_boxes, avg_prox), (previous_num_boxes, previous_avg_prox))
+
+
+def _grid_search(steps: ThresholdSteps, deadline: Optional[Deadline] = None) -> Optional[int]:
+    """Walk every step in order, return the step before the first one that converges"""
+    for index in range(len(steps.settings)):
+        if deadline and deadline.expired():
+            deadline.truncate("box search", f"block neighborhoods from {steps.settings[index]}")
+            return None
+        steps.prefetch(range(index, index + 1 + steps.lookahead))
+        if steps.converges(index):
+            return index - 1
+    return None
+
+
+def _bisect_search(steps: ThresholdSteps, deadline: Optional[Deadline] = None) -> Optional[int]:
+    """
+    Same answer as _grid_search in a fraction of the passes. Raising C only thins the threshold, so the box
+    count and proximity curves flatten out as C grows and a block either never converges or keeps converging
+    from some C up to its last one. Check the last C of each block and skip the block when it does not
+    converge (a single pass when that step has at most one box), otherwise bisect the block for the first
+    C that converges. The last C of the next lookahead blocks is thresholded alongside
+    """
+    blocks = steps.blocks()
+    for position, indexes in enumerate(blocks):
+        if deadline and deadline.expired():
+            deadline.truncate("box search", f"block neighborhoods from {steps.settings[indexes[0]]}")
+            return None
+        last_steps = [ahead[-1] for ahead in blocks[position:position + 1 + steps.lookahead]]
+        steps.prefetch(last_steps)
+        steps.prefetch([index - 1 for index in last_steps if steps.step(index)[1] > 1])
+        if not steps.converges(indexes[-1]):
+            continue
+        low, high = 0, len(indexes) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if steps.converges(indexes[middle]):
+                high = middle
             else:
-                avg_prox = calculate_average_closest_box_proximity(rectangles)
-                if close_enough((num_boxes, avg_prox), (previous_num_boxes, previous_avg_prox)):
-                    logger.debug(f"Found a good approximation of block neighborhood with: block {block - 2},"
-                                 f" boxes: {previous_num_boxes}, avg_prox: {previous_avg_prox}")
-                    actual_rectangles = previous_rectangles
-                    breakout = True
-                    break
-            previous_avg_prox = avg_prox
-            previous_num_boxes = num_boxes
-            previous_rectangles = rectangles
-        if breakout:
-            break
-    else:
-        logger.error(f"Reached limit of finding neighborhood bound without finding appropriate metric value")
-        return []
-        # raise ValueError(f"ERROR finding neighborhood bound for image {source_image.name}, exiting for debug")
-    return actual_rectangles
+                low = middle + 1
+        return indexes[low] - 1
+    return None
+
+
+BOX_SEARCHES = {
+    BOX_SEARCH.GRID: _grid_search,
+    BOX_SEARCH.BISECT: _bisect_search,
+}
+
+
+def _range_find_optimal_rectangles(source_image: ImageWrapper,
+                                   inverted_binary_image: np.ndarray,
+                                   deadline: Optional[Deadline] = None,
+                                   search: BOX_SEARCH = DEFAULT_BOX_SEARCH,
+                                   thresholds: Optional[GaussianThresholds] = None) -> np.ndarray:
+    """
+    Find optimal rectangles by approximating a good C and block_neighborhood for adaptiveThreshold.
+    The search gives up once the deadline expires, callers then fall back to a default block and C
+    """
+    steps = ThresholdSteps(inverted_binary_image, thresholds)
+    found = BOX_SEARCHES[search](steps, deadline)
+    if found is None:
+        logger.error(f"Reached limit of finding neighborhood bound for {source_image.name} without finding"
+                     f" appropriate metric value after {steps.passes} passes")
+        return np.zeros((0, 4), dtype=np.int32)
+    rectangles, num_boxes, avg_prox = steps.step(found)
+    logger.debug(f"Found a good approximation of block neighborhood with: {steps.settings[found]},"
+                 f" boxes: {num_boxes}, avg_prox: {avg_prox} after {steps.passes} passes")
+    return rectangles
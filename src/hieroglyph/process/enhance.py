@@ -8,9 +8,19 @@ from deskew import determine_skew
 from typing import Union, Tuple
 import logging
 
+from hieroglyph.utils.scheduler import ocr_scheduler
+from hieroglyph.general import DENOISER, DEFAULT_DENOISER, DENOISE_SPECK_AREA, DENOISE_TILE_SIZE, MAX_WORKERS, \
+                              DESKEW_MAX_SIZE, DESKEW_TOLERANCE
+
 # 32 pixels is the optimum OCR height
 MINIMUM_HEIGHT = 32
 
+# Enhancement factors of the preprocessed page, 1.0 leaves the image as it is
+BRIGHTNESS_FACTOR = 1.1
+COLOR_FACTOR = 1.5
+CONTRAST_FACTOR = 1.5
+SHARPNESS_FACTOR = 1.0
+
 logger = logging.getLogger(__name__)
 
 
@@ -169,6 +179,25 @@ def rotate(image: numpy.ndarray, angle: float, background: Union[int, Tuple[int,
     rot_mat[0, 2] += (height - old_height) / 2
     return cv2.warpAffine(image, rot_mat, (int(round(height)), int(round(width))), borderValue=background)
 
+def estimate_skew(image: numpy.ndarray, max_size: int = DESKEW_MAX_SIZE) -> float:
+    """
+    Skew angle of a single channel page in degrees, estimated on a thumbnail no longer than max_size
+    pixels. 0.0 when no angle is found, as for a blank page
+    """
+    scale = max_size / max(image.shape[:2]) if max_size > 0 else 1.0
+    if scale < 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    angle = determine_skew(image)
+    return 0.0 if angle is None else float(angle)
+
+
+def deskew(image: numpy.ndarray, angle: float, background: Union[int, Tuple[int, int, int]],
+           tolerance: float = DESKEW_TOLERANCE) -> numpy.ndarray:
+    """rotate, or the image itself when the angle is under tolerance degrees"""
+    if abs(angle) < tolerance:
+        return image
+    return rotate(image, angle, background)
+
 # def set_image_dpi(image: Image.Image) -> Image.Image: # same as manipulate_size
 #     length_x, width_y = image.size
 #     factor = min(1, float(1024.0 / length_x))
@@ -183,6 +212,89 @@ def remove_noise(image: numpy.ndarray) -> numpy.ndarray:
     image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     return cv2.fastNlMeansDenoisingColored(image, None, 10, 10, 7, 15)
 
+
+# Search and template windows of the NLM denoisers, a tile needs this margin to denoise like the whole page
+NLM_TEMPLATE_WINDOW = 7
+NLM_SEARCH_WINDOW = 15
+NLM_TILE_MARGIN = NLM_SEARCH_WINDOW // 2 + NLM_TEMPLATE_WINDOW // 2
+
+
+def remove_noise_gray(image: numpy.ndarray) -> numpy.ndarray:
+    """Non-local means on the single channel, skipping the Lab round trip of remove_noise"""
+    return cv2.fastNlMeansDenoising(image, None, 10, NLM_TEMPLATE_WINDOW, NLM_SEARCH_WINDOW)
+
+
+def remove_noise_tiled(image: numpy.ndarray, tile: int = DENOISE_TILE_SIZE) -> numpy.ndarray:
+    """
+    remove_noise_gray split into tiles denoised in parallel. Each tile is read with a margin covering the
+    search and template windows, so the result is the same as denoising the page at once
+    """
+    height, width = image.shape[:2]
+    output = numpy.empty_like(image)
+    tiles = [(top, left) for top in range(0, height, tile) for left in range(0, width, tile)]
+
+    def _denoise_tile(corner: Tuple[int, int]):
+        top, left = corner
+        y0, x0 = max(0, top - NLM_TILE_MARGIN), max(0, left - NLM_TILE_MARGIN)
+        y1, x1 = min(height, top + tile + NLM_TILE_MARGIN), min(width, left + tile + NLM_TILE_MARGIN)
+        denoised = remove_noise_gray(numpy.ascontiguousarray(image[y0:y1, x0:x1]))
+        output[top:top + tile, left:left + tile] = denoised[top - y0:top - y0 + tile, left - x0:left - x0 + tile]
+
+    ocr_scheduler.map(_denoise_tile, tiles)
+    return output
+
+
+def remove_specks(image: numpy.ndarray, area: int = DENOISE_SPECK_AREA) -> numpy.ndarray:
+    """
+    Area opening and closing of a binary image: ink blobs and paper holes smaller than area pixels are
+    flipped. After the median blur small strokes can be this small too, so this may trim characters
+    """
+    output = image.copy()
+    # Ink is 8-connected, so paper holes are 4-connected
+    for value, connectivity in ((0, 8), (255, 4)):
+        __, labels, stats, __ = cv2.connectedComponentsWithStats(cv2.compare(output, value, cv2.CMP_EQ),
+                                                                 connectivity=connectivity)
+        small = stats[:, cv2.CC_STAT_AREA] < area
+        small[0] = False
+        if small.any():
+            output[small[labels]] = 255 - value
+    return output
+
+
+def is_binary(image: numpy.ndarray) -> bool:
+    """Only 0 and 255 in a single channel image, as left by the global threshold"""
+    histogram = cv2.calcHist([image], [0], None, [256], [0, 256]).ravel()
+    return not histogram[1:255].any()
+
+
+def select_denoiser(image: numpy.ndarray) -> DENOISER:
+    """
+    Denoiser for a single channel image. Non-local means returns a binary image unchanged, as any two
+    patches that differ do so by 255, so binary pages are not denoised. Other pages get grayscale
+    non-local means, split into tiles when the page is large and there are workers to share them
+    """
+    if is_binary(image):
+        return DENOISER.NONE
+    if MAX_WORKERS > 1 and image.shape[0] * image.shape[1] > 2 * DENOISE_TILE_SIZE ** 2:
+        return DENOISER.TILED
+    return DENOISER.GRAY
+
+
+def denoise(image: numpy.ndarray, denoiser: DENOISER = DEFAULT_DENOISER) -> Tuple[numpy.ndarray, DENOISER]:
+    """Denoised single channel image and the denoiser used, picked from the image for DENOISER.AUTO"""
+    if denoiser == DENOISER.AUTO:
+        denoiser = select_denoiser(image)
+    if denoiser == DENOISER.COLORED:
+        return get_grayscale(remove_noise(image)), denoiser
+    elif denoiser == DENOISER.GRAY:
+        return remove_noise_gray(image), denoiser
+    elif denoiser == DENOISER.TILED:
+        return remove_noise_tiled(image), denoiser
+    elif denoiser == DENOISER.MORPHOLOGY:
+        return remove_specks(image), denoiser
+    return image, denoiser
+
+
 def thinning(image: numpy.ndarray) -> numpy.ndarray: # more useful for handwritten text to widen and make the line-width uniform. Not good for pages with various fonts/sizes
     kernel = numpy.ones((5, 5), numpy.uint8)
     return cv2.erode(image, kernel, iterations=1)
@@ -216,24 +328,47 @@ def execute_enhancement_on_pil_img(input_pil: Image.Image) -> Image.Image:
 
     image_array = remove_noise(image_array)
     image_array = get_grayscale(image_array)
-    angle = determine_skew(image_array)
-    image_array = rotate(image_array, angle, (0,0,0))
+    angle = estimate_skew(image_array)
+    image_array = deskew(image_array, angle, (0,0,0))
     # image_array = thresholding(image_array) # threshold the individual boxes in boxes.py
     # image_array = thinning(image_array) 
     # Convert back to PIL Image
     processed_pil = Image.fromarray(image_array)
     
 
-    brightness_output = _manipulate_brightness(processed_pil, 1.1) # processed_pil or input_pil if skipping first processing steps
-    color_output = _manipulate_color(brightness_output, 1.5)
-    contrast_output = _manipulate_contrast(color_output, 1.5)
+    brightness_output = _manipulate_brightness(processed_pil, BRIGHTNESS_FACTOR) # processed_pil or input_pil if skipping first processing steps
+    color_output = _manipulate_color(brightness_output, COLOR_FACTOR)
+    contrast_output = _manipulate_contrast(color_output, CONTRAST_FACTOR)
     resized_output = manipulate_size(contrast_output)
-    sharpened_output = manipulate_sharpness(resized_output, 1.0) # 2 is most sharp
+    sharpened_output = manipulate_sharpness(resized_output, SHARPNESS_FACTOR) # 2 is most sharp
     # final_modified_image = _add_padding(sharpened_output)
     # return final_modified_image
     return sharpened_output
 
 
+def blend_lut(degenerate: int, factor: float) -> numpy.ndarray:
+    """
+    Image.blend(Image.new("L", size, degenerate), image, factor) of an L image as a lookup table, with the
+    float32 arithmetic, clipping and truncation Pillow uses
+    """
+    values = numpy.arange(256, dtype=numpy.float32)
+    blended = numpy.float32(degenerate) + numpy.float32(factor) * (values - numpy.float32(degenerate))
+    return numpy.clip(blended, 0, 255).astype(numpy.uint8)
+
+
+def enhancement_lut(image_array: numpy.ndarray, brightness_factor: float = BRIGHTNESS_FACTOR,
+                    contrast_factor: float = CONTRAST_FACTOR) -> numpy.ndarray:
+    """
+    Brightness, color and contrast enhancement of execute_enhancement_on_pil_img as one lookup table.
+    Color does nothing to an L image, contrast blends towards the rounded mean of the brightened image,
+    which is read off the histogram rather than a brightened copy
+    """
+    brightness = blend_lut(0, brightness_factor)
+    histogram = cv2.calcHist([image_array], [0], None, [256], [0, 256]).ravel().astype(numpy.int64)
+    mean = int(int(histogram @ brightness.astype(numpy.int64)) / max(int(histogram.sum()), 1) + 0.5)
+    return blend_lut(mean, contrast_factor)[brightness]
+
+
 def test_pil_img():
     input_path = 'assets/diagrams/table.png'  # Input to Convert to PIL Image  #3_zh_sample_b2_d4.jpeg
     output_path = 'assets/diagrams/table.enhanced.both.png'  # Output Path
@@ -0,0 +1,145 @@
+# Decoded, preprocessed and thresholded pages kept between requests, so a density/box scale change on the
+# same page only reruns the adaptive threshold of the new (block, C)
+import hashlib
+import threading
+from copy import copy
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from hieroglyph.general import INBOUND_IMAGE_TYPE, PAGE_CACHE_BYTES, BOX_SEARCH_LOOKAHEAD
+from hieroglyph.utils.image import ImageWrapper
+from hieroglyph.process.threshold import GaussianThresholds, otsu_threshold, downscale_ink
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class PageLayout:
+    """
+    Everything box detection derives from one page before it picks a threshold, filled in as it is needed
+    {
+        source: ImageWrapper # decoded page boxes are cropped from, never modified once cached
+        transformed: ImageWrapper # preprocessed page boxes are detected on
+        binaries: {factor: (np.ndarray, float)} # inverted Otsu binary at a downscale factor, and the ink threshold
+        thresholds: {factor: GaussianThresholds} # per block Gaussian means of each binary
+        rectangles: {(image_type, scale_pairing, factor): np.ndarray} # boxes found for a request, [x,y,w,h] rows
+        processing: dict # profile of the preprocessing pipeline that made transformed
+    }
+    """
+    __slots__ = ("source", "transformed", "binaries", "thresholds", "rectangles", "processing", "_lock")
+
+    def __init__(self, source: ImageWrapper, transformed: ImageWrapper, processing: Optional[Dict[str, Any]] = None):
+        self.source = source
+        self.transformed = transformed
+        self.processing = processing or {}
+        self.binaries: Dict[int, Tuple[np.ndarray, float]] = {}
+        self.thresholds: Dict[int, GaussianThresholds] = {}
+        self.rectangles: Dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def inverted_binary(self, factor: int = 1) -> Tuple[np.ndarray, float]:
+        """Inverted binary of the preprocessed page, downscaled by factor, and the ink threshold it used"""
+        with self._lock:
+            if factor in self.binaries:
+                return self.binaries[factor]
+        transformed_image_array = self.transformed.get_array()
+        if factor > 1:
+            ink_threshold = otsu_threshold(transformed_image_array)
+            binary = downscale_ink(transformed_image_array, factor, ink_threshold)
+        else:
+            ink_threshold, binary = cv2.threshold(transformed_image_array, 0, 255,
+                                                  cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        with self._lock:
+            return self.binaries.setdefault(factor, (binary, ink_threshold))
+
+    def gaussian_thresholds(self, factor: int = 1) -> GaussianThresholds:
+        binary, __ = self.inverted_binary(factor)
+        with self._lock:
+            return self.thresholds.setdefault(factor, GaussianThresholds(binary, max_blocks=BOX_SEARCH_LOOKAHEAD + 2))
+
+    def cached_rectangles(self, key: tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            return self.rectangles.get(key)
+
+    def store_rectangles(self, key: tuple, rectangles: np.ndarray):
+        with self._lock:
+            self.rectangles[key] = rectangles
+
+    def named(self, name: str) -> Tuple[ImageWrapper, ImageWrapper]:
+        """Source and transformed pages under the name of the request, sharing the cached arrays"""
+        source, transformed = copy(self.source), copy(self.transformed)
+        source.name, transformed.name = name, f"{name}.modified.png"
+        return source, transformed
+
+    def nbytes(self) -> int:
+        """Upper bound of the memory the layout grows to at full resolution"""
+        page = self.transformed.get_array().nbytes
+        # Binary, plus int16 differences of the blocks GaussianThresholds keeps
+        return self.source.get_array().nbytes + page * (2 + 2 * (BOX_SEARCH_LOOKAHEAD + 2))
+
+
+class PageCache:
+    """
+    LRU of PageLayouts keyed by a hash of the inbound base64 page, its image type and preprocessing pipeline
+    {
+        max_bytes: int # memory budget, 0 caches nothing
+        _entries: OrderedDict[key, (PageLayout, size in bytes)] # least recently used first
+    }
+    """
+
+    def __init__(self, max_bytes: int = PAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[PageLayout, int]]" = OrderedDict()
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(b64data: str, image_type: INBOUND_IMAGE_TYPE, pipeline: str = "") -> Tuple[str, ...]:
+        """pipeline is the PreprocessPipeline.key the page is preprocessed with. The name is left out, the same
+        page sent under another name is a hit that PageLayout.named renames"""
+        return hashlib.blake2b(b64data.encode(), digest_size=20).hexdigest(), image_type.value, pipeline
+
+    def get(self, key: Tuple[str, ...]) -> Optional[PageLayout]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return self._entries[key][0]
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: Tuple[str, ...], layout: PageLayout):
+        if not self.enabled:
+            return
+        size = layout.nbytes()
+        if size > self.max_bytes:
+            logger.debug(f"Not caching {layout.source.name}, {size} bytes is over the page cache budget")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (layout, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                __, (__, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, int | bool]:
+        with self._lock:
+            return {"enabled": self.enabled,
+                    "entries": len(self._entries),
+                    "bytes": self._bytes,
+                    "max_bytes": self.max_bytes,
+                    **self._counters}
+
+
+page_cache = PageCache()
@@ -0,0 +1,145 @@
+# Cheap look at a decoded page to send clean, straight digital images down a minimal preprocessing pipeline
+import math
+import threading
+import time
+from enum import Enum
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Noise is estimated on a crop of at most this side, aligned to the 8x8 blocks of JPEG
+SAMPLE_SIZE = 1024
+# Straightness is measured on a thumbnail no longer than this
+THUMBNAIL_SIZE = 512
+# Above this estimated standard deviation of grey level noise the page is a photo or a scan
+MAX_NOISE_SIGMA = 4.0
+# The 8 most frequent grey levels of a digital image cover at least this share of it
+MIN_PALETTE_SHARE = 0.5
+# Small grey level steps this much more common across 8x8 block borders than inside blocks are JPEG artefacts
+MAX_BLOCKINESS = 1.1
+# The row profile of the ink must be this much sharper at 0 degrees than at any of SKEW_ANGLES
+MIN_STRAIGHTNESS = 1.5
+SKEW_ANGLES = (-10.0, -5.0, -3.0, -1.5, 1.5, 3.0, 5.0, 10.0)
+# Grey level steps up to this size are compression noise rather than edges
+MAX_ARTEFACT_STEP = 12
+
+# Immerkaer's noise estimation kernel, the difference of two Laplacians which cancels out image structure
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+# Enum Type
+# Outcome of looking at a page before preprocessing, the first check it failed or clean
+class PAGE_CLASS(Enum):
+    CLEAN = "clean"
+    NOISY = "noisy"
+    CONTINUOUS_TONE = "continuous_tone"
+    COMPRESSED = "compressed"
+    SKEWED = "skewed"
+
+
+def _sample(image: np.ndarray) -> np.ndarray:
+    """Central crop of at most SAMPLE_SIZE pixels a side, starting on the 8 pixel JPEG grid"""
+    height, width = image.shape[:2]
+    top = max(0, (height - SAMPLE_SIZE) // 2) // 8 * 8
+    left = max(0, (width - SAMPLE_SIZE) // 2) // 8 * 8
+    return image[top:top + SAMPLE_SIZE, left:left + SAMPLE_SIZE]
+
+
+def noise_sigma(sample: np.ndarray) -> float:
+    """Standard deviation of grey level noise by Immerkaer's method"""
+    height, width = sample.shape[:2]
+    if height < 3 or width < 3:
+        return 0.0
+    response = cv2.filter2D(sample, cv2.CV_32F, NOISE_KERNEL)[1:-1, 1:-1]
+    return math.sqrt(math.pi / 2) * float(cv2.norm(response, cv2.NORM_L1)) / (6 * (height - 2) * (width - 2))
+
+
+def palette_share(image: np.ndarray) -> float:
+    """Share of the page covered by its 8 most frequent grey levels"""
+    histogram = cv2.calcHist([image], [0], None, [256], [0, 256]).ravel()
+    return float(np.sort(histogram)[-8:].sum() / max(image.size, 1))
+
+
+def blockiness(sample: np.ndarray) -> float:
+    """How much more common small grey level steps are across 8x8 block borders than inside the blocks"""
+    signed = sample.astype(np.int16)
+    border, inside = 0.0, 0.0
+    for steps in (np.abs(np.diff(signed, axis=1)), np.abs(np.diff(signed, axis=0)).T):
+        artefacts = (steps > 0) & (steps <= MAX_ARTEFACT_STEP)
+        on_border = np.arange(artefacts.shape[1]) % 8 == 7
+        if on_border.all() or not on_border.any():
+            continue
+        border += artefacts[:, on_border].mean()
+        inside += artefacts[:, ~on_border].mean()
+    return (border + 1e-4) / (inside + 1e-4)
+
+
+def straightness(image: np.ndarray) -> float:
+    """
+    Sharpness of the row profile of the ink at 0 degrees over its sharpest at SKEW_ANGLES, above 1 when text
+    lines run straight across the page
+    """
+    scale = THUMBNAIL_SIZE / max(image.shape[:2])
+    thumbnail = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else image
+    __, ink = cv2.threshold(thumbnail, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Ink is whatever is in the minority, so light text on a dark fill is treated like dark text on white
+    if cv2.countNonZero(ink) > ink.size // 2:
+        ink = 1 - ink
+    height, width = ink.shape
+    # Rulings and frames are straight whatever the skew of the text inside them, only text lines count
+    rulings = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(20, width // 20), 1)))
+    ink = cv2.subtract(ink, rulings)
+
+    def _sharpness(angle: float) -> float:
+        shear = math.tan(math.radians(angle))
+        sheared = cv2.warpAffine(ink, np.float32([[1, 0, 0], [shear, 1, -shear * width / 2]]), (width, height),
+                                 flags=cv2.INTER_NEAREST) if angle else ink
+        return float(np.square(np.diff(sheared.sum(axis=1, dtype=np.float64))).sum())
+
+    return _sharpness(0.0) / max(max(_sharpness(angle) for angle in SKEW_ANGLES), 1e-9)
+
+
+def triage_page(image: np.ndarray) -> Tuple[PAGE_CLASS, Dict[str, float]]:
+    """Classify a grayscale page from its noise, grey level palette, JPEG blockiness and straightness"""
+    start = time.perf_counter()
+    sample = _sample(image)
+    measures = {"noise": noise_sigma(sample), "palette": palette_share(image), "blockiness": blockiness(sample)}
+    if measures["noise"] > MAX_NOISE_SIGMA:
+        page_class = PAGE_CLASS.NOISY
+    elif measures["palette"] < MIN_PALETTE_SHARE:
+        page_class = PAGE_CLASS.CONTINUOUS_TONE
+    elif measures["blockiness"] > MAX_BLOCKINESS:
+        page_class = PAGE_CLASS.COMPRESSED
+    else:
+        measures["straightness"] = straightness(image)
+        page_class = PAGE_CLASS.CLEAN if measures["straightness"] >= MIN_STRAIGHTNESS else PAGE_CLASS.SKEWED
+    measures = {name: round(float(value), 3) for name, value in measures.items()}
+    measures["seconds"] = time.perf_counter() - start
+    return page_class, measures
+
+
+class PageTriageStats:
+    """Thread safe counters of pages of each class and of pages routed to the triage pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int | float] = {"classified": 0, "routed": 0, "seconds": 0.0,
+                                                  **{f"class_{page_class.value}": 0 for page_class in PAGE_CLASS}}
+
+    def record(self, page_class: PAGE_CLASS, seconds: float, routed: bool):
+        with self._lock:
+            self._counters["classified"] += 1
+            self._counters[f"class_{page_class.value}"] += 1
+            self._counters["routed"] += routed
+            self._counters["seconds"] += seconds
+
+    def stats(self) -> Dict[str, int | float]:
+        with self._lock:
+            return dict(self._counters)
+
+
+page_triage_stats = PageTriageStats()
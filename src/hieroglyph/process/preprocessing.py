@@ -0,0 +1,193 @@
+# Declarative preprocessing: a pipeline is an ordered list of stages with parameters, picked per image type or per
+# request, and every stage reports its wall time and the bytes it allocated
+import inspect
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from hieroglyph.general import (INBOUND_IMAGE_TYPE, DENOISER, DEFAULT_DENOISER, DESKEW_MAX_SIZE, DESKEW_TOLERANCE,
+                                PREPROCESS_PIPELINES, PREPROCESS_TRACE_MEMORY)
+from hieroglyph.process.enhance import (BRIGHTNESS_FACTOR, CONTRAST_FACTOR, MINIMUM_HEIGHT, SHARPNESS_FACTOR,
+                                        denoise, deskew, enhancement_lut, estimate_skew, manipulate_sharpness,
+                                        manipulate_size, normalize_image, thinning)
+
+import logging
+logger = logging.getLogger(__name__)
+
+# A stage returns the new page, or the new page and details to report with its timings
+StageResult = Union[np.ndarray, Tuple[np.ndarray, Dict[str, Any]]]
+
+
+def _median_blur(image: np.ndarray, size: int = 3) -> StageResult:
+    return cv2.medianBlur(image, size)
+
+
+def _threshold(image: np.ndarray, value: int = 127) -> StageResult:
+    cv2.threshold(image, value, 255, cv2.THRESH_BINARY, dst=image)
+    return image
+
+
+def _otsu(image: np.ndarray) -> StageResult:
+    threshold, __ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=image)
+    return image, {"threshold": threshold}
+
+
+def _denoise(image: np.ndarray, denoiser: str = DEFAULT_DENOISER.value) -> StageResult:
+    denoised, used = denoise(image, DENOISER(denoiser))
+    return denoised, {"denoiser": used.value}
+
+
+def _deskew(image: np.ndarray, max_size: int = DESKEW_MAX_SIZE, tolerance: float = DESKEW_TOLERANCE) -> StageResult:
+    angle = estimate_skew(image, max_size)
+    return deskew(image, angle, (0, 0, 0), tolerance), {"angle": angle}
+
+
+def _enhance(image: np.ndarray, brightness: float = BRIGHTNESS_FACTOR, contrast: float = CONTRAST_FACTOR) -> StageResult:
+    cv2.LUT(image, enhancement_lut(image, brightness, contrast), dst=image)
+    return image
+
+
+def _resize(image: np.ndarray) -> StageResult:
+    # Same LANCZOS resize as the Pillow pipeline, only for pages under the OCR minimum height
+    if image.shape[0] < MINIMUM_HEIGHT:
+        return np.array(manipulate_size(Image.fromarray(image)))
+    return image
+
+
+def _sharpen(image: np.ndarray, factor: float = SHARPNESS_FACTOR) -> StageResult:
+    # Image.blend returns the image itself at 1.0
+    if factor != 1.0:
+        return np.array(manipulate_sharpness(Image.fromarray(image), factor))
+    return image
+
+
+def _normalize(image: np.ndarray) -> StageResult:
+    return normalize_image(image)
+
+
+def _thin(image: np.ndarray) -> StageResult:
+    return thinning(image)
+
+
+# Stage name: (function, whether it writes to the page it is given)
+STAGES: Dict[str, Tuple[Callable[..., StageResult], bool]] = {
+    "median_blur": (_median_blur, False),
+    "threshold": (_threshold, True),
+    "otsu": (_otsu, True),
+    "denoise": (_denoise, False),
+    "deskew": (_deskew, False),
+    "enhance": (_enhance, True),
+    "resize": (_resize, False),
+    "sharpen": (_sharpen, False),
+    "normalize": (_normalize, False),
+    "thin": (_thin, False),
+}
+
+# Named pipelines, PREPROCESS_PIPELINE and the preprocess request field can name one of these
+PIPELINES: Dict[str, List[Dict[str, Any]]] = {
+    # Same pixels as the Pillow engine with {"stage": "denoise", "denoiser": "colored"}
+    "standard": [{"stage": "median_blur"}, {"stage": "threshold"}, {"stage": "denoise"}, {"stage": "deskew"},
+                 {"stage": "enhance"}, {"stage": "resize"}, {"stage": "sharpen"}],
+    # Standard without denoise and deskew, which page triage sends clean straight pages to. After the threshold
+    #  the automatic denoiser leaves pages alone, so this gives the standard pixels on pages deskew would not rotate
+    "fast": [{"stage": "median_blur"}, {"stage": "threshold"}, {"stage": "enhance"}, {"stage": "resize"},
+             {"stage": "sharpen"}],
+    # Digital-born pages, straight and without scanning noise. Box detection needs the median blur, without it
+    #  ss.png gives 15 boxes instead of the 376 of standard
+    "clean": [{"stage": "median_blur"}, {"stage": "threshold"}, {"stage": "enhance"}, {"stage": "resize"}],
+    # Phone photos, denoised before the threshold turns noise into specks
+    "photo": [{"stage": "denoise", "denoiser": DENOISER.GRAY.value}, {"stage": "median_blur"}, {"stage": "threshold"},
+              {"stage": "deskew"}, {"stage": "enhance"}, {"stage": "resize"}, {"stage": "sharpen"}],
+}
+
+
+class PreprocessPipeline:
+    """
+    Ordered stages a page is preprocessed with
+    {
+        name: str # name in PIPELINES, "custom" for a list of stages given directly
+        stages: [{"stage": "median_blur", "size": 3}] # stage names of STAGES and their parameters
+        key: str # canonical JSON of the stages, pages preprocessed by equal keys are equal
+    }
+    """
+    __slots__ = ("name", "stages", "key")
+
+    def __init__(self, stages: List[Dict[str, Any]], name: str = "custom"):
+        if not isinstance(stages, list) or not stages:
+            raise ValueError(f"A preprocessing pipeline is a non empty list of stages, not {stages!r}")
+        for stage in stages:
+            if not isinstance(stage, dict) or stage.get("stage") not in STAGES:
+                raise ValueError(f"Unknown preprocessing stage {stage!r}, stages are {', '.join(STAGES)}")
+            function, __ = STAGES[stage["stage"]]
+            parameters = {parameter: value for parameter, value in stage.items() if parameter != "stage"}
+            try:
+                inspect.signature(function).bind(None, **parameters)
+            except TypeError as e:
+                raise ValueError(f"Improper parameters for preprocessing stage {stage!r}: {e}")
+            if "denoiser" in parameters:
+                DENOISER(parameters["denoiser"])
+        self.name = name
+        self.stages = stages
+        self.key = json.dumps(stages, sort_keys=True)
+
+    @classmethod
+    def parse(cls, spec: Union[str, List[Dict[str, Any]], "PreprocessPipeline"]) -> "PreprocessPipeline":
+        """Pipeline from the name of one in PIPELINES, a list of stages or that list as JSON"""
+        if isinstance(spec, PreprocessPipeline):
+            return spec
+        if isinstance(spec, str):
+            if spec in PIPELINES:
+                return cls(PIPELINES[spec], name=spec)
+            try:
+                spec = json.loads(spec)
+            except json.JSONDecodeError:
+                raise ValueError(f"Unknown preprocessing pipeline {spec!r}, pipelines are {', '.join(PIPELINES)}")
+        return cls(spec)
+
+    def run(self, image: np.ndarray, profile: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Preprocessed page, the page given is never modified. Each stage adds its seconds and the bytes of the
+        page it allocated to profile["stages"], with the peak traced heap when PREPROCESS_TRACE_MEMORY is set
+        """
+        profile = {} if profile is None else profile
+        profile.update({"pipeline": self.name, "cached": False, "stages": []})
+        tracing = PREPROCESS_TRACE_MEMORY and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        owned = False
+        start = time.perf_counter()
+        try:
+            for stage in self.stages:
+                function, in_place = STAGES[stage["stage"]]
+                stage_start = time.perf_counter()
+                if PREPROCESS_TRACE_MEMORY:
+                    tracemalloc.reset_peak()
+                page = image if owned or not in_place else image.copy()
+                result = function(page, **{parameter: value for parameter, value in stage.items()
+                                           if parameter != "stage"})
+                page, details = result if isinstance(result, tuple) else (result, {})
+                allocated = page is not image and not np.may_share_memory(page, image)
+                entry = {"stage": stage["stage"],
+                         "seconds": time.perf_counter() - stage_start,
+                         "bytes": page.nbytes if allocated else 0,
+                         **details}
+                if PREPROCESS_TRACE_MEMORY:
+                    entry["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                profile["stages"].append(entry)
+                owned = owned or allocated
+                image = page
+        finally:
+            if tracing:
+                tracemalloc.stop()
+        profile["seconds"] = time.perf_counter() - start
+        return image
+
+
+def pipeline_for(image_type: INBOUND_IMAGE_TYPE) -> PreprocessPipeline:
+    """Pipeline set for image_type by PREPROCESS_PIPELINE(_<TYPE>)"""
+    return PreprocessPipeline.parse(PREPROCESS_PIPELINES[image_type])
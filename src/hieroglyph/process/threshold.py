@@ -1,3 +1,6 @@
+import threading
+from collections import OrderedDict
+
 import cv2
 import numpy as np
 from PIL import Image
@@ -39,3 +42,75 @@ def threshold_image(source_image: np.ndarray, method=None) -> np.ndarray:
     else:
         logger.debug("Threshold: Returning unmodified image")
         return source_image
+
+
+class GaussianThresholds:
+    """
+    cv2.adaptiveThreshold(ADAPTIVE_THRESH_GAUSSIAN_C, THRESH_BINARY_INV) of one image for many (block, C).
+    The Gaussian weighted local mean only depends on the block, so it is blurred once per block and
+    every C is a single comparison of the image minus its mean against -C, pixel for pixel equal to OpenCV
+    {
+        source_image: np.ndarray # uint8 single channel image being thresholded
+        max_blocks: int # number of blocks whose difference to the mean is kept
+        differences: OrderedDict[int, np.ndarray] # block -> int16 source minus Gaussian mean, least recent first
+    }
+    Safe to share between threads, two threads asking for the same new block may both blur it
+    """
+    __slots__ = ("source_image", "max_blocks", "differences", "_lock")
+
+    def __init__(self, source_image: np.ndarray, max_blocks: int = 2):
+        self.source_image = source_image
+        self.max_blocks = max_blocks
+        self.differences: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def difference(self, block: int) -> np.ndarray:
+        with self._lock:
+            if block in self.differences:
+                self.differences.move_to_end(block)
+                return self.differences[block]
+        # Same as adaptiveThreshold: blur in float32 then round and saturate back to uint8
+        mean = cv2.GaussianBlur(self.source_image.astype(np.float32), (block, block), 0,
+                                borderType=cv2.BORDER_REPLICATE | cv2.BORDER_ISOLATED)
+        difference = cv2.subtract(self.source_image, cv2.convertScaleAbs(mean), dtype=cv2.CV_16S)
+        with self._lock:
+            self.differences[block] = difference
+            while len(self.differences) > self.max_blocks:
+                self.differences.popitem(last=False)
+        return difference
+
+    def mask(self, block: int, C: int) -> np.ndarray:
+        """255 where the pixel is at least C below its local mean, 0 elsewhere"""
+        return cv2.compare(self.difference(block), -C, cv2.CMP_LE)
+
+
+def otsu_threshold(source_image: np.ndarray) -> float:
+    """The value cv2.threshold(THRESH_OTSU) picks for a uint8 image, from its histogram alone"""
+    histogram = cv2.calcHist([source_image], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+    total = histogram.sum()
+    if not total:
+        return 0.0
+    levels = np.arange(256, dtype=np.float64)
+    weight = np.cumsum(histogram) / total
+    cumulative_mean = np.cumsum(histogram * levels) / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (cumulative_mean[-1] * weight - cumulative_mean) ** 2 / (weight * (1 - weight))
+    between = np.nan_to_num(between, nan=0.0, posinf=0.0)
+    return float(np.argmax(between))
+
+
+def downscale_ink(source_image: np.ndarray, factor: int, ink_threshold: float, rows: int = 64) -> np.ndarray:
+    """
+    Inverted binary copy of source_image shrunk by an integer factor, 255 where any pixel it covers is
+    ink (at or below ink_threshold). Read in strips of rows downscaled rows, so the full resolution page is
+    never binarized as a whole and thin strokes survive the downscale
+    """
+    height, width = source_image.shape[:2]
+    small = np.zeros((-(-height // factor), -(-width // factor)), dtype=np.uint8)
+    # Minimum over each factor x factor cell, anchored at its top left pixel
+    kernel = np.ones((factor, factor), dtype=np.uint8)
+    for top in range(0, height, rows * factor):
+        strip = cv2.erode(source_image[top:top + rows * factor], kernel, anchor=(0, 0),
+                          borderType=cv2.BORDER_REPLICATE)[::factor, ::factor]
+        small[top // factor:top // factor + strip.shape[0]] = cv2.compare(strip, ink_threshold, cv2.CMP_LE)
+    return small
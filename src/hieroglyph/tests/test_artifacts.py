@@ -0,0 +1,58 @@
+import threading
+
+import cv2
+import numpy as np
+
+from hieroglyph.general import INBOUND_IMAGE_TYPE
+from hieroglyph.process import boxes
+from hieroglyph.utils.artifacts import ArtifactWriter
+from hieroglyph.utils.image import ImageWrapper
+
+
+def test_sampling_picks_one_in_every_pages():
+    writer = ArtifactWriter(enabled=True, every=3)
+    assert [writer.sample() for __ in range(7)] == [True, False, False, True, False, False, True]
+    assert not any(ArtifactWriter(enabled=False).sample() for __ in range(3))
+
+
+def test_artifacts_are_written_in_the_background_and_dropped_when_the_queue_is_full(tmp_path):
+    writer = ArtifactWriter(directory=str(tmp_path), enabled=True, max_queued=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+        return np.zeros((4, 4), dtype=np.uint8)
+
+    assert writer.submit("first.png", blocked)
+    started.wait(5)
+    # The writer is busy with the first artifact, the queue holds one more
+    assert writer.submit("second.png", np.full((4, 4), 255, dtype=np.uint8))
+    assert not writer.submit("third.png", np.zeros((4, 4), dtype=np.uint8))
+    release.set()
+    writer.flush()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["first.png", "second.png"]
+    assert cv2.imread(str(tmp_path / "second.png"), cv2.IMREAD_GRAYSCALE).min() == 255
+    stats = writer.stats()
+    assert (stats["queued"], stats["written"], stats["dropped"], stats["waiting"]) == (2, 2, 1, 0)
+
+
+def test_sampled_pages_get_their_boxes_drawn(tmp_path, monkeypatch):
+    page = np.full((300, 400), 255, dtype=np.uint8)
+    for x, y in [(30, 40), (220, 160)]:
+        cv2.rectangle(page, (x, y), (x + 150, y + 80), 0, 2)
+        cv2.putText(page, "label", (x + 20, y + 50), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    writer = ArtifactWriter(directory=str(tmp_path), enabled=True)
+    monkeypatch.setattr(boxes, "artifact_writer", writer)
+    image = ImageWrapper(src_image=page, name="page", image_type=INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+    found = boxes.get_bounding_boxes(image, image, INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+    writer.flush()
+
+    drawn = cv2.imread(str(tmp_path / "page.all_boxes.png"), cv2.IMREAD_GRAYSCALE)
+    assert found and np.count_nonzero(drawn != page) > 0
+    # Every box outline is drawn on the debug image
+    for box in found:
+        x, y, w, h = box._box
+        assert drawn[y, x:x + w].max() == 0
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+from hieroglyph.general import INBOUND_IMAGE_TYPE, BOX_DETECTION
+from hieroglyph.process.boxes import get_bounding_boxes, refine_to_full_resolution, find_table_grid_rectangles, \
+    convert_given_boxes
+from hieroglyph.utils.image import ImageWrapper
+
+
+def _page() -> np.ndarray:
+    page = np.full((2400, 3400), 255, dtype=np.uint8)
+    for x, y in [(200, 300), (1900, 300), (200, 1500)]:
+        for line in range(3):
+            cv2.putText(page, "Hieroglyph text", (x, y + 120 * line), cv2.FONT_HERSHEY_SIMPLEX, 3, 0, 6)
+    return page
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    overlap = max(0, x2 - x1) * max(0, y2 - y1)
+    return overlap / (a[2] * a[3] + b[2] * b[3] - overlap)
+
+
+def test_pyramid_boxes_match_full_resolution_and_crop_the_full_page():
+    page = ImageWrapper(src_image=_page(), name="page", image_type=INBOUND_IMAGE_TYPE.TEXT_BASED)
+    found = {detection: get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.TEXT_BASED, detection=detection)
+             for detection in BOX_DETECTION}
+    full, pyramid = found[BOX_DETECTION.FULL], found[BOX_DETECTION.PYRAMID]
+    assert len(full) == len(pyramid) == 9
+    for box in pyramid:
+        assert max(_iou(box._box, other._box) for other in full) > 0.85
+        x, y, w, h = box._box
+        assert np.array_equal(box.get_array(), page.get_array()[y:y + h, x:x + w])
+
+
+def test_edges_are_refined_onto_full_resolution_ink():
+    page = np.full((400, 600), 255, dtype=np.uint8)
+    page[101:203, 150:451] = 0
+    # Ink at [150, 101, 301, 102] found on a copy downscaled by 4 as [37, 25, 76, 26]
+    assert refine_to_full_resolution([(37, 25, 76, 26)], 4, page, 127) == [(146, 97, 309, 110)]
+
+
+def test_table_grid_cells_come_from_ruling_lines_without_ocr():
+    page = np.full((500, 700), 255, dtype=np.uint8)
+    page[:, :30] = 60  # dark scanner margin
+    for y in (50, 150, 250, 350):
+        cv2.line(page, (100, y), (600, y), 130, 1)
+    for x in (100, 350, 600):
+        cv2.line(page, (x, 50), (x, 350), 130, 1)
+    # Merge the two cells of the first row
+    page[51:150, 349:352] = 255
+    cv2.putText(page, "cell", (150, 220), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    cells = find_table_grid_rectangles(page)
+    assert len(cells) == 5
+    assert [(x, y) for x, y, w, h in cells.tolist()] == [(102, 52), (102, 152), (352, 152), (102, 252), (352, 252)]
+    assert all(abs(w - 246) <= 2 or abs(w - 496) <= 2 for x, y, w, h in cells.tolist())
+
+    wrapper = ImageWrapper(src_image=page, name="table", image_type=INBOUND_IMAGE_TYPE.TABLE_BASED)
+    boxes = get_bounding_boxes(wrapper, wrapper, INBOUND_IMAGE_TYPE.TABLE_BASED)
+    assert [box._box for box in boxes] == cells.tolist()
+
+
+def test_boxes_are_views_of_the_page_until_resized():
+    page = ImageWrapper(src_image=_page(), name="page", image_type=INBOUND_IMAGE_TYPE.TEXT_BASED)
+    tall, short = convert_given_boxes(page, page, INBOUND_IMAGE_TYPE.TEXT_BASED, [[10, 20, 300, 40], [50, 60, 100, 16]])
+    assert np.shares_memory(tall.get_array(), page.get_array()) and not tall.get_array().flags.writeable
+    assert np.array_equal(tall.get_array(), page.get_array()[20:60, 10:310])
+    # Below the OCR minimum height the box is read as a resized copy
+    assert short.get_array().shape == (32, 200) and not np.shares_memory(short.get_array(), page.get_array())
+    # and resized once however often OCR reads it
+    assert short.get_array() is short.get_array() and tall.get_array() is not tall.get_array()
+    assert tall.get_pillow().size == (300, 40)
+
+
+def test_given_boxes_are_all_read_even_when_they_overlap():
+    page = ImageWrapper(src_image=_page(), name="page", image_type=INBOUND_IMAGE_TYPE.TEXT_BASED)
+    given = [[10, 20, 300, 40], [12, 22, 296, 38], [10, 20, 300, 40]]
+    boxes = convert_given_boxes(page, page, INBOUND_IMAGE_TYPE.TEXT_BASED, given)
+    assert [box._box for box in boxes] == sorted(given)
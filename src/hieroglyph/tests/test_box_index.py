@@ -0,0 +1,43 @@
+import numpy as np
+
+from hieroglyph.process.box_index import BoxIndex, deduplicate
+
+
+def _random_boxes(count, seed=0):
+    generator = np.random.default_rng(seed)
+    corners = generator.integers(0, 1000, (count, 2))
+    sides = generator.integers(1, 80, (count, 2))
+    return np.hstack((corners, sides))
+
+
+def test_queries_match_a_brute_force_scan():
+    boxes = _random_boxes(400)
+    index = BoxIndex(boxes)
+    for box in _random_boxes(50, seed=1).tolist():
+        x, y, w, h = box
+        width = np.minimum(x + w, boxes[:, 0] + boxes[:, 2]) - np.maximum(x, boxes[:, 0])
+        height = np.minimum(y + h, boxes[:, 1] + boxes[:, 3]) - np.maximum(y, boxes[:, 1])
+        expected = np.flatnonzero((width > 0) & (height > 0))
+        indexes, iou = index.iou(box)
+        assert sorted(indexes.tolist()) == expected.tolist()
+        union = w * h + boxes[indexes, 2] * boxes[indexes, 3] - width[indexes] * height[indexes]
+        assert np.allclose(iou, width[indexes] * height[indexes] / union)
+
+        inside = np.flatnonzero((boxes[:, 0] <= x) & (x < boxes[:, 0] + boxes[:, 2]) &
+                                (boxes[:, 1] <= y) & (y < boxes[:, 1] + boxes[:, 3]))
+        hits = index.at(x, y)
+        assert sorted(hits.tolist()) == inside.tolist()
+        assert np.all(np.diff(boxes[hits, 2] * boxes[hits, 3]) >= 0)
+
+
+def test_duplicates_are_dropped_but_boxes_inside_a_frame_are_kept():
+    boxes = [[0, 0, 500, 500],     # frame around everything
+             [10, 10, 100, 20],
+             [11, 10, 100, 20],     # same line found twice
+             [200, 200, 50, 50],
+             [205, 205, 40, 40],    # nested in a box less than twice its size
+             [300, 300, 40, 10]]
+    keep = deduplicate(boxes, iou_threshold=0.7, containment_threshold=0.9)
+    assert keep.tolist() == [True, True, False, True, False, True]
+    assert deduplicate(boxes, iou_threshold=0).all()
+    assert len(deduplicate([])) == 0 and len(BoxIndex([]).at(3, 3)) == 0
@@ -0,0 +1,23 @@
+import numpy as np
+
+from hieroglyph.process.box_metrics import box_metrics, mean_neighbour_distance, nearest_neighbour_distances
+
+
+RECTANGLES = [(100, 0, 10, 10), (0, 0, 10, 10), (0, 40, 20, 20), (50, 45, 10, 10)]
+
+
+def test_neighbour_distance_pairs_boxes_in_reading_order():
+    # Midpoints (5,5) -> (105,5) -> (10,50) -> (55,50)
+    expected = np.mean([100.0, np.hypot(95, 45), 45.0])
+    assert np.isclose(mean_neighbour_distance(RECTANGLES), expected)
+    assert box_metrics(np.array(RECTANGLES)) == (4, mean_neighbour_distance(RECTANGLES))
+    assert box_metrics([(1, 2, 3, 4)]) == (1, 0.0)
+
+
+def test_nearest_neighbour_matches_brute_force():
+    rng = np.random.default_rng(0)
+    rectangles = np.hstack((rng.integers(0, 500, (300, 2)), rng.integers(4, 30, (300, 2))))
+    midpoints = rectangles[:, :2] + 0.5 * rectangles[:, 2:]
+    pairwise = np.hypot(*(midpoints[:, None, :] - midpoints[None, :, :]).transpose(2, 0, 1))
+    np.fill_diagonal(pairwise, np.inf)
+    assert np.allclose(nearest_neighbour_distances(rectangles), pairwise.min(axis=1))
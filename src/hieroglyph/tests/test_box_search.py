@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+
+from hieroglyph.general import BOX_ENGINE
+from hieroglyph.process.boxes import ThresholdSteps, _bisect_search, _grid_search, find_rectangles
+from hieroglyph.utils.deadline import Deadline
+
+
+def _diagram() -> np.ndarray:
+    """Inverted binary page with a few labelled boxes, as handed to the block/C search"""
+    page = np.full((400, 600), 255, dtype=np.uint8)
+    for num, (x, y) in enumerate([(30, 40), (330, 40), (30, 240), (330, 240)]):
+        cv2.rectangle(page, (x, y), (x + 220, y + 110), 0, 2)
+        cv2.putText(page, f"Router {num}", (x + 20, y + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    __, inverted = cv2.threshold(page, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return inverted
+
+
+def test_bisect_finds_the_grid_setting_in_fewer_passes():
+    grid_steps, bisect_steps = ThresholdSteps(_diagram(), lookahead=0), ThresholdSteps(_diagram(), lookahead=0)
+    found = _grid_search(grid_steps)
+    assert found is not None
+    assert _bisect_search(bisect_steps) == found
+    assert np.array_equal(bisect_steps.step(found)[0], grid_steps.step(found)[0])
+    assert bisect_steps.passes <= grid_steps.passes
+
+
+def test_page_that_never_settles_is_given_up_early():
+    grid_steps, bisect_steps = ThresholdSteps(np.zeros((200, 300), dtype=np.uint8), lookahead=0), \
+        ThresholdSteps(np.zeros((200, 300), dtype=np.uint8), lookahead=0)
+    assert _grid_search(grid_steps) is None
+    assert _bisect_search(bisect_steps) is None
+    # One pass per block, the last C of each has a single box
+    assert bisect_steps.passes == len(bisect_steps.blocks()) < grid_steps.passes
+
+
+def test_search_cut_short_by_the_deadline_truncates_the_page():
+    for search in (_grid_search, _bisect_search):
+        deadline = Deadline(0)
+        assert search(ThresholdSteps(_diagram(), lookahead=0), deadline) is None
+        assert deadline.truncated
+
+
+def test_speculative_lookahead_does_not_change_the_answer():
+    for search in (_grid_search, _bisect_search):
+        sequential, speculative = ThresholdSteps(_diagram(), lookahead=0), ThresholdSteps(_diagram(), lookahead=3)
+        found = search(sequential)
+        assert search(speculative) == found
+        assert np.array_equal(speculative.step(found)[0], sequential.step(found)[0])
+        assert speculative.passes >= sequential.passes
+
+
+def test_component_engine_reads_the_same_outer_rectangles_as_contours():
+    mask = np.zeros((120, 160), dtype=np.uint8)
+    cv2.rectangle(mask, (10, 10), (90, 70), 255, 2)
+    mask[30:40, 30:50] = 255  # inside the hole of the frame, not an outer contour
+    cv2.circle(mask, (130, 40), 15, 255, 3)
+    mask[60:62, 100:140] = 255
+    mask[100, 10] = 255
+    mask[101, 11] = 255  # joined diagonally
+    found = {engine: find_rectangles(mask, engine=engine) for engine in BOX_ENGINE}
+    contours = found[BOX_ENGINE.CONTOURS]
+    assert sorted(contours.tolist()) == sorted(found[BOX_ENGINE.COMPONENTS].tolist())
+    assert len(contours) == 4
+    assert find_rectangles(mask, min_size=3, engine=BOX_ENGINE.COMPONENTS).shape == (2, 4)
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+from hieroglyph.ocr.box_triage import BOX_CLASS, classify_box
+
+
+def _text_box(lines: int = 1) -> np.ndarray:
+    box = np.full((30 * lines + 10, 220), 255, dtype=np.uint8)
+    for line in range(lines):
+        cv2.putText(box, "Hieroglyph", (5, 30 * line + 28), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+    return box
+
+
+def test_blank_and_noise_boxes_are_skipped():
+    assert classify_box(np.full((40, 120), 255, dtype=np.uint8)) == BOX_CLASS.BLANK
+    speckled = np.full((60, 200), 255, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    for y, x in zip(rng.integers(0, 58, 40), rng.integers(0, 198, 40)):
+        speckled[y:y + 2, x:x + 2] = 0
+    assert classify_box(speckled) == BOX_CLASS.NOISE
+
+
+def test_ruling_line_is_not_text():
+    box = np.full((20, 200), 255, dtype=np.uint8)
+    box[9:11, 2:198] = 0
+    assert classify_box(box) == BOX_CLASS.LINE
+
+
+def test_text_rows_are_counted():
+    assert classify_box(_text_box(1)) == BOX_CLASS.TEXT
+    assert classify_box(_text_box(3)) == BOX_CLASS.MULTI_LINE_TEXT
+    # Light text on a dark fill reads the same as dark text on white
+    assert classify_box(cv2.bitwise_not(_text_box(1))) == BOX_CLASS.TEXT
+
+
+def test_paragraphs_and_table_cells_of_small_text_are_read():
+    for lines in (3, 5, 8):
+        paragraph = np.full((18 * lines + 10, 300), 255, dtype=np.uint8)
+        for line in range(lines):
+            cv2.putText(paragraph, "the quick brown fox jumps", (5, 18 * line + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 0, 1)
+        assert classify_box(paragraph) == BOX_CLASS.MULTI_LINE_TEXT
+    cell = np.full((80, 300), 255, dtype=np.uint8)
+    cv2.putText(cell, "12.5 kg", (110, 45), cv2.FONT_HERSHEY_SIMPLEX, 0.45, 0, 1)
+    assert classify_box(cell) == BOX_CLASS.TEXT
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from hieroglyph.ocr.engine_pool import TesseractEnginePool
+
+
+class _Engine:
+    def __init__(self, key=None):
+        self.key = key
+        self.ended = False
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        self.ended = True
+
+
+def test_failed_engine_build_gives_its_slot_back(monkeypatch):
+    pool = TesseractEnginePool(max_engines_per_key=1, checkout_timeout=1)
+
+    def missing_tessdata(key):
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    monkeypatch.setattr(pool, "_create", missing_tessdata)
+    for __ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.checkout("eng", 7)
+    with pytest.raises(RuntimeError):
+        pool.warm_up("eng", [7])
+    monkeypatch.setattr(pool, "_create", lambda key: _Engine())
+    key, engine = pool.checkout("eng", 7)
+    assert isinstance(engine, _Engine)
+    pool.checkin(key, engine)
+
+
+def test_checkout_of_a_busy_key_times_out(monkeypatch):
+    pool = TesseractEnginePool(max_engines_per_key=1, checkout_timeout=0.2)
+    monkeypatch.setattr(pool, "_create", lambda key: _Engine())
+    key, engine = pool.checkout("eng", 7)
+    with pytest.raises(TimeoutError):
+        pool.checkout("eng", 7)
+    # An engine checked in while another thread waits is handed over
+    handed_over = []
+    waiter = threading.Thread(target=lambda: handed_over.append(pool.checkout("eng", 7)[1]))
+    pool.checkout_timeout = 5
+    waiter.start()
+    pool.checkin(key, engine)
+    waiter.join(5)
+    assert handed_over == [engine]
+
+
+def test_pool_stays_under_its_bound_by_ending_the_least_recently_used_idle_engines(monkeypatch):
+    pool = TesseractEnginePool(max_engines_per_key=2, checkout_timeout=0.2, max_engines=2)
+    monkeypatch.setattr(pool, "_create", lambda key: _Engine(key))
+    with pool.engine("chi_sim", 7) as oldest, pool.engine("chi_sim", 11):
+        pass
+    with pool.engine("chi_sim", 11):
+        pass
+    # psm 7 was used least recently, its engine makes room for psm 6
+    with pool.engine("chi_sim", 6) as engine:
+        assert engine.key[1] == 6 and oldest.ended
+    stats = pool.stats()
+    assert (stats["engines"], stats["evicted"]) == (2, 1)
+
+    # With every engine checked out there is nothing to end, the checkout waits and times out
+    with pool.engine("chi_sim", 6), pool.engine("chi_sim", 11):
+        with pytest.raises(TimeoutError):
+            pool.checkout("chi_tra", 6)
+    pool.warm_up("chi_tra", [6, 7], count=2)
+    assert pool.stats()["engines"] == 2
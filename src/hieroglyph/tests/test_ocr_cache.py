@@ -0,0 +1,13 @@
+from hieroglyph.ocr.cache import OCRResultCache
+
+
+def test_empty_results_are_hits_in_memory_and_on_disk(tmp_path):
+    cache = OCRResultCache(max_bytes=0, directory=str(tmp_path))
+    cache.put("blank", [])
+    assert cache.get("blank") == [] and cache.get("missing") is None
+    counters = cache.stats()
+    assert (counters["disk_hits"], counters["misses"]) == (1, 1)
+
+    cache = OCRResultCache(max_bytes=1 << 20, directory=None)
+    cache.put("blank", [])
+    assert cache.get("blank") == [] and cache.stats()["memory_hits"] == 1
@@ -0,0 +1,30 @@
+import struct
+
+from hieroglyph.general import OCR_QUALITY
+from hieroglyph.ocr import quality
+from hieroglyph.ocr.quality import QUALITY_OEM, engine_settings, has_legacy_model
+
+
+def _traineddata(path, legacy: bool):
+    # Offsets of the 24 entries a traineddata file can hold, -1 where it has none
+    offsets = [-1] * 24
+    offsets[1] = 200
+    offsets[17] = 400
+    if legacy:
+        offsets[3] = 300
+    path.write_bytes(struct.pack("<i24q", 24, *offsets) + bytes(512))
+    return path
+
+
+def test_legacy_quality_needs_traineddata_with_the_legacy_model(tmp_path, monkeypatch):
+    assert has_legacy_model(_traineddata(tmp_path / "eng.traineddata", legacy=True))
+    assert not has_legacy_model(_traineddata(tmp_path / "chi_sim.traineddata", legacy=False))
+    assert not has_legacy_model(tmp_path / "kor.traineddata")
+
+    monkeypatch.setattr(quality, "get_languages", lambda: (str(tmp_path), ["eng", "chi_sim"]))
+    engine_settings.cache_clear()
+    try:
+        assert engine_settings(OCR_QUALITY.LEGACY, "eng") == (None, QUALITY_OEM[OCR_QUALITY.LEGACY])
+        assert engine_settings(OCR_QUALITY.LEGACY, "eng+chi_sim") == (None, QUALITY_OEM[OCR_QUALITY.DEFAULT])
+    finally:
+        engine_settings.cache_clear()
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+from hieroglyph.general import INBOUND_IMAGE_TYPE
+from hieroglyph.process.boxes import get_bounding_boxes
+from hieroglyph.process.page_cache import PageCache, PageLayout
+from hieroglyph.utils.image import ImageWrapper
+from hieroglyph.utils.deadline import Deadline
+
+
+def _diagram() -> ImageWrapper:
+    page = np.full((400, 600), 255, dtype=np.uint8)
+    for x, y in [(30, 60), (320, 60), (30, 260), (320, 300)]:
+        cv2.rectangle(page, (x, y - 40), (x + 240, y + 20), 0, 2)
+        cv2.putText(page, "label", (x + 20, y), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    return ImageWrapper(src_image=page, name="diagram", image_type=INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+
+
+def test_layout_gives_the_same_boxes_and_keeps_the_binary_between_scales():
+    page = _diagram()
+    layout = PageLayout(page, page)
+    for scale_pairing in [None, (3, 2), (5, 5), (3, 2)]:
+        expected = get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED, scale_pairing=scale_pairing)
+        cached = get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED, scale_pairing=scale_pairing,
+                                    layout=layout)
+        assert [box._box for box in cached] == [box._box for box in expected]
+    assert list(layout.binaries) == [1] and len(layout.rectangles) == 3
+    binary = layout.binaries[1][0]
+    get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED, scale_pairing=(7, 1), layout=layout)
+    assert layout.binaries[1][0] is binary
+
+
+def test_boxes_of_a_search_cut_short_are_not_kept_for_later_requests():
+    page = _diagram()
+    layout = PageLayout(page, page)
+    deadline = Deadline(0)
+    get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED, deadline=deadline, layout=layout)
+    assert deadline.truncated and not layout.rectangles
+    expected = get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED)
+    assert [box._box for box in get_bounding_boxes(page, page, INBOUND_IMAGE_TYPE.DIAGRAM_BASED, layout=layout)] \
+        == [box._box for box in expected]
+    assert len(layout.rectangles) == 1
+
+
+def test_page_cache_is_keyed_by_content_and_type_and_evicts_by_size():
+    page = _diagram()
+    layout = PageLayout(page, page)
+    cache = PageCache(max_bytes=layout.nbytes() * 2)
+    keys = [cache.make_key("aGVsbG8=", INBOUND_IMAGE_TYPE.DIAGRAM_BASED),
+            cache.make_key("aGVsbG8=", INBOUND_IMAGE_TYPE.TEXT_BASED),
+            cache.make_key("d29ybGQ=", INBOUND_IMAGE_TYPE.DIAGRAM_BASED)]
+    assert len(set(keys)) == 3
+    assert cache.make_key("aGVsbG8=", INBOUND_IMAGE_TYPE.DIAGRAM_BASED, "[]") not in keys
+    for key in keys:
+        cache.put(key, PageLayout(page, page))
+    assert cache.get(keys[0]) is None and cache.get(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    assert PageCache(max_bytes=0).enabled is False
+
+
+def test_a_cached_page_takes_the_name_of_each_request():
+    page = _diagram()
+    layout = PageLayout(page, page)
+    source, transformed = layout.named("renamed")
+    assert (source.name, transformed.name) == ("renamed", "renamed.modified.png") and layout.source.name == "diagram"
+    assert source.get_array() is page.get_array()
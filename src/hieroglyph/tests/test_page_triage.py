@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+from hieroglyph.process.page_triage import PAGE_CLASS, PageTriageStats, triage_page
+from hieroglyph.process.preprocessing import PreprocessPipeline
+
+
+def _page() -> np.ndarray:
+    page = np.full((900, 1200), 255, dtype=np.uint8)
+    for line in range(12):
+        cv2.putText(page, "Hieroglyph diagrams", (40, 80 + 65 * line), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    return page
+
+
+def test_clean_pages_are_told_from_noisy_photographed_compressed_and_skewed_ones():
+    page = _page()
+    page_class, measures = triage_page(page)
+    assert page_class == PAGE_CLASS.CLEAN and measures["straightness"] > 1.5 and measures["seconds"] < 1
+
+    noisy = cv2.add(cv2.subtract(page, 20), np.random.default_rng(0).integers(0, 40, page.shape, dtype=np.uint8))
+    assert triage_page(noisy)[0] == PAGE_CLASS.NOISY
+    shaded = cv2.addWeighted(page, 0.5, np.tile(np.linspace(60, 250, 1200).astype(np.uint8), (900, 1)), 0.5, 0)
+    assert triage_page(shaded)[0] == PAGE_CLASS.CONTINUOUS_TONE
+    __, encoded = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, 75])
+    assert triage_page(cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE))[0] == PAGE_CLASS.COMPRESSED
+    skewed = cv2.warpAffine(page, cv2.getRotationMatrix2D((600, 450), 3, 1), (1200, 900), borderValue=255)
+    assert triage_page(skewed)[0] == PAGE_CLASS.SKEWED
+
+
+def test_fast_pipeline_gives_the_standard_pixels_on_clean_pages():
+    page = _page()
+    assert np.array_equal(PreprocessPipeline.parse("fast").run(page), PreprocessPipeline.parse("standard").run(page))
+
+
+def test_triage_stats_count_classes_and_routed_pages():
+    stats = PageTriageStats()
+    stats.record(PAGE_CLASS.CLEAN, 0.02, True)
+    stats.record(PAGE_CLASS.SKEWED, 0.03, False)
+    counters = stats.stats()
+    assert (counters["classified"], counters["routed"], counters["class_clean"], counters["class_skewed"]) == (2, 1, 1, 1)
+    assert counters["class_noisy"] == 0 and abs(counters["seconds"] - 0.05) < 1e-9
@@ -0,0 +1,80 @@
+import numpy as np
+from tesserocr import RIL
+
+from hieroglyph.general import OCR_RESULT_LEVEL
+from hieroglyph.ocr.result_arrays import OCRResultArrays
+
+
+class _ResultIterator:
+    """Symbols as (text, conf, (left, top, right, bottom), starts line, starts word)"""
+
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.index = 0
+
+    def Begin(self):
+        self.index = 0
+
+    def Next(self, level):
+        self.index += 1
+        return self.index < len(self.symbols)
+
+    def Empty(self, level):
+        return not self.symbols
+
+    def IsAtBeginningOf(self, level):
+        return self.symbols[self.index][3 if level == RIL.TEXTLINE else 4]
+
+    def GetUTF8Text(self, level):
+        return self.symbols[self.index][0]
+
+    def Confidence(self, level):
+        return self.symbols[self.index][1]
+
+    def BoundingBox(self, level):
+        return self.symbols[self.index][2]
+
+
+class _API:
+    def __init__(self, symbols):
+        self.symbols = symbols
+
+    def GetIterator(self):
+        return _ResultIterator(self.symbols)
+
+
+SYMBOLS = [("H", 90.0, (0, 0, 5, 10), True, True),
+           ("i", 80.0, (6, 2, 8, 10), False, False),
+           ("!", 70.0, (10, 0, 12, 10), False, True),
+           ("o", 60.0, (0, 20, 5, 30), True, True),
+           ("k", 50.0, (6, 20, 10, 31), False, False)]
+
+
+def test_symbols_are_read_into_arrays_and_merged_into_words():
+    symbols = OCRResultArrays.from_api(_API(SYMBOLS), OCR_RESULT_LEVEL.SYMBOL)
+    assert len(symbols) == 5
+    assert symbols.line.tolist() == [0, 0, 0, 1, 1] and symbols.word.tolist() == [0, 0, 1, 2, 2]
+    assert symbols.boxes[1].tolist() == [6, 2, 2, 8]
+    assert symbols.joined_text() == "Hi !\nok"
+
+    words = symbols.words()
+    assert words.text.tolist() == ["Hi", "!", "ok"]
+    assert np.allclose(words.conf, [85.0, 70.0, 55.0])
+    assert words.boxes.tolist() == [[0, 0, 8, 10], [10, 0, 2, 10], [0, 20, 10, 11]]
+    assert words.joined_text() == symbols.joined_text()
+
+
+def test_empty_iterator_and_records_round_trip():
+    assert len(OCRResultArrays.from_api(_API([]), OCR_RESULT_LEVEL.WORD)) == 0
+    symbols = OCRResultArrays.from_api(_API(SYMBOLS), OCR_RESULT_LEVEL.SYMBOL)
+    restored = OCRResultArrays.from_records(OCR_RESULT_LEVEL.SYMBOL, symbols.to_records())
+    assert restored.to_records() == symbols.to_records()
+    assert restored.select(restored.conf > 65).text.tolist() == ["H", "i", "!"]
+
+
+def test_boxes_are_placed_from_a_resized_crop_onto_the_page():
+    symbols = OCRResultArrays.from_api(_API(SYMBOLS), OCR_RESULT_LEVEL.SYMBOL)
+    # The [100, 200, 20, 16] box was OCRed as a 40x32 crop
+    placed = symbols.to_page([100, 200, 20, 16], crop_shape=(32, 40))
+    assert placed.boxes[0].tolist() == [100, 200, 2, 5]
+    assert placed.boxes[3].tolist() == [100, 210, 2, 5]
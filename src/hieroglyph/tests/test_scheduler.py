@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+
+from hieroglyph.utils.scheduler import OCRScheduler
+
+
+def test_map_returns_results_in_order():
+    scheduler = OCRScheduler(budget=3)
+    assert scheduler.map(lambda x: x * 2, range(20)) == [x * 2 for x in range(20)]
+    assert scheduler.map(lambda x: x, []) == []
+    stats = scheduler.stats()
+    assert stats["completed"] == 20 and stats["running"] == 0 and stats["queued"] == 0
+
+
+def test_budget_is_never_exceeded():
+    scheduler = OCRScheduler(budget=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def task(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.005)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=scheduler.map, args=(task, range(10))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = OCRScheduler(budget=1)
+    release = threading.Event()
+    order = []
+    blocker = threading.Thread(target=scheduler.map, args=(lambda _: release.wait(), [None]))
+    blocker.start()
+    while scheduler.stats()["running"] == 0:
+        time.sleep(0.001)
+    big = threading.Thread(target=scheduler.map, args=(lambda x: order.append(("big", x)), range(5)))
+    big.start()
+    while scheduler.stats()["queued"] < 5:
+        time.sleep(0.001)
+    small = threading.Thread(target=scheduler.map, args=(lambda x: order.append(("small", x)), range(1)))
+    small.start()
+    while scheduler.stats()["queued"] < 6:
+        time.sleep(0.001)
+    release.set()
+    for thread in (blocker, big, small):
+        thread.join()
+    # The small request does not wait behind every box of the big one
+    assert order.index(("small", 0)) <= 1
+
+
+def test_failed_task_cancels_the_rest_of_its_session():
+    scheduler = OCRScheduler(budget=1)
+    release = threading.Event()
+
+    def task(x):
+        if x == 0:
+            raise ValueError("bad box")
+        release.wait()
+        return x
+
+    with pytest.raises(ValueError):
+        scheduler.map(task, range(5))
+    # At most the box right after the failure may have started before the session was cancelled
+    assert scheduler.stats()["cancelled"] >= 3
+    release.set()
+
+
+def test_timeout_cancels_queued_tasks_and_returns_default():
+    scheduler = OCRScheduler(budget=1)
+    release = threading.Event()
+
+    def task(x):
+        if x == 0:
+            release.wait(5)
+        return x
+
+    start = time.monotonic()
+    results = scheduler.map(task, range(5), timeout=0.05, default="skipped")
+    release.set()
+    assert time.monotonic() - start < 1
+    assert results == ["skipped"] * 5
+    assert scheduler.stats()["cancelled"] >= 4
+    assert scheduler.map(task, range(3), timeout=5) == [0, 1, 2]
+
+
+def test_task_raising_timeout_error_is_not_a_session_timeout(caplog):
+    scheduler = OCRScheduler(budget=1)
+
+    def task(x):
+        if x == 0:
+            raise TimeoutError("no engine became free")
+        return x
+
+    with pytest.raises(TimeoutError, match="no engine"):
+        scheduler.map(task, range(3), timeout=5)
+    assert "timed out" not in caplog.text
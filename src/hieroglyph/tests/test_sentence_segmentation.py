@@ -0,0 +1,27 @@
+import numpy as np
+
+from hieroglyph.general import OCR_RESULT_LEVEL
+from hieroglyph.ocr.result_arrays import OCRResultArrays
+from hieroglyph.utils.sentence_segmentation import _group_sentences, extract_sentences_from_words
+
+
+def test_words_are_grouped_into_sentences_with_merged_boxes():
+    texts = np.array(["Hello", "world.", "How", "are", "you?", "Trailing", "words"])
+    boxes = np.array([[10, 10, 40, 12], [55, 8, 50, 14], [10, 30, 30, 12], [45, 31, 25, 12], [75, 30, 35, 14],
+                      [10, 50, 60, 12], [75, 50, 40, 12]], dtype=np.int32)
+    # Words after the last sentence ending are dropped
+    assert _group_sentences(texts, boxes) == [("Hello world.", (10, 8, 95, 14)), ("How are you?", (10, 30, 100, 14))]
+    assert _group_sentences(np.array(["no", "ending"]), boxes[:2]) == []
+    assert _group_sentences(np.array([], dtype=str), np.zeros((0, 4), dtype=np.int32)) == []
+
+
+def test_sentences_come_from_the_symbols_of_the_ocr_pass():
+    symbols = OCRResultArrays(OCR_RESULT_LEVEL.SYMBOL,
+                              text=np.array(["H", "i", "!", " ", "O", "k", "."]),
+                              conf=np.full(7, 90, dtype=np.float32),
+                              boxes=np.array([[0, 0, 8, 10], [9, 0, 3, 10], [13, 0, 3, 10], [17, 0, 4, 10],
+                                              [0, 20, 9, 10], [10, 22, 7, 8], [18, 27, 3, 3]], dtype=np.int32),
+                              line=np.array([0, 0, 0, 0, 1, 1, 1]),
+                              word=np.array([0, 0, 0, 1, 2, 2, 2]))
+    # The blank word between the sentences is not part of either
+    assert extract_sentences_from_words(symbols) == [("Hi!", (0, 0, 16, 10)), ("Ok.", (0, 20, 21, 10))]
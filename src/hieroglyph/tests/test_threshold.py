@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from hieroglyph.process.threshold import GaussianThresholds, downscale_ink, otsu_threshold
+
+
+def test_masks_equal_opencv_adaptive_threshold():
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur((rng.random((120, 170)) * 255).astype(np.uint8), (5, 5), 0)
+    thresholds = GaussianThresholds(image)
+    for block in (5, 11, 21, 37):
+        for C in range(0, block, 4):
+            expected = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
+                                             block, C)
+            assert np.array_equal(thresholds.mask(block, C), expected), (block, C)
+
+
+def test_only_the_most_recent_blocks_are_kept():
+    thresholds = GaussianThresholds(np.zeros((10, 10), dtype=np.uint8), max_blocks=2)
+    for block in (5, 7, 5, 9):
+        thresholds.mask(block, 0)
+    assert list(thresholds.differences) == [5, 9]
+
+
+def test_otsu_value_and_ink_downscale():
+    rng = np.random.default_rng(1)
+    image = cv2.GaussianBlur((rng.random((130, 95)) * 255).astype(np.uint8), (3, 3), 0)
+    expected, __ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    assert otsu_threshold(image) == expected
+
+    image = np.full((10, 13), 255, dtype=np.uint8)
+    image[4, 7] = 0
+    small = downscale_ink(image, 3, 127, rows=1)
+    assert small.shape == (4, 5)
+    assert np.argwhere(small).tolist() == [[1, 2]]
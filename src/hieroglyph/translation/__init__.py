@@ -1,19 +1,29 @@
 import re
 import logging
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
 from hieroglyph.ocr import ENGLISH_PRINTABLE
 from hieroglyph.utils.text import TextWrapper, BoxData
+from hieroglyph.utils.deadline import Deadline
 from hieroglyph.translation.translator import Translator
 
 logger = logging.getLogger(__name__)
 
 
-def translate_page_data(translator: Translator, textwrapper: TextWrapper, lang_in: str, lang_out: str) -> Dict:
-    """Take in the translator and a textwrapper to translate from lang_in to lang_out"""
+def translate_page_data(translator: Translator, textwrapper: TextWrapper, lang_in: str, lang_out: str,
+                        deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Take in the translator and a textwrapper to translate from lang_in to lang_out. Boxes left once the
+    deadline expires keep an empty translation and the page is marked as truncated
+    """
     _translator = lambda data: translator.translate(lang_in=lang_in, lang_out=lang_out, text=data)
     _threaded_translate_wrapper = lambda box: _threaded_translate(box, _translator)
-    for result in map(_threaded_translate_wrapper, textwrapper.data):
+    for done, box_data in enumerate(textwrapper.data):
+        if deadline and deadline.expired():
+            deadline.truncate("translation", f"{len(textwrapper.data) - done}/{len(textwrapper.data)} boxes")
+            textwrapper.truncated = True
+            break
+        result = _threaded_translate_wrapper(box_data)
         logger.debug(f"Retrieved data for {result}")
     logger.info("translate_page_data: returning all box data from source image")
     return textwrapper.to_dict()
@@ -0,0 +1,103 @@
+# Debug and error images written by a background thread, so rendering and encoding them never holds up a request
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+from hieroglyph.general import DEBUG_ARTIFACTS, DEBUG_ARTIFACTS_EVERY, DEBUG_ARTIFACTS_QUEUE, DEBUG_ARTIFACTS_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ArtifactWriter:
+    """
+    Bounded queue of images to write, drained by one daemon thread started with the first artifact.
+    Artifacts arriving while the queue is full are dropped rather than waited for
+    {
+        directory: Path # where artifacts are written
+        enabled: bool # whether sample() ever picks a page for debug artifacts
+        every: int # sample() picks 1 in every pages
+        max_queued: int # artifacts waiting to be written before new ones are dropped
+    }
+    """
+
+    def __init__(self, directory: str = DEBUG_ARTIFACTS_DIR, enabled: bool = DEBUG_ARTIFACTS,
+                 every: int = DEBUG_ARTIFACTS_EVERY, max_queued: int = DEBUG_ARTIFACTS_QUEUE):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.every = max(1, every)
+        self.max_queued = max_queued
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {"sampled": 0, "seen": 0, "queued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    def sample(self) -> bool:
+        """Whether the page being processed gets debug artifacts, 1 in every pages while enabled"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            picked = self._counters["seen"] % self.every == 0
+            self._counters["seen"] += 1
+            self._counters["sampled"] += picked
+        return picked
+
+    def submit(self, name: str, image: Union[np.ndarray, Callable[[], np.ndarray]]) -> bool:
+        """
+        Queue image to be written as name. A callable is called on the writer thread, put drawing there.
+        It must not read memory that may be freed before it runs, pass a copied array instead.
+        Returns False when the artifact was dropped
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((name, image))
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+            logger.debug(f"Artifact queue is full, dropped {name}")
+            return False
+        with self._lock:
+            self._counters["queued"] += 1
+        return True
+
+    def flush(self):
+        """Block until every queued artifact has been written"""
+        self._queue.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            name, image = self._queue.get()
+            try:
+                array = image() if callable(image) else image
+                self.directory.mkdir(parents=True, exist_ok=True)
+                if not cv2.imwrite(str(self.directory / name), array):
+                    raise OSError(f"cv2.imwrite could not write {name}")
+                with self._lock:
+                    self._counters["written"] += 1
+            except Exception as e:
+                with self._lock:
+                    self._counters["failed"] += 1
+                logger.warning(f"Could not write artifact {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, int | bool]:
+        with self._lock:
+            return {"enabled": self.enabled,
+                    "every": self.every,
+                    "waiting": self._queue.qsize(),
+                    "max_queued": self.max_queued,
+                    **self._counters}
+
+
+artifact_writer = ArtifactWriter()
@@ -0,0 +1,43 @@
+# Per page time budget, checked by box detection, OCR and translation before they start more work
+import math
+import time
+from typing import Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    """
+    Point in time after which a page stops starting new work and returns what it has so far
+    {
+        seconds: float | None # budget the deadline was started with, None never expires
+        expires_at: float # time.monotonic() of expiry, inf when the deadline never expires
+        truncated: bool # set once a stage skipped work because the deadline expired
+    }
+    """
+    __slots__ = ("seconds", "expires_at", "truncated")
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at: float = time.monotonic() + seconds if seconds is not None else math.inf
+        self.truncated = False
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None when there is no deadline"""
+        if self.seconds is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def truncate(self, stage: str, skipped: str):
+        """Record that a stage skipped work because of the deadline, skipped describes the work left undone"""
+        self.truncated = True
+        logger.warning(f"Deadline of {self.seconds}s expired during {stage}, skipped {skipped}")
+
+    def __str__(self) -> str:
+        return f"<Deadline: {self.seconds=}, remaining={self.remaining()}, {self.truncated=}>"
+
+    __repr__ = __str__
@@ -158,3 +158,60 @@ class ImageWrapper:
             self.name == o.name and self._uninitialized == self._uninitialized
 
     __repr__ = __str__
+
+
+class BoxView:
+    """
+    Box on a page array that only reads its pixels when asked, in place of a cropped ImageWrapper. Nothing
+    is copied or resized for a box until OCR looks at it. Boxes under the OCR minimum height keep their resized
+    copy, at most MINIMUM_HEIGHT rows, so the several reads OCR makes of a box resize it once
+    {
+        name: "" # box name
+        image_type: Enum # Image type of the page, text or diagram
+        page: np.array() # page array the box lies on, shared by every box of the page and never written to
+        _box: [x,y,w,h] # bounding box on the page
+        normalize_size: bool # resize pixels below the OCR minimum height when they are read
+        _resized: np.array() | None # resized pixels once read, when normalize_size applies
+    }
+    """
+    __slots__ = ("page", "_box", "image_type", "name", "normalize_size", "_resized")
+
+    def __init__(self, page: np.ndarray, box: List[int], image_type: INBOUND_IMAGE_TYPE, name: str,
+                 normalize_size: bool = False):
+        if not name:
+            raise ValueError("Must provide image object and name")
+        self.page = page
+        self._box = box
+        self.image_type = image_type
+        self.name = name
+        self.normalize_size = normalize_size
+        self._resized: Optional[np.ndarray] = None
+
+    def get_array(self) -> np.ndarray:
+        """Read only view of the box on the page, or a resized copy of it when normalize_size applies"""
+        if self._resized is not None:
+            return self._resized
+        x, y, w, h = self._box
+        view = self.page[y:y+h, x:x+w]
+        crop = manipulate_size(view) if self.normalize_size else view
+        if crop is not view:
+            self._resized = crop
+        crop.flags.writeable = False
+        return crop
+
+    def to_array(self) -> np.ndarray:
+        return self.get_array().copy()
+
+    def get_pillow(self) -> Image.Image:
+        return Image.fromarray(np.ascontiguousarray(self.get_array()))
+
+    to_pillow = get_pillow
+
+    def save(self, filename: Union[str, Path]):
+        """Save image out to filename"""
+        cv2.imwrite(str(filename), self.get_array())
+
+    def __str__(self) -> str:
+        return f"<BoxView {self.name=}, box={self._box}, {self.normalize_size=}>"
+
+    __repr__ = __str__
@@ -0,0 +1,130 @@
+# Process wide worker budget shared by every in flight request, for OCR tasks and the preprocessing tiles of pages
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from hieroglyph.general import MAX_WORKERS
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class OCRScheduler:
+    """
+    Runs OCR tasks on a single pool of `budget` threads. Every map() call is a session with its own queue
+    and sessions are served round robin, so a page with thousands of boxes cannot starve a small request
+    {
+        budget: int # maximum number of OCR tasks running at once in this process
+        _sessions: {session id: deque[(Future, func, item, queued at)]} # queued tasks per in flight request
+        _running: int # tasks currently running
+    }
+    """
+
+    def __init__(self, budget: int = MAX_WORKERS):
+        self.budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=budget, thread_name_prefix="ocr")
+        self._lock = threading.Lock()
+        self._session_ids = itertools.count(1)
+        self._sessions: "OrderedDict[int, Deque[Tuple[Future, Callable, Any, float]]]" = OrderedDict()
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any], timeout: Optional[float] = None,
+            default: Any = None) -> List[Any]:
+        """
+        Run func over items within the shared budget, returning results in item order. Once timeout seconds
+        have passed the queued tasks are cancelled, and every task not finished by then returns default
+        """
+        now = time.monotonic()
+        tasks = deque((Future(), func, item, now) for item in items)
+        if not tasks:
+            return []
+        futures = [task[0] for task in tasks]
+        session_id = next(self._session_ids)
+        with self._lock:
+            self._sessions[session_id] = tasks
+            self._submitted += len(tasks)
+            self._max_queued = max(self._max_queued, self._queued())
+        self._dispatch()
+        try:
+            if timeout is None:
+                return [future.result() for future in futures]
+            # wait() tells running out of time apart from a task raising TimeoutError itself, which is re-raised
+            #  below like any other task error
+            done, not_done = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+            if not_done and not any(future.exception() for future in done if not future.cancelled()):
+                cancelled = self.cancel_session(session_id)
+                logger.warning(f"OCR session {session_id} timed out after {timeout:.2f}s, cancelled {cancelled} queued tasks")
+            # Tasks still running finish in the background, their results are dropped
+            return [future.result() if future.done() and not future.cancelled() else default for future in futures]
+        finally:
+            # Drop whatever is still queued when a task failed, nothing is left on success
+            self.cancel_session(session_id)
+
+    def cancel_session(self, session_id: int) -> int:
+        """Cancel the queued (not yet running) tasks of a session, returns the number cancelled"""
+        with self._lock:
+            tasks = self._sessions.pop(session_id, deque())
+        for future, *__ in tasks:
+            future.cancel()
+        with self._lock:
+            self._cancelled += len(tasks)
+        return len(tasks)
+
+    def _queued(self) -> int:
+        return sum(len(tasks) for tasks in self._sessions.values())
+
+    def _dispatch(self):
+        """Start queued tasks, one session at a time in turn, until the budget is used up"""
+        with self._lock:
+            while self._running < self.budget and self._sessions:
+                session_id, tasks = next(iter(self._sessions.items()))
+                future, func, item, queued_at = tasks.popleft()
+                if tasks:
+                    self._sessions.move_to_end(session_id)
+                else:
+                    del self._sessions[session_id]
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+                self._total_wait += time.monotonic() - queued_at
+                self._executor.submit(self._run, future, func, item)
+
+    def _run(self, future: Future, func: Callable[[Any], Any], item: Any):
+        result, error = None, None
+        try:
+            result = func(item)
+        except BaseException as e:
+            error = e
+        # Release the slot before waking the caller so stats() is settled once map() returns
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, int | float]:
+        with self._lock:
+            started = self._completed + self._running
+            return {"budget": self.budget,
+                    "running": self._running,
+                    "queued": self._queued(),
+                    "queued_sessions": len(self._sessions),
+                    "submitted": self._submitted,
+                    "completed": self._completed,
+                    "cancelled": self._cancelled,
+                    "max_queued": self._max_queued,
+                    "mean_wait_ms": (self._total_wait / started * 1000) if started else 0.0}
+
+
+ocr_scheduler = OCRScheduler()
@@ -1,34 +1,54 @@
-import pytesseract
+import numpy as np
 from PIL import Image
 from typing import List, Tuple
 
+from hieroglyph.ocr.result_arrays import OCRResultArrays
+
+SENTENCE_ENDINGS = ".!?"
+
+
 def extract_sentences_with_boxes(box_img: Image.Image) -> List[Tuple[str, Tuple[int, int, int, int]]]:
     """
     Given a cropped paragraph image, return sentence segments with their bounding boxes.
+    OCRs the box again with pytesseract, which is not a dependency of the service, prefer extract_sentences_from_words
     """
+    import pytesseract
     data = pytesseract.image_to_data(box_img, output_type=pytesseract.Output.DICT)
-    sentences = []
-    current_sentence = ""
-    current_coords = []
-
-    for i in range(len(data['text'])):
-        word = data['text'][i]
-        if not word.strip():
-            continue
-
-        x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-        current_sentence += word + " "
-        current_coords.append((x, y, x + w, y + h))
-
-        if word.strip()[-1] in ".!?":
-            xs = [c[0] for c in current_coords]
-            ys = [c[1] for c in current_coords]
-            x2s = [c[2] for c in current_coords]
-            y2s = [c[3] for c in current_coords]
-            x_min, y_min = min(xs), min(ys)
-            x_max, y_max = max(x2s), max(y2s)
-            sentences.append((current_sentence.strip(), (x_min, y_min, x_max - x_min, y_max - y_min)))
-            current_sentence = ""
-            current_coords = []
+    words = [(word.strip(), (x, y, w, h)) for word, x, y, w, h in
+             zip(data['text'], data['left'], data['top'], data['width'], data['height']) if word.strip()]
+    if not words:
+        return []
+    texts, boxes = zip(*words)
+    return _group_sentences(np.array(texts, dtype=str), np.array(boxes, dtype=np.int32))
+
+
+def extract_sentences_from_words(result: OCRResultArrays) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    """
+    Same as extract_sentences_with_boxes, from the word or symbol results of the OCR pass instead of
+    OCRing the box again
+    """
+    words = result.words()
+    keep = np.char.str_len(np.char.strip(words.text)) > 0
+    return _group_sentences(np.char.strip(words.text[keep]), words.boxes[keep])
+
 
+def _group_sentences(texts: np.ndarray, boxes: np.ndarray) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    """
+    Join words into sentences ending with SENTENCE_ENDINGS, each with the bounding box of its words.
+    Words after the last sentence ending are not returned
+    """
+    if not len(texts):
+        return []
+    last_characters = np.array([text[-1] for text in texts])
+    ends = np.flatnonzero(np.isin(last_characters, list(SENTENCE_ENDINGS)))
+    if not len(ends):
+        return []
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    boxes = boxes[:ends[-1] + 1]
+    top_left = np.minimum.reduceat(boxes[:, :2], starts)
+    bottom_right = np.maximum.reduceat(boxes[:, :2] + boxes[:, 2:], starts)
+    sentences = []
+    for start, end, (x_min, y_min), (x_max, y_max) in zip(starts, ends, top_left, bottom_right):
+        sentences.append((" ".join(texts[start:end + 1]),
+                          (int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min))))
     return sentences
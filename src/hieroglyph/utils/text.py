@@ -31,15 +31,18 @@ class BoxData:
         "confidence": 0.0, # average confidence across characters in the box
         "bounding_box": [x,y,w,h],
         "translation": "dst_lang translated content,
+        "words": [{"text": "", "confidence": 0.0, "bounding_box": [x,y,w,h]}], # only with word/symbol OCR results
     }
     """
-    __slots__ = ("text", "confidence", "bounding_box", "translation")
+    __slots__ = ("text", "confidence", "bounding_box", "translation", "words")
 
-    def __init__(self, text: str, confidence: float, bounding_box: list, translation: str = ""):
+    def __init__(self, text: str, confidence: float, bounding_box: list, translation: str = "",
+                 words: Optional[List[Dict[str, Union[str, float, List[int]]]]] = None):
         self.text = str(text).strip()
         self.confidence = confidence
         self.bounding_box = bounding_box
         self.translation = translation
+        self.words = words
 
     def update_translation(self, translation: str):
         self.translation = str(translation).strip()
@@ -49,10 +52,13 @@ class BoxData:
             self.bounding_box == o.bounding_box and self.translation == o.translation else False
 
     def to_dict(self) -> Dict[str, Union[str, float, List[float]]]:
-        return {"text": self.text,
-                "confidence": self.confidence,
-                "bounding_box": self.bounding_box,
-                "translation": self.translation}
+        box_dict = {"text": self.text,
+                    "confidence": self.confidence,
+                    "bounding_box": self.bounding_box,
+                    "translation": self.translation}
+        if self.words is not None:
+            box_dict["words"] = self.words
+        return box_dict
 
     def __str__(self) -> str:
         return f"<BoxData: {self.text=}, {self.confidence=}, {self.bounding_box=}, {self.translation=}>"
@@ -66,26 +72,35 @@ class TextWrapper:
         "name": "name of the image we are working on",
         "language": "tesseract langauge we used to ocr content",
         "overall_confidence": 0.0, # float value = average of box data confidence values
+        "truncated": False, # the page deadline expired before every box was OCRed/translated
+        "processing": {"pipeline": "standard", "cached": False, "seconds": 0.0, "stages": []}, # preprocessing profile
         "data": [
             BoxData
         ]
     }
     """
-    __slots__ = ("name", "data", "language", "overall_confidence")
+    __slots__ = ("name", "data", "language", "overall_confidence", "truncated", "processing")
 
-    def __init__(self, name: str, language: str, data: List[BoxData]):
+    def __init__(self, name: str, language: str, data: List[BoxData], truncated: bool = False,
+                 processing: Optional[Dict] = None):
         self.name = name
         self.language = language
         self.data = sorted(data, key=lambda b: (b.bounding_box[1], b.bounding_box[0]))
         self.overall_confidence = mean(x.confidence for x in self.data if x.confidence > 0.0) if self.data else 0.0
+        self.truncated = truncated
+        self.processing = processing
 
     def to_dict(self) -> Dict[str, list | float | str]:
-        return {
+        page_dict = {
             "name": self.name,
             "language": self.language,
             "overall_confidence": self.overall_confidence,
+            "truncated": self.truncated,
             "data": [box.to_dict() for box in self.data]
         }
+        if self.processing is not None:
+            page_dict["processing"] = self.processing
+        return page_dict
 
     def __eq__(self, o) -> bool:
         return True if self.name == o.name and self.overall_confidence == o.overall_confidence and \